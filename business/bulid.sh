@@ -10,4 +10,7 @@ python manage.py collectstatic --no-input
 # Apply database migrations
 python manage.py migrate
 
+# Tables behind the shared "replica-sticky" and "stream-tickets" caches
+python manage.py createcachetable
+
 echo "✅ Build completed successfully!"
\ No newline at end of file
@@ -3,6 +3,14 @@ ASGI config for business_system project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The live dashboard stream (``/api/events/``) is an async view that holds the
+connection open, so it must be served from here rather than WSGI, e.g.
+``gunicorn business_system.asgi:application -k uvicorn.workers.UvicornWorker``.
+Events are fanned out in-process, so each worker serves its own subscribers.
+The boss report overview (``/api/reports/overview/``) is async as well: its
+independent aggregates run concurrently, and under ASGI the worker keeps
+serving other requests while they do.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -39,12 +39,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # This must be at the top
+    'records.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # ← ADDED: Critical for static files
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'records.middleware.ReplicaStickyMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -85,9 +87,52 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
-        }
+            # File-backed test DB so concurrent checkout tests can use real locking
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        },
+        # Same file locally; tests get a separate database so replica routing is observable
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'TEST': {'NAME': BASE_DIR / 'test_replica.sqlite3'},
+        },
     }
 
+# Optional read replica for reports, analytics and exports (see records/routers.py)
+REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL')
+REPLICA_DATABASE_ALIAS = None
+if REPLICA_DATABASE_URL:
+    DATABASES['replica'] = dj_database_url.parse(
+        REPLICA_DATABASE_URL,
+        conn_max_age=600,
+        ssl_require=True
+    )
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    REPLICA_DATABASE_ALIAS = 'replica'
+DATABASE_ROUTERS = ['records.routers.ReplicaRouter']
+
+# Per-process cache for serialized catalog and low-stock payloads
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'business-system',
+    },
+    # Shared by every process: users who just wrote read from the primary
+    'replica-sticky': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'records_replica_sticky',
+    },
+    # Shared by every process: live-events stream tickets already used
+    'stream-tickets': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'records_stream_tickets',
+    },
+}
+
+# Fraction of requests instrumented by RequestMetricsMiddleware (0 disables it)
+REQUEST_METRICS_SAMPLE_RATE = float(os.environ.get('REQUEST_METRICS_SAMPLE_RATE', '0.1'))
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -159,11 +204,18 @@ CORS_ALLOW_HEADERS = [
 
 # REST Framework settings
 REST_FRAMEWORK = {
+    # Signed bearer tokens for the API; sessions are only used by the admin
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'records.authentication.SignedTokenAuthentication',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ]
 }
 
+# Lifetime of API tokens issued by /api/auth/token/ (one working shift)
+API_TOKEN_TTL_SECONDS = int(os.environ.get('API_TOKEN_TTL_SECONDS', 8 * 3600))
+
 # CSRF settings
 CSRF_TRUSTED_ORIGINS = [
     "http://localhost:3000",
@@ -1,23 +1,184 @@
 # records/admin.py
-from django.contrib import admin
-from .models import Product, Sale
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.utils.functional import cached_property
+from .caching import invalidate_dashboards
+from .models import DailySalesRollup, Product, ReorderPointChange, Sale, SaleArchive, StockMovement
+
+# Below this many rows an exact COUNT(*) is cheap enough
+ESTIMATED_COUNT_THRESHOLD = 100_000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Use the planner's row estimate instead of COUNT(*) for large unfiltered
+    changelists on Postgres; filtered lists and other databases count exactly.
+    """
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if connection.vendor == 'postgresql' and query is not None and not query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [self.object_list.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] > ESTIMATED_COUNT_THRESHOLD:
+                return row[0]
+        return super().count
+
+
+class InputFilter(admin.SimpleListFilter):
+    """A free-text filter, for columns with too many values for a link list."""
+    template = 'admin/records/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        # Django only renders filters that have at least one choice
+        return ((),)
+
+    def choices(self, changelist):
+        all_choice = next(super().choices(changelist))
+        all_choice['query_parts'] = (
+            (name, value) for name, value in changelist.get_filters_params().items()
+            if name != self.parameter_name
+        )
+        yield all_choice
+
+
+class SellerFilter(InputFilter):
+    title = 'seller username'
+    parameter_name = 'seller_username'
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(seller__username=self.value().strip())
+
+
+class ProductNameFilter(InputFilter):
+    title = 'product name'
+    parameter_name = 'product_name'
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(product__name__icontains=self.value().strip())
+
+
+class ProductCategoryFilter(admin.SimpleListFilter):
+    """Categories from the model choices, not a DISTINCT over every sale."""
+    title = 'product category'
+    parameter_name = 'category'
+
+    def lookups(self, request, model_admin):
+        return Product.CATEGORY_CHOICES
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(product__category_name=self.value())
+
+
+class StockAdjustmentForm(ActionForm):
+    stock_delta = forms.IntegerField(required=False, label='Stock change')
+
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ['name', 'category_name', 'price', 'cost_price', 'profit_margin', 'stock_quantity', 'min_stock_level', 'is_active', 'created_at']
-    list_filter = ['category_name', 'is_active', 'created_at']
+    list_filter = ['category_name', 'is_active', 'is_low_stock', 'created_at']
     search_fields = ['name', 'category_name']
     list_editable = ['price', 'cost_price', 'stock_quantity', 'min_stock_level', 'is_active']
     readonly_fields = ['created_at', 'updated_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    action_form = StockAdjustmentForm
+    actions = ['adjust_stock']
     
     def profit_margin(self, obj):
         return f"${obj.profit_margin:,.2f}"
     profit_margin.short_description = 'Profit Margin'
 
+    @admin.action(description='Adjust stock of selected products by "Stock change"')
+    def adjust_stock(self, request, queryset):
+        try:
+            delta = int(request.POST.get('stock_delta') or 0)
+        except ValueError:
+            delta = 0
+        if not delta:
+            self.message_user(request, 'Enter a non-zero stock change.', messages.ERROR)
+            return
+        selected = list(queryset.values_list('pk', flat=True))
+        adjusted = Product.objects.adjust_stock(selected, delta, user=request.user)
+        self.message_user(request, f'Adjusted stock by {delta:+d} on {len(adjusted)} products.', messages.SUCCESS)
+        if len(adjusted) < len(selected):
+            self.message_user(
+                request, f'{len(selected) - len(adjusted)} products were skipped: not enough stock.', messages.WARNING
+            )
+
 @admin.register(Sale)
 class SaleAdmin(admin.ModelAdmin):
     list_display = ['id', 'product', 'quantity', 'sale_price', 'total_amount', 'profit', 'payment_method', 'seller', 'sale_date']
-    list_filter = ['payment_method', 'sale_date', 'seller', 'product__category_name']
+    # Date-range links and text inputs: none of these query the sales table to build themselves
+    list_filter = ['payment_method', 'sale_date', ProductCategoryFilter, SellerFilter, ProductNameFilter]
+    list_select_related = ['product', 'seller']
     search_fields = ['product__name', 'seller__username']
+    autocomplete_fields = ['product', 'seller']
     readonly_fields = ['total_amount', 'profit', 'sale_date']
-    date_hierarchy = 'sale_date'
\ No newline at end of file
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def delete_queryset(self, request, queryset):
+        # Keep the daily rollups in step: one update per touched bucket, then one bulk delete
+        with transaction.atomic():
+            DailySalesRollup.objects.apply_sales(
+                queryset.only('sale_date', 'product', 'seller', 'payment_method', 'quantity', 'total_amount', 'profit'),
+                sign=-1,
+            )
+            invalidate_dashboards()
+            queryset.delete()
+
+@admin.register(SaleArchive)
+class SaleArchiveAdmin(admin.ModelAdmin):
+    list_display = ['month', 'row_count', 'total_sales', 'archived_at']
+    readonly_fields = ['month', 'row_count', 'total_sales', 'archived_at']
+
+    def has_add_permission(self, request):
+        # Archives are only written by the archive_sales command
+        return False
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ['id', 'product', 'delta', 'reason', 'user', 'created_at']
+    list_filter = ['reason', ProductNameFilter]
+    list_select_related = ['product', 'user']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    # The ledger is append-only and written by the stock code paths
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ReorderPointChange)
+class ReorderPointChangeAdmin(admin.ModelAdmin):
+    list_display = ['product', 'previous_level', 'new_level', 'velocity', 'changed_at']
+    list_select_related = ['product']
+
+    # Written by the forecast's apply step only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
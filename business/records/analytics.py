@@ -0,0 +1,337 @@
+# records/analytics.py
+"""
+Columnar in-memory analytics over sales.
+
+``SalesCube`` keeps every sale as NumPy columns (timestamp, dense product /
+seller / category / payment codes, quantity, amount, profit). Group-bys
+are answered by combining the dimension codes into one integer key and
+summing with ``np.bincount``, so a query is a few vectorised passes over
+the columns instead of an ORM re-aggregation of raw rows.
+
+The cube refreshes incrementally by loading only sales with an id above
+the last one it has seen, at most every ``refresh_interval`` seconds.
+Sales that commit out of id order, and edits to or deletes of
+already-loaded sales, are picked up by ``reload()``, which runs once
+``max_age`` passes (so that is how stale the cube can get) and reads
+archived months straight from their stored chunks. Both build new
+columns aside and swap them in, so a query never sees a partial cube.
+
+Time dimensions bucket each sale by the current time zone's offset at
+that sale's own moment, so days and hours stay right across DST changes.
+"""
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from django.utils import timezone
+
+from .archive import archive_chunks
+from .models import Product, Sale, SaleArchive
+
+DIMENSIONS = ('category', 'product', 'seller', 'payment_method', 'hour', 'weekday', 'day', 'week', 'month')
+METRICS = ('count', 'quantity', 'total_sales', 'total_profit')
+CATEGORY_CODES = [code for code, _ in Product.CATEGORY_CHOICES]
+PAYMENT_CODES = [code for code, _ in Sale.PAYMENT_METHODS]
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+# Above this many possible groups, fall back from bincount to np.unique
+DENSE_KEY_LIMIT = 4_000_000
+LOAD_CHUNK_SIZE = 20_000
+TIME_DIMENSIONS = {'hour', 'weekday', 'day', 'week', 'month'}
+REFRESH_INTERVAL = 5
+
+
+def local_offsets(ts, tz=None):
+    """
+    UTC offset in seconds of each Unix timestamp in ``ts`` for ``tz``
+    (default: the current time zone). The zone is asked once at each end
+    of every distinct UTC day, and per sale only on days it changes offset.
+    """
+    tz = tz or timezone.get_current_timezone()
+
+    def offset(seconds):
+        return int(datetime.fromtimestamp(seconds, tz).utcoffset().total_seconds())
+
+    days, inverse = np.unique(ts // 86400, return_inverse=True)
+    starts = np.asarray([offset(day * 86400) for day in days.tolist()], dtype=np.int64)
+    ends = np.asarray([offset(day * 86400 + 86399) for day in days.tolist()], dtype=np.int64)
+    offsets = starts[inverse.ravel()]
+    changing = np.flatnonzero((starts != ends)[inverse.ravel()])
+    if len(changing):
+        offsets[changing] = [offset(seconds) for seconds in ts[changing].tolist()]
+    return offsets
+
+
+class SalesCube:
+    def __init__(self, max_age=3600, refresh_interval=REFRESH_INTERVAL):
+        self.max_age = max_age
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self.last_id = 0
+        self.loaded_at = None
+        self.checked_at = None
+        # Dense codes are never reassigned, not even by reload(), so whichever
+        # columns a reader holds, these lists still label them correctly
+        self.product_ids, self.seller_ids = [], []
+        self._product_index, self._seller_index = {}, {}
+        self.columns = self._empty_columns()
+
+    @staticmethod
+    def _empty_columns():
+        return {
+            'ts': np.empty(0, dtype=np.int64),
+            'product': np.empty(0, dtype=np.int32),
+            'category': np.empty(0, dtype=np.int8),
+            'seller': np.empty(0, dtype=np.int32),
+            'payment_method': np.empty(0, dtype=np.int8),
+            'quantity': np.empty(0, dtype=np.int64),
+            'total_sales': np.empty(0, dtype=np.float64),
+            'total_profit': np.empty(0, dtype=np.float64),
+        }
+
+    def __len__(self):
+        return len(self.columns['ts'])
+
+    # -- loading -----------------------------------------------------------
+
+    def reload(self):
+        """Rebuild the cube from the archives and the Sale table."""
+        with self._lock:
+            parts = [self._empty_columns()]
+            for archive in SaleArchive.objects.all():
+                for data in archive_chunks(archive):
+                    parts.append(self._archive_chunk_columns(data))
+            fresh, last_id = self._new_sale_columns(0)
+            parts.append(fresh)
+            # Built aside and swapped in at once: readers keep the old cube meanwhile
+            self.columns = {
+                name: np.concatenate([part[name] for part in parts]) for name in parts[0]
+            }
+            self.last_id = last_id
+            self.loaded_at = self.checked_at = time.monotonic()
+
+    def refresh(self, force=False):
+        """
+        Append sales created since the last refresh (full reload once stale).
+
+        Only ids above the highest one loaded are read, so a sale that
+        commits after a higher id was loaded, and edits to or deletes of
+        loaded sales, are missing or stale until the next ``reload()``: at
+        most ``max_age`` seconds.
+        """
+        now = time.monotonic()
+        if not force and self.checked_at is not None and now - self.checked_at < self.refresh_interval:
+            return
+        if self.loaded_at is None or now - self.loaded_at > self.max_age:
+            self.reload()
+            return
+        with self._lock:
+            fresh, last_id = self._new_sale_columns(self.last_id)
+            if len(fresh['ts']):
+                # Build new arrays, then swap them in, so readers never see a half-appended cube
+                self.columns = {
+                    name: np.concatenate([column, fresh[name]]) for name, column in self.columns.items()
+                }
+            self.last_id = last_id
+            self.checked_at = time.monotonic()
+
+    def _dense(self, index, ids, value):
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(ids)
+            ids.append(value)
+        return code
+
+    def _new_sale_columns(self, after_id):
+        """Columns of the sales with an id above ``after_id``, and the highest id read."""
+        rows = (
+            Sale.objects.filter(id__gt=after_id)
+            .order_by('id')
+            .values_list('id', 'sale_date', 'product_id', 'product__category_name', 'seller_id',
+                         'payment_method', 'quantity', 'total_amount', 'profit')
+            .iterator(chunk_size=LOAD_CHUNK_SIZE)
+        )
+        categories = {code: i for i, code in enumerate(CATEGORY_CODES)}
+        payments = {code: i for i, code in enumerate(PAYMENT_CODES)}
+        empty = self._empty_columns()
+        fresh = {name: [] for name in empty}
+        last_id = after_id
+        for sale_id, sale_date, product_id, category, seller_id, method, quantity, total, profit in rows:
+            fresh['ts'].append(int(sale_date.timestamp()))
+            fresh['product'].append(self._dense(self._product_index, self.product_ids, product_id))
+            fresh['category'].append(categories.get(category, 0))
+            fresh['seller'].append(self._dense(self._seller_index, self.seller_ids, seller_id))
+            fresh['payment_method'].append(payments.get(method, 0))
+            fresh['quantity'].append(quantity)
+            fresh['total_sales'].append(float(total or 0))
+            fresh['total_profit'].append(float(profit or 0))
+            last_id = sale_id
+        return {name: np.asarray(fresh[name], dtype=column.dtype) for name, column in empty.items()}, last_id
+
+    def _archive_chunk_columns(self, data):
+        product_ids, product_inverse = np.unique(data['product_id'], return_inverse=True)
+        seller_ids, seller_inverse = np.unique(data['seller_id'], return_inverse=True)
+        product_codes = np.asarray([self._dense(self._product_index, self.product_ids, pk)
+                                    for pk in product_ids.tolist()], dtype=np.int32)
+        seller_codes = np.asarray([self._dense(self._seller_index, self.seller_ids, pk)
+                                   for pk in seller_ids.tolist()], dtype=np.int32)
+        categories = dict(Product.objects.filter(pk__in=product_ids.tolist()).values_list('id', 'category_name'))
+        product_categories = np.asarray([CATEGORY_CODES.index(categories[pk]) if categories.get(pk) in CATEGORY_CODES else 0
+                                         for pk in product_ids.tolist()], dtype=np.int8)
+        method_codes, method_inverse = np.unique(data['payment_method'], return_inverse=True)
+        methods = np.asarray([PAYMENT_CODES.index(code) if code in PAYMENT_CODES else 0
+                              for code in method_codes.tolist()], dtype=np.int8)
+        fresh = {
+            'ts': data['sale_date'] // 1_000_000,
+            'product': product_codes[product_inverse],
+            'category': product_categories[product_inverse],
+            'seller': seller_codes[seller_inverse],
+            'payment_method': methods[method_inverse],
+            'quantity': data['quantity'],
+            'total_sales': data['total_amount'] / 100,
+            'total_profit': data['profit'] / 100,
+        }
+        return {name: fresh[name].astype(column.dtype) for name, column in self._empty_columns().items()}
+
+    # -- querying ----------------------------------------------------------
+
+    def _dimension_codes(self, columns, dimension, offsets):
+        """Return (codes, size, labeller) for one group-by dimension."""
+        if dimension in ('category', 'payment_method', 'product', 'seller'):
+            sizes = {
+                'category': len(CATEGORY_CODES), 'payment_method': len(PAYMENT_CODES),
+                'product': len(self.product_ids), 'seller': len(self.seller_ids),
+            }
+            labels = {
+                'category': CATEGORY_CODES, 'payment_method': PAYMENT_CODES,
+                'product': self.product_ids, 'seller': self.seller_ids,
+            }[dimension]
+            return columns[dimension].astype(np.int64), max(sizes[dimension], 1), labels.__getitem__
+
+        local = columns['ts'] + offsets
+        days = local // 86400
+        if dimension == 'hour':
+            return (local % 86400) // 3600, 24, int
+        if dimension == 'weekday':
+            # 1970-01-01 was a Thursday
+            return (days + 3) % 7, 7, WEEKDAYS.__getitem__
+        if dimension == 'day':
+            first = int(days.min()) if len(days) else 0
+            return days - first, int(days.max() - first + 1) if len(days) else 1, \
+                lambda code: str(np.datetime64(first + int(code), 'D'))
+        if dimension == 'week':
+            weeks = (days + 3) // 7  # Monday-based weeks
+            first = int(weeks.min()) if len(weeks) else 0
+            return weeks - first, int(weeks.max() - first + 1) if len(weeks) else 1, \
+                lambda code: str(np.datetime64((first + int(code)) * 7 - 3, 'D'))
+        if dimension == 'month':
+            months = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+            first = int(months.min()) if len(months) else 0
+            return months - first, int(months.max() - first + 1) if len(months) else 1, \
+                lambda code: str(np.datetime64(first + int(code), 'M'))
+        raise ValueError(f'Unknown dimension {dimension!r}; choose from {", ".join(DIMENSIONS)}')
+
+    def aggregate(self, group_by=(), start=None, end=None, limit=None, order_by='total_sales'):
+        """
+        Group sales by ``group_by`` dimensions within ``[start, end)``.
+
+        Returns rows of dimension labels plus count, quantity, total_sales,
+        total_profit and margin (profit / sales), ordered by ``order_by``
+        descending.
+        """
+        if order_by not in METRICS:
+            raise ValueError(f'Unknown metric {order_by!r}; choose from {", ".join(METRICS)}')
+        if limit is not None and limit < 0:
+            raise ValueError('limit must be zero (no limit) or more')
+        columns = self.columns
+        if start is not None or end is not None:
+            mask = np.ones(len(columns['ts']), dtype=bool)
+            if start is not None:
+                mask &= columns['ts'] >= int(start.timestamp())
+            if end is not None:
+                mask &= columns['ts'] < int(end.timestamp())
+            columns = {name: column[mask] for name, column in columns.items()}
+
+        offsets = local_offsets(columns['ts']) if TIME_DIMENSIONS.intersection(group_by) else None
+        codes, sizes, labellers = [], [], []
+        for dimension in group_by:
+            dimension_codes, size, labeller = self._dimension_codes(columns, dimension, offsets)
+            codes.append(dimension_codes)
+            sizes.append(size)
+            labellers.append(labeller)
+
+        n = len(columns['ts'])
+        if codes:
+            keys = np.ravel_multi_index(codes, sizes)
+            space = int(np.prod(sizes, dtype=np.int64))
+        else:
+            keys, space = np.zeros(n, dtype=np.int64), 1
+        if space > DENSE_KEY_LIMIT:
+            groups, keys = np.unique(keys, return_inverse=True)
+            space = len(groups)
+        else:
+            groups = None
+
+        sums = {
+            'count': np.bincount(keys, minlength=space),
+            'quantity': np.bincount(keys, weights=columns['quantity'], minlength=space),
+            'total_sales': np.bincount(keys, weights=columns['total_sales'], minlength=space),
+            'total_profit': np.bincount(keys, weights=columns['total_profit'], minlength=space),
+        }
+        present = np.flatnonzero(sums['count'])
+        present = present[np.argsort(-sums[order_by][present], kind='stable')]
+        if limit:
+            present = present[:limit]
+
+        group_keys = groups[present] if groups is not None else present
+        unravelled = np.unravel_index(group_keys, sizes) if codes else []
+        results = []
+        for position, slot in enumerate(present):
+            row = {dimension: labellers[i](unravelled[i][position]) for i, dimension in enumerate(group_by)}
+            total_sales = float(sums['total_sales'][slot])
+            total_profit = float(sums['total_profit'][slot])
+            row.update({
+                'count': int(sums['count'][slot]),
+                'quantity': int(sums['quantity'][slot]),
+                'total_sales': round(total_sales, 2),
+                'total_profit': round(total_profit, 2),
+                'margin': round(total_profit / total_sales, 4) if total_sales else None,
+            })
+            results.append(row)
+        return results
+
+    def seller_cohorts(self, period='month'):
+        """
+        Revenue curves for seller cohorts.
+
+        Sellers are grouped by the period of their first sale; each cohort's
+        curve is its total sales in period 0, 1, 2... after joining.
+        """
+        if period not in ('week', 'month'):
+            raise ValueError("period must be 'week' or 'month'")
+        columns = self.columns
+        if not len(columns['ts']):
+            return []
+        periods, _, labeller = self._dimension_codes(columns, period, local_offsets(columns['ts']))
+
+        first = np.full(max(len(self.seller_ids), 1), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first, columns['seller'], periods)
+        cohort = first[columns['seller']]
+        age = periods - cohort
+        last_period = int(periods.max())
+        horizon = last_period + 1
+        revenue = np.bincount(cohort * horizon + age, weights=columns['total_sales'],
+                              minlength=horizon * horizon).reshape(horizon, horizon)
+        sizes = np.bincount(first[first != np.iinfo(np.int64).max], minlength=horizon)
+
+        return [
+            {
+                'cohort': labeller(code),
+                'sellers': int(sizes[code]),
+                'revenue': [round(float(value), 2) for value in revenue[code, :last_period - code + 1]],
+            }
+            for code in np.flatnonzero(sizes)
+        ]
+
+
+sales_cube = SalesCube()
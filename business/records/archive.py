@@ -0,0 +1,194 @@
+# records/archive.py
+"""
+Cold storage for closed months of sales.
+
+``archive_month()`` packs the sales of a month into compressed ``.npz``
+chunks of ``ARCHIVE_CHUNK_ROWS`` sales (one NumPy array per column, money
+as integer cents) stored as ``SaleArchiveChunk`` rows, and deletes those
+rows from the Sale table, so the hot table and its indexes only hold
+recent trading. The chunks live in the database rather than on local
+disk, so every web instance and worker sees them and they survive
+redeploys; working a chunk at a time keeps memory flat however big the
+month. Rollups for archived days are left in place, so the profit/loss
+report and leaderboard are unaffected; exports and the analytics cube
+read the chunks back through ``archived_sale_rows()`` and
+``archive_chunks()``.
+"""
+import io
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Product, Sale, SaleArchive, SaleArchiveChunk
+
+User = get_user_model()
+
+ARCHIVE_COLUMNS = (
+    'id', 'sale_date', 'product_id', 'seller_id', 'quantity',
+    'sale_price', 'total_amount', 'profit', 'payment_method',
+)
+MONEY_COLUMNS = ('sale_price', 'total_amount', 'profit')
+# Export fields that are joined in from the live product/user tables
+LOOKUP_FIELDS = {
+    'product__name': ('product_id', Product, 'name'),
+    'product__category_name': ('product_id', Product, 'category_name'),
+    'seller__username': ('seller_id', User, 'username'),
+}
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+# Sales per stored chunk: the most archiving or an export holds in memory at once
+ARCHIVE_CHUNK_ROWS = 50_000
+# Stays under SQLite's bound-parameter limit
+DELETE_BATCH_SIZE = 500
+
+
+def month_bounds(month):
+    """Aware [start, end) datetimes of the month starting on ``month``."""
+    next_month = SaleArchive(month=month).next_month
+    tz = timezone.get_current_timezone()
+    return (timezone.make_aware(datetime.combine(month, time.min), tz),
+            timezone.make_aware(datetime.combine(next_month, time.min), tz))
+
+
+def archivable_months(keep_months=3, today=None):
+    """First days of months that still have hot sales but end before the last ``keep_months``."""
+    today = today or timezone.localdate()
+    cutoff = today.replace(day=1)
+    for _ in range(keep_months - 1):
+        cutoff = (cutoff - timedelta(days=1)).replace(day=1)
+    return list(Sale.objects.filter(sale_date__lt=month_bounds(cutoff)[0]).dates('sale_date', 'month'))
+
+
+def read_chunk(data):
+    """Load one stored chunk as a dict of column arrays."""
+    with np.load(io.BytesIO(bytes(data))) as columns:
+        return {name: columns[name] for name in ARCHIVE_COLUMNS}
+
+
+def archive_chunks(archive):
+    """Yield an archived month's chunks as dicts of column arrays, one chunk in memory at a time."""
+    for data in archive.chunks.order_by('seq').values_list('data', flat=True).iterator(chunk_size=1):
+        yield read_chunk(data)
+
+
+def _pack(columns):
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **columns)
+    return buffer.getvalue()
+
+
+def _columns(rows):
+    columns = dict(zip(ARCHIVE_COLUMNS, zip(*rows))) if rows else {name: () for name in ARCHIVE_COLUMNS}
+    arrays = {
+        'id': np.asarray(columns['id'], dtype=np.int64),
+        'sale_date': np.asarray([(moment - EPOCH) // MICROSECOND for moment in columns['sale_date']], dtype=np.int64),
+        'product_id': np.asarray(columns['product_id'], dtype=np.int64),
+        'seller_id': np.asarray(columns['seller_id'], dtype=np.int64),
+        'quantity': np.asarray(columns['quantity'], dtype=np.int64),
+        'payment_method': np.asarray(columns['payment_method'], dtype='U20'),
+    }
+    for name in MONEY_COLUMNS:
+        arrays[name] = np.asarray([int((value or Decimal(0)).scaleb(2)) for value in columns[name]], dtype=np.int64)
+    return arrays
+
+
+def archive_month(month):
+    """
+    Move the hot sales of ``month`` into its archive.
+
+    Sales are packed ``ARCHIVE_CHUNK_ROWS`` at a time; each chunk is saved,
+    read back from the database and, only if that copy matches, its sales
+    are deleted, all in one transaction, so a failure leaves every sale in
+    place. Re-archiving a month (e.g. after a late backdated sale) appends
+    the new sales as further chunks. Returns the number of rows moved.
+    """
+    start, end = month_bounds(month)
+    with transaction.atomic():
+        hot = Sale.objects.filter(sale_date__gte=start, sale_date__lt=end).order_by('sale_date', 'id')
+        if not hot.exists():
+            return 0
+        archive = SaleArchive.objects.select_for_update().filter(month=month).first()
+        if archive is None:
+            archive = SaleArchive.objects.create(month=month)
+        seq = archive.chunks.count()
+        moved = 0
+        while True:
+            # Each batch's sales are deleted below, so the next batch starts after it
+            rows = list(hot.values_list(*ARCHIVE_COLUMNS)[:ARCHIVE_CHUNK_ROWS])
+            if not rows:
+                break
+            columns = _columns(rows)
+            chunk = SaleArchiveChunk.objects.create(archive=archive, seq=seq, row_count=len(rows), data=_pack(columns))
+            stored = read_chunk(SaleArchiveChunk.objects.values_list('data', flat=True).get(pk=chunk.pk))
+            if not all(np.array_equal(stored[name], columns[name]) for name in ARCHIVE_COLUMNS):
+                raise RuntimeError(f'Archive of {month:%Y-%m} did not read back intact; sales left in place')
+            _delete_sales([row[0] for row in rows])
+            archive.row_count += len(rows)
+            archive.total_sales += Decimal(int(columns['total_amount'].sum())).scaleb(-2)
+            seq += 1
+            moved += len(rows)
+        archive.save()
+    return moved
+
+
+def _delete_sales(ids):
+    # Raw delete by id: archived rows are not "deleted" for rollups or sync
+    # clients, and a sale saved into the month meanwhile stays hot
+    with connection.cursor() as cursor:
+        for offset in range(0, len(ids), DELETE_BATCH_SIZE):
+            batch = ids[offset:offset + DELETE_BATCH_SIZE]
+            cursor.execute(
+                f"DELETE FROM {Sale._meta.db_table} WHERE id IN ({', '.join(['%s'] * len(batch))})",
+                batch,
+            )
+
+
+def archived_sale_rows(fields, start=None, end=None, seller_ids=None):
+    """
+    Yield archived sales in ``[start, end)`` as tuples of ``fields``.
+
+    ``fields`` may be archive columns or the product/seller lookups in
+    ``LOOKUP_FIELDS``, so exports can use the same field list as their
+    ``values_list()`` over the hot table. ``seller_ids`` restricts sellers.
+    """
+    archives = SaleArchive.objects.all()
+    if start is not None:
+        archives = archives.filter(month__gte=timezone.localtime(start).date().replace(day=1))
+    if end is not None:
+        archives = archives.filter(month__lt=timezone.localtime(end).date())
+
+    for archive in archives:
+        for columns in archive_chunks(archive):
+            yield from _chunk_rows(columns, fields, start, end, seller_ids)
+
+
+def _chunk_rows(columns, fields, start, end, seller_ids):
+    mask = np.ones(len(columns['id']), dtype=bool)
+    if start is not None:
+        mask &= columns['sale_date'] >= (start - EPOCH) // MICROSECOND
+    if end is not None:
+        mask &= columns['sale_date'] < (end - EPOCH) // MICROSECOND
+    if seller_ids is not None:
+        mask &= np.isin(columns['seller_id'], list(seller_ids))
+    columns = {name: column[mask] for name, column in columns.items()}
+    if not len(columns['id']):
+        return
+
+    values = []
+    for field in fields:
+        if field in LOOKUP_FIELDS:
+            source, model, attribute = LOOKUP_FIELDS[field]
+            names = dict(model.objects.filter(pk__in=np.unique(columns[source]).tolist()).values_list('pk', attribute))
+            values.append([names.get(pk) for pk in columns[source].tolist()])
+        elif field == 'sale_date':
+            values.append([EPOCH + value * MICROSECOND for value in columns['sale_date'].tolist()])
+        elif field in MONEY_COLUMNS:
+            values.append([Decimal(value).scaleb(-2) for value in columns[field].tolist()])
+        else:
+            values.append(columns[field].tolist())
+    yield from zip(*values)
+
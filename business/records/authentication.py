@@ -0,0 +1,172 @@
+# records/authentication.py
+"""
+Stateless signed API tokens.
+
+A token is ``django.core.signing`` output over the user id, username,
+role, issue time and a random id (``jti``), signed with ``SECRET_KEY``
+and timestamped, so verifying one is an HMAC and a JSON decode: no
+session read and no user fetch. The authenticated user is an unsaved
+``User`` built from the claims, which is enough for ``role`` checks and
+for use as a foreign key value; it must never be saved.
+
+Revocations are stored in ``RevokedToken`` and mirrored in memory by
+``revocation_list``, which re-reads the (small) table at most every
+``REVOCATION_REFRESH_SECONDS``. A revocation takes effect at once in
+the process that made it and within that interval everywhere else.
+
+``EventSource`` cannot send an ``Authorization`` header, and a token in
+a URL ends up in access logs, so the live-events stream takes a stream
+ticket instead: signed like a token but valid for
+``STREAM_TICKET_TTL_SECONDS`` and for one use, tracked in the shared
+``stream-tickets`` cache.
+"""
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from rest_framework import authentication, exceptions
+
+from .models import RevokedToken
+
+User = get_user_model()
+
+TOKEN_SALT = 'records.api-token'
+TOKEN_KEYWORD = 'Bearer'
+REVOCATION_REFRESH_SECONDS = 15
+STREAM_TICKET_SALT = 'records.stream-ticket'
+STREAM_TICKET_TTL_SECONDS = 30
+STREAM_TICKET_CACHE_ALIAS = 'stream-tickets'
+
+
+def issue_token(user):
+    """Return ``(token, expires_at)`` for ``user``."""
+    issued_at = time.time()
+    claims = {
+        'uid': user.pk,
+        'usr': user.get_username(),
+        'role': user.role,
+        'iat': round(issued_at, 3),
+        'jti': secrets.token_hex(16),
+    }
+    token = signing.dumps(claims, salt=TOKEN_SALT)
+    expires_at = datetime.fromtimestamp(issued_at, dt_timezone.utc) + timedelta(seconds=settings.API_TOKEN_TTL_SECONDS)
+    return token, expires_at
+
+
+def token_expiry(claims):
+    return datetime.fromtimestamp(claims['iat'], dt_timezone.utc) + timedelta(seconds=settings.API_TOKEN_TTL_SECONDS)
+
+
+class RevocationList:
+    def __init__(self, refresh_seconds=REVOCATION_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self.loaded_at = None
+        self.tokens = frozenset()
+        # user id -> tokens issued at or before this timestamp are revoked
+        self.users = {}
+
+    def refresh(self, force=False):
+        if not force and self.loaded_at is not None and time.monotonic() - self.loaded_at < self.refresh_seconds:
+            return
+        with self._lock:
+            tokens, users = set(), {}
+            rows = RevokedToken.objects.filter(expires_at__gt=timezone.now()).values_list('jti', 'user_id', 'revoked_at')
+            for jti, user_id, revoked_at in rows:
+                if jti:
+                    tokens.add(jti)
+                else:
+                    users[user_id] = max(users.get(user_id, 0), revoked_at.timestamp())
+            # Swap whole objects so readers never see a half-built list
+            self.tokens, self.users = frozenset(tokens), users
+            self.loaded_at = time.monotonic()
+
+    def is_revoked(self, claims):
+        self.refresh()
+        return claims['jti'] in self.tokens or claims['iat'] <= self.users.get(claims['uid'], 0)
+
+    def revoke(self, claims):
+        RevokedToken.objects.revoke(claims['jti'], claims['uid'], token_expiry(claims))
+        self.refresh(force=True)
+
+    def revoke_user(self, user_id):
+        RevokedToken.objects.revoke_user(user_id)
+        self.refresh(force=True)
+
+
+revocation_list = RevocationList()
+
+
+def user_from_token(token):
+    """Return ``(user, claims)`` for a valid token; raise AuthenticationFailed otherwise."""
+    try:
+        claims = signing.loads(token, salt=TOKEN_SALT, max_age=settings.API_TOKEN_TTL_SECONDS)
+    except signing.SignatureExpired:
+        raise exceptions.AuthenticationFailed('Token has expired')
+    except signing.BadSignature:
+        raise exceptions.AuthenticationFailed('Invalid token')
+    if revocation_list.is_revoked(claims):
+        raise exceptions.AuthenticationFailed('Token has been revoked')
+    return _user_from_claims(claims), claims
+
+
+def _user_from_claims(claims):
+    user = User(pk=claims['uid'], username=claims['usr'], role=claims['role'])
+    user._state.adding = False
+    user._state.db = DEFAULT_DB_ALIAS
+    return user
+
+
+def issue_stream_ticket(claims):
+    """Return ``(ticket, expires_at)``: one live-events connection for the holder of token ``claims``."""
+    issued_at = time.time()
+    ticket = signing.dumps({
+        'uid': claims['uid'],
+        'usr': claims['usr'],
+        'role': claims['role'],
+        # The token it was issued for, so revoking that token voids the ticket too
+        'tok': [claims['jti'], claims['iat']],
+        'jti': secrets.token_hex(16),
+    }, salt=STREAM_TICKET_SALT)
+    return ticket, datetime.fromtimestamp(issued_at, dt_timezone.utc) + timedelta(seconds=STREAM_TICKET_TTL_SECONDS)
+
+
+def user_from_stream_ticket(ticket):
+    """Return the user of a valid, unused stream ticket (using it up); raise AuthenticationFailed otherwise."""
+    try:
+        claims = signing.loads(ticket, salt=STREAM_TICKET_SALT, max_age=STREAM_TICKET_TTL_SECONDS)
+    except signing.BadSignature:  # includes SignatureExpired
+        raise exceptions.AuthenticationFailed('Invalid or expired stream ticket')
+    token_jti, token_iat = claims['tok']
+    if revocation_list.is_revoked({'jti': token_jti, 'iat': token_iat, 'uid': claims['uid']}):
+        raise exceptions.AuthenticationFailed('Token has been revoked')
+    # add() only succeeds for the first use, whichever process serves it
+    if not caches[STREAM_TICKET_CACHE_ALIAS].add(f"stream-ticket:{claims['jti']}", True, STREAM_TICKET_TTL_SECONDS):
+        raise exceptions.AuthenticationFailed('Stream ticket has already been used')
+    return _user_from_claims(claims)
+
+
+class SignedTokenAuthentication(authentication.BaseAuthentication):
+    """``Authorization: Bearer <token>``, checked without touching the database."""
+
+    def authenticate(self, request):
+        header = authentication.get_authorization_header(request).split()
+        if not header or header[0].lower() != TOKEN_KEYWORD.lower().encode():
+            return None
+        if len(header) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header')
+        try:
+            token = header[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Invalid token header')
+        return user_from_token(token)
+
+    def authenticate_header(self, request):
+        return TOKEN_KEYWORD
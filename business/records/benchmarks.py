@@ -0,0 +1,172 @@
+# records/benchmarks.py
+"""
+Endpoint benchmark harness.
+
+Each scale gets a throwaway test database seeded by ``BusinessSeeder``;
+every hot endpoint is then requested through the full middleware stack and
+measured for latency percentiles, queries per request and peak Python
+memory. Results are plain JSON so they can be stored as a baseline and
+compared on later runs.
+
+The gated numbers are cold: every cache is cleared before each measured
+request, so a cached endpoint cannot hide a slow or query-heavy miss path.
+Warm numbers (caches left filled) are recorded under ``warm`` for
+reference. Request metrics sampling is off for the whole run.
+"""
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import Product
+from .seeding import BusinessSeeder, SeedConfig
+
+User = get_user_model()
+
+# name -> (method, path, role); sale_create posts a one-unit sale
+ENDPOINTS = {
+    'product_list': ('get', '/api/products/', 'SELLER'),
+    'low_stock': ('get', '/api/products/low_stock/', 'SELLER'),
+    'sale_create': ('post', '/api/sales/', 'SELLER'),
+    'sale_list': ('get', '/api/sales/?page_size=50', 'BOSS'),
+    'profit_loss_report': ('get', '/api/profit_loss_report/', 'BOSS'),
+}
+
+# Latency is noisy at the low end, so a slowdown must also exceed this
+LATENCY_SLACK_MS = 2.0
+# p95 varies a lot between machines, so by default it only warns past this
+LATENCY_THRESHOLD = 0.5
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class EndpointBenchmark:
+    def __init__(self, iterations=30, warmup=3):
+        self.iterations = iterations
+        self.warmup = warmup
+
+    def run_scale(self, sales, seed=42, log=lambda message: None):
+        """Seed a fresh test database with ``sales`` sales and measure every endpoint."""
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            config = SeedConfig(seed=seed, sales=sales, products=max(100, min(sales // 100, 5000)),
+                                end_date=timezone.localdate())
+            BusinessSeeder(config, log=log).run()
+            # Sampled requests would pay for query recording and Server-Timing
+            with override_settings(REQUEST_METRICS_SAMPLE_RATE=0):
+                return {name: self.measure(name) for name in ENDPOINTS}
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def measure(self, name):
+        method, path, role = ENDPOINTS[name]
+        client = APIClient()
+        client.force_authenticate(User.objects.filter(role=role).order_by('id').first())
+        data = None
+        if name == 'sale_create':
+            product = Product.objects.filter(is_active=True).order_by('id').first()
+            Product.objects.filter(pk=product.pk).update(stock_quantity=10**9)
+            data = {'product': product.pk, 'quantity': 1, 'sale_price': str(product.price)}
+
+        def request():
+            if method == 'post':
+                response = client.post(path, data, format='json', secure=True)
+            else:
+                response = client.get(path, secure=True)
+            assert response.status_code < 400, f'{name}: HTTP {response.status_code}'
+            return response
+
+        def clear_caches():
+            for cache in caches.all():
+                cache.clear()
+
+        def timed(cold):
+            timings = []
+            for _ in range(self.iterations):
+                if cold:
+                    clear_caches()
+                start = time.perf_counter()
+                request()
+                timings.append((time.perf_counter() - start) * 1000)
+            return timings
+
+        def count_queries(cold):
+            if cold:
+                clear_caches()
+            with CaptureQueriesContext(connection) as queries:
+                request()
+            # Read now: the next request's request_started clears the query log
+            return len(queries)
+
+        for _ in range(self.warmup):
+            request()
+
+        warm_timings = timed(cold=False)
+        warm_queries = count_queries(cold=False)
+        timings = timed(cold=True)
+        query_count = count_queries(cold=True)
+
+        clear_caches()
+        tracemalloc.start()
+        try:
+            request()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(_percentile(timings, 0.95), 3),
+            'p99_ms': round(_percentile(timings, 0.99), 3),
+            'queries': query_count,
+            'peak_kb': round(peak / 1024, 1),
+            'warm': {
+                'p50_ms': round(statistics.median(warm_timings), 3),
+                'p95_ms': round(_percentile(warm_timings, 0.95), 3),
+                'queries': warm_queries,
+            },
+        }
+
+
+def compare_results(baseline, results, latency_threshold=LATENCY_THRESHOLD, memory_threshold=0.25,
+                    gate_latency=False):
+    """
+    Return ``(regressions, warnings)`` of ``results`` against ``baseline``.
+
+    Both map scale -> endpoint -> metrics; only the cold metrics are
+    compared, not ``warm``. Query counts may never grow and
+    peak memory may grow by at most ``memory_threshold``; both are hard
+    regressions. p95 latency past ``latency_threshold`` is only a warning,
+    since it depends on the machine, unless ``gate_latency`` is set.
+    Scales or endpoints missing from the baseline are not compared.
+    """
+    regressions, warnings = [], []
+    for scale, endpoints in results.items():
+        for name, current in endpoints.items():
+            previous = baseline.get(scale, {}).get(name)
+            if previous is None:
+                continue
+            label = f'{name} @ {scale}'
+            if current['queries'] > previous['queries']:
+                regressions.append(f"{label}: queries {previous['queries']} -> {current['queries']}")
+            limit = previous['p95_ms'] * (1 + latency_threshold)
+            if current['p95_ms'] > limit and current['p95_ms'] - previous['p95_ms'] > LATENCY_SLACK_MS:
+                (regressions if gate_latency else warnings).append(
+                    f"{label}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms"
+                )
+            if current['peak_kb'] > previous['peak_kb'] * (1 + memory_threshold):
+                regressions.append(f"{label}: peak memory {previous['peak_kb']}KB -> {current['peak_kb']}KB")
+    return regressions, warnings
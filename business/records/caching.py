@@ -0,0 +1,53 @@
+# records/caching.py
+from django.core.cache import cache
+from django.db import transaction
+
+LOW_STOCK_CACHE_KEY = 'records:low_stock'
+# Caches are per process, so this bounds how stale other workers can be
+LOW_STOCK_CACHE_TIMEOUT = 60
+
+# Catalog payloads are keyed by catalog version, so they never go stale;
+# the timeout only evicts versions nobody asks for any more
+CATALOG_CACHE_TIMEOUT = 300
+
+# Leaderboards are only keyed by their parameters, so this is the staleness bound
+LEADERBOARD_CACHE_TIMEOUT = 30
+
+# Dashboards are dropped on every sale or stock write; the timeout bounds
+# what other processes (whose caches we can't reach) may serve
+DASHBOARD_CACHE_TIMEOUT = 20
+DASHBOARD_GENERATION_KEY = 'records:dashboard:generation'
+
+
+def catalog_cache_key(version, full_path):
+    return f'records:catalog:{version}:{full_path}'
+
+
+def invalidate_stock_caches():
+    """Drop stock-derived cache entries once the current transaction commits."""
+    transaction.on_commit(lambda: cache.delete(LOW_STOCK_CACHE_KEY))
+    # Every dashboard shows low stock
+    invalidate_dashboards()
+
+
+def dashboard_cache_key(role, user_id):
+    """Role dashboards are shared, except sellers', which are per seller."""
+    generation = cache.get_or_set(DASHBOARD_GENERATION_KEY, 0, None)
+    scope = f'{role}:{user_id}' if role == 'SELLER' else role
+    return f'records:dashboard:{generation}:{scope}'
+
+
+def _next_dashboard_generation():
+    try:
+        cache.incr(DASHBOARD_GENERATION_KEY)
+    except ValueError:
+        cache.set(DASHBOARD_GENERATION_KEY, 1, None)
+
+
+def invalidate_dashboards():
+    """Retire every cached dashboard (all roles and sellers) once the current transaction commits."""
+    transaction.on_commit(_next_dashboard_generation)
+
+
+def leaderboard_cache_key(period, today, page, page_size):
+    return f'records:leaderboard:{period}:{today.isoformat()}:{page}:{page_size}'
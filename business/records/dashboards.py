@@ -0,0 +1,113 @@
+# records/dashboards.py
+"""
+One-request dashboard payloads for the Boss, Manager and Seller screens.
+
+Each part is a single query (most of them over the daily rollups or the
+low-stock partial index), so a cold Boss dashboard costs six queries and
+a Seller's three. The view caches the result per role, or per seller for
+``SELLER``, and every sale or stock write retires the cached payloads.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import DailySalesRollup, Product, Sale
+from .reports import low_stock_summary, profit_loss_summary, seller_leaderboard
+
+User = get_user_model()
+
+DASHBOARD_ROLES = ('BOSS', 'MANAGER', 'SELLER')
+RECENT_SALES_LIMIT = 10
+DASHBOARD_SELLERS_LIMIT = 5
+
+
+def recent_sales(seller=None, limit=RECENT_SALES_LIMIT):
+    sales = Sale.objects.order_by('-sale_date', '-id')
+    if seller is not None:
+        sales = sales.filter(seller=seller)
+    return [
+        {
+            'id': row['id'],
+            'sale_date': row['sale_date'],
+            'product_name': row['product__name'],
+            'seller_name': row['seller__username'],
+            'quantity': row['quantity'],
+            'total_amount': float(row['total_amount'] or 0),
+            'payment_method': row['payment_method'],
+        }
+        for row in sales.values(
+            'id', 'sale_date', 'product__name', 'seller__username', 'quantity', 'total_amount', 'payment_method'
+        )[:limit]
+    ]
+
+
+def product_stats():
+    stats = Product.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        units_in_stock=Sum('stock_quantity', filter=Q(is_active=True)),
+        stock_value=Sum(F('stock_quantity') * F('cost_price'), filter=Q(is_active=True)),
+    )
+    return {
+        'total': stats['total'],
+        'active': stats['active'],
+        'units_in_stock': stats['units_in_stock'] or 0,
+        'stock_value': float(stats['stock_value'] or 0),
+    }
+
+
+def user_stats():
+    counts = dict(User.objects.filter(is_active=True).values_list('role').annotate(count=Count('id')).order_by())
+    return {role: counts.get(role, 0) for role in DASHBOARD_ROLES}
+
+
+def seller_totals(seller, today):
+    """The seller's own sales today and over the last 7 days, from the rollups."""
+    week_start = today - timedelta(days=6)
+    in_today = Q(day=today)
+    totals = DailySalesRollup.objects.filter(seller=seller, day__gte=week_start, day__lte=today).aggregate(
+        today_sales=Sum('total_sales', filter=in_today),
+        today_count=Sum('transaction_count', filter=in_today),
+        today_units=Sum('quantity', filter=in_today),
+        week_sales=Sum('total_sales'),
+        week_count=Sum('transaction_count'),
+    )
+    return {
+        'today': {
+            'total_sales': float(totals['today_sales'] or 0),
+            'transaction_count': totals['today_count'] or 0,
+            'quantity': totals['today_units'] or 0,
+        },
+        'weekly': {
+            'total_sales': float(totals['week_sales'] or 0),
+            'transaction_count': totals['week_count'] or 0,
+        },
+    }
+
+
+def build_dashboard(role, user, today=None):
+    """The whole dashboard payload for ``role`` (``user`` is the seller for SELLER)."""
+    today = today or timezone.localdate()
+    payload = {'role': role, 'generated_at': timezone.now(), 'low_stock': low_stock_summary()}
+    if role == 'BOSS':
+        payload.update(
+            report=profit_loss_summary(today),
+            sellers=seller_leaderboard('weekly', today, 0, DASHBOARD_SELLERS_LIMIT)['results'],
+            recent_sales=recent_sales(),
+            products=product_stats(),
+            users=user_stats(),
+        )
+    elif role == 'MANAGER':
+        payload.update(
+            sellers=seller_leaderboard('weekly', today, 0, DASHBOARD_SELLERS_LIMIT)['results'],
+            recent_sales=recent_sales(),
+            products=product_stats(),
+        )
+    else:
+        payload.update(
+            totals=seller_totals(user, today),
+            recent_sales=recent_sales(seller=user),
+        )
+    return payload
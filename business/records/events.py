@@ -0,0 +1,115 @@
+# records/events.py
+"""
+In-process publish/subscribe for live dashboard updates.
+
+Write paths call ``publish_on_commit()``; each event is encoded to a
+server-sent-events frame once and handed to every connected subscriber's
+queue, so N open dashboards cost one fan-out per write instead of N
+database polls. Only streams served by the publishing process see an
+event; with several server processes the rest miss it, so clients keep a
+slow poll as a backstop (``useLiveEvents``). Events:
+
+* ``sale_created`` - id, product_id, quantity, total_amount, payment_method, seller_id
+* ``stock_changed`` - product_id plus ``delta`` (sales), ``stock_quantity`` (product saves)
+  or ``min_stock_level`` and ``is_low_stock`` (forecast reorder points)
+* ``report_delta`` - total_sales, total_profit and transaction_count to add to today's report
+"""
+import asyncio
+import itertools
+import threading
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+_encoder = DjangoJSONEncoder(separators=(',', ':'))
+
+
+class Subscription:
+    def __init__(self, broker, accepts):
+        self.broker = broker
+        self.accepts = accepts
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def _offer(self, event_type, payload, frame):
+        if not self.accepts(event_type, payload):
+            return
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # A stalled client only loses its own events; writers never block
+            pass
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class EventBroker:
+    """Fan events out to subscribers living on any event loop in this process."""
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, accepts=lambda event_type, payload: True):
+        """Register a subscriber; must be called from inside its event loop."""
+        subscription = Subscription(self, accepts)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event_type, payload):
+        """Encode once, then hand the frame to every subscriber. Safe from any thread."""
+        frame = f'id: {next(self._ids)}\nevent: {event_type}\ndata: {_encoder.encode(payload)}\n\n'.encode()
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._offer, event_type, payload, frame)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(subscription)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+
+broker = EventBroker()
+
+
+def publish_on_commit(event_type, payload):
+    """Publish once the surrounding transaction commits (immediately in autocommit)."""
+    transaction.on_commit(lambda: broker.publish(event_type, payload))
+
+
+def publish_sales(sales):
+    """Publish sale, stock and report events for freshly created sales."""
+    stock = {}
+    report = {'total_sales': 0, 'total_profit': 0, 'transaction_count': 0}
+    for sale in sales:
+        publish_on_commit('sale_created', {
+            'id': sale.pk,
+            'product_id': sale.product_id,
+            'quantity': sale.quantity,
+            'total_amount': sale.total_amount,
+            'payment_method': sale.payment_method,
+            'seller_id': sale.seller_id,
+        })
+        stock[sale.product_id] = stock.get(sale.product_id, 0) - sale.quantity
+        report['total_sales'] += sale.total_amount or 0
+        report['total_profit'] += sale.profit or 0
+        report['transaction_count'] += 1
+    for product_id, delta in stock.items():
+        publish_on_commit('stock_changed', {'product_id': product_id, 'delta': delta})
+    if report['transaction_count']:
+        publish_on_commit('report_delta', report)
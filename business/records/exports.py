@@ -0,0 +1,82 @@
+# records/exports.py
+import csv
+import zlib
+from itertools import chain
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+SALE_EXPORT_FIELDS = [
+    'id', 'sale_date', 'product_id', 'product__name', 'product__category_name',
+    'quantity', 'sale_price', 'total_amount', 'profit', 'payment_method',
+    'seller_id', 'seller__username',
+]
+
+PRODUCT_EXPORT_FIELDS = [
+    'id', 'name', 'category_name', 'price', 'cost_price', 'stock_quantity',
+    'min_stock_level', 'is_active', 'created_at', 'updated_at',
+]
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class _Echo:
+    """File-like object whose write() just hands the line back to csv.writer."""
+    def write(self, value):
+        return value
+
+
+def _csv_chunks(fields, rows, chunk_size):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    chunk = []
+    for row in rows:
+        chunk.append(writer.writerow(row))
+        if len(chunk) >= chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _ndjson_chunks(fields, rows, chunk_size):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    chunk = []
+    for row in rows:
+        chunk.append(encoder.encode(dict(zip(fields, row))) + '\n')
+        if len(chunk) >= chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_rows(rows, fields, export_format='csv', compress=False, chunk_size=2000):
+    """Yield ``rows`` (tuples of ``fields``) as encoded CSV or NDJSON chunks."""
+    encode = _csv_chunks if export_format == 'csv' else _ndjson_chunks
+    chunks = (chunk.encode() for chunk in encode(fields, rows, chunk_size))
+    return _gzip(chunks) if compress else chunks
+
+
+def stream_export(queryset, fields, export_format='csv', compress=False, chunk_size=2000, leading_rows=()):
+    """
+    Yield an export of ``queryset`` as encoded chunks.
+
+    Rows come from ``values_list().iterator()`` so no model instances are
+    built and, on Postgres, a server-side cursor keeps memory flat however
+    many rows are exported. ``leading_rows`` (tuples of ``fields``, e.g.
+    archived history) are written first.
+    """
+    rows = chain(leading_rows, queryset.values_list(*fields).iterator(chunk_size=chunk_size))
+    return stream_rows(rows, fields, export_format, compress, chunk_size)
@@ -0,0 +1,187 @@
+# records/forecasting.py
+"""
+Stock velocity and reorder-point forecasting.
+
+``StockForecaster`` keeps a products x days matrix of units sold, built
+from the daily rollups. A refresh only re-reads the buckets from the last
+day it loaded onwards (that day may have grown since) and shifts the
+matrix when the date moves on, so keeping it current costs one small
+query. Velocity, moving average, spread and days of cover are then
+computed for the whole catalog in a few NumPy passes.
+
+The suggested ``min_stock_level`` is a classic reorder point: expected
+demand over the supplier lead time plus a safety stock of
+``SERVICE_LEVEL_Z`` standard deviations of that demand. Applying the
+suggestions skips products without sales in the window and keeps an
+audit trail in ``ReorderPointChange``.
+"""
+import threading
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .caching import invalidate_stock_caches
+from .events import publish_on_commit
+from .models import DailySalesRollup, Product, ReorderPointChange
+
+VELOCITY_WINDOW_DAYS = 28
+MOVING_AVERAGE_DAYS = 7
+DEFAULT_LEAD_TIME_DAYS = 7
+# ~95% of lead-time demand covered by the safety stock
+SERVICE_LEVEL_Z = 1.65
+
+
+class StockForecaster:
+    def __init__(self, window=VELOCITY_WINDOW_DAYS):
+        self.window = window
+        self._lock = threading.Lock()
+        self.end_day = None
+        self.product_ids = []
+        self._index = {}
+        self.units = np.zeros((0, window), dtype=np.float64)
+
+    def refresh(self, today=None):
+        """Bring the matrix up to ``today`` (defaults to the local date)."""
+        today = today or timezone.localdate()
+        with self._lock:
+            if self.end_day is None or (today - self.end_day).days >= self.window or today < self.end_day:
+                self.units = np.zeros((len(self.product_ids), self.window), dtype=np.float64)
+                since = today - timedelta(days=self.window - 1)
+            else:
+                shift = (today - self.end_day).days
+                if shift:
+                    self.units = np.roll(self.units, -shift, axis=1)
+                    self.units[:, -shift:] = 0
+                # The previous last day may have had more sales since it was read
+                since = self.end_day
+                self.units[:, self.window - 1 - shift] = 0
+            self.end_day = today
+            self._load(since, today)
+
+    def _load(self, since, today):
+        rows = list(
+            DailySalesRollup.objects
+            .filter(day__gte=since, day__lte=today)
+            .values_list('product_id', 'day')
+            .annotate(units=Sum('quantity'))
+            .order_by()
+        )
+        if not rows:
+            return
+        for product_id, _, _ in rows:
+            if product_id not in self._index:
+                self._index[product_id] = len(self.product_ids)
+                self.product_ids.append(product_id)
+        if len(self.product_ids) > self.units.shape[0]:
+            grown = np.zeros((len(self.product_ids), self.window), dtype=np.float64)
+            grown[:self.units.shape[0]] = self.units
+            self.units = grown
+
+        product_ids, days, units = zip(*rows)
+        rows_at = np.fromiter((self._index[pk] for pk in product_ids), dtype=np.int64, count=len(rows))
+        columns_at = np.fromiter(
+            (self.window - 1 - (today - day).days for day in days), dtype=np.int64, count=len(rows)
+        )
+        np.add.at(self.units, (rows_at, columns_at), np.asarray(units, dtype=np.float64))
+
+    def forecast(self, lead_time=DEFAULT_LEAD_TIME_DAYS):
+        """
+        Return one row per active product: stock, current min level, daily
+        velocity (window and moving average), demand spread, days of cover
+        and the suggested reorder point.
+        """
+        products = list(
+            Product.objects.filter(is_active=True).order_by('id')
+            .values_list('id', 'name', 'stock_quantity', 'min_stock_level')
+        )
+        if not products:
+            return []
+        ids, names, stock, min_levels = zip(*products)
+        stock = np.asarray(stock, dtype=np.float64)
+
+        # Line the sales matrix up with the product list; unsold products get zeros
+        positions = np.fromiter((self._index.get(pk, -1) for pk in ids), dtype=np.int64, count=len(ids))
+        units = np.zeros((len(ids), self.window), dtype=np.float64)
+        known = positions >= 0
+        units[known] = self.units[positions[known]]
+
+        velocity = units.mean(axis=1)
+        moving_average = units[:, -MOVING_AVERAGE_DAYS:].mean(axis=1)
+        spread = units.std(axis=1)
+        # Weight recent trade: plan on whichever rate is higher
+        demand = np.maximum(velocity, moving_average)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cover = np.where(demand > 0, stock / demand, np.inf)
+        reorder_point = np.ceil(demand * lead_time + SERVICE_LEVEL_Z * spread * np.sqrt(lead_time)).astype(np.int64)
+
+        return [
+            {
+                'product_id': ids[i],
+                'product_name': names[i],
+                'stock_quantity': int(stock[i]),
+                'min_stock_level': min_levels[i],
+                'velocity': round(float(velocity[i]), 3),
+                'moving_average': round(float(moving_average[i]), 3),
+                'daily_std': round(float(spread[i]), 3),
+                'days_of_cover': round(float(cover[i]), 1) if np.isfinite(cover[i]) else None,
+                'suggested_min_stock_level': int(reorder_point[i]),
+            }
+            for i in range(len(ids))
+        ]
+
+    def apply(self, rows, minimum=0):
+        """
+        Write suggested reorder points back to ``min_stock_level``.
+
+        Only products whose level changes are touched (see ``planned_levels``).
+        ``is_low_stock`` and ``updated_at`` are set alongside (bulk_update skips
+        ``save()``) so the low-stock list and catalog caches stay consistent;
+        every change is recorded as a ``ReorderPointChange`` and published as
+        a ``stock_changed`` event.
+        """
+        changed = planned_levels(rows, minimum)
+        if not changed:
+            return 0
+        velocity = {row['product_id']: row['velocity'] for row in rows}
+        now = timezone.now()
+        with transaction.atomic():
+            products = list(Product.objects.select_for_update().filter(pk__in=changed))
+            audit = []
+            for product in products:
+                audit.append(ReorderPointChange(
+                    product=product, previous_level=product.min_stock_level, new_level=changed[product.pk],
+                    velocity=velocity[product.pk], changed_at=now,
+                ))
+                product.min_stock_level = changed[product.pk]
+                product.is_low_stock = product.stock_quantity <= product.min_stock_level
+                product.updated_at = now
+            Product.objects.bulk_update(products, ['min_stock_level', 'is_low_stock', 'updated_at'], batch_size=500)
+            ReorderPointChange.objects.bulk_create(audit, batch_size=500)
+            invalidate_stock_caches()
+            for product in products:
+                publish_on_commit('stock_changed', {
+                    'product_id': product.pk,
+                    'min_stock_level': product.min_stock_level,
+                    'is_low_stock': product.is_low_stock,
+                })
+        return len(products)
+
+
+def planned_levels(rows, minimum=0):
+    """
+    ``{product_id: new min_stock_level}`` for the forecast ``rows`` whose
+    level would change. Products with no recent sales are left alone: a
+    zero forecast means "no data", not "stop reordering".
+    """
+    return {
+        row['product_id']: max(row['suggested_min_stock_level'], minimum)
+        for row in rows
+        if (row['velocity'] or row['moving_average'])
+        and max(row['suggested_min_stock_level'], minimum) != row['min_stock_level']
+    }
+
+
+stock_forecaster = StockForecaster()
@@ -0,0 +1,265 @@
+# records/jobs.py
+"""
+Database-backed report jobs.
+
+The API only records a ``ReportJob``; ``manage.py run_report_worker``
+claims pending jobs with a conditional UPDATE (so any number of workers
+can share the table without a broker) and renders them in a process pool.
+Results are stored as ``ReportArtifactChunk`` rows, so any web process can
+serve them however the services are deployed, and are reused by identical
+requests until they are ``JOB_RESULT_TTL`` old.
+"""
+import hashlib
+import json
+from datetime import datetime, time, timedelta
+from itertools import chain
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .archive import archived_sale_rows
+from .exports import EXPORT_FORMATS, SALE_EXPORT_FIELDS, stream_rows
+from .models import DailySalesRollup, ReportArtifactChunk, ReportJob, Sale, SaleArchive
+from .routers import reads_from
+
+# Identical requests reuse a finished result for this long
+JOB_RESULT_TTL = timedelta(minutes=15)
+# Finished jobs and their results are pruned after this
+JOB_RETENTION = timedelta(days=1)
+# Pool workers are stopped, and the job failed, once a job runs this long
+JOB_TIMEOUT = timedelta(minutes=30)
+# A RUNNING job this old outlived any live worker's timeout: its worker died, run it again
+STALE_JOB_TIMEOUT = JOB_TIMEOUT + timedelta(minutes=5)
+# How often a running worker looks for stale jobs
+STALE_CHECK_INTERVAL = timedelta(minutes=1)
+PROGRESS_EVERY = 5000
+# Results are stored (and served) in pieces of about this many bytes
+ARTIFACT_CHUNK_SIZE = 1 << 20
+
+
+def params_key(kind, params):
+    canonical = json.dumps([kind, params], sort_keys=True, separators=(',', ':'), cls=DjangoJSONEncoder)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def submit_job(kind, params, user):
+    """
+    Return ``(job, created)``; an identical pending, running or fresh job is
+    reused. The ``unique_active_report_job`` constraint settles concurrent
+    identical submissions: the loser gets the winner's job.
+    """
+    key = params_key(kind, params)
+    job = reusable_job(key)
+    if job is not None:
+        return job, False
+    try:
+        with transaction.atomic():
+            return ReportJob.objects.create(kind=kind, params=params, params_key=key, requested_by=user), True
+    except IntegrityError:
+        # Another request queued the same job between the lookup and the insert
+        return ReportJob.objects.get(params_key=key, status__in=ReportJob.ACTIVE_STATUSES), False
+
+
+def reusable_job(key):
+    """The newest pending, running or fresh finished job for ``key``, if any."""
+    reusable = Q(status__in=ReportJob.ACTIVE_STATUSES) | Q(status='DONE', finished_at__gte=timezone.now() - JOB_RESULT_TTL)
+    return ReportJob.objects.filter(reusable, params_key=key).order_by('-created_at').first()
+
+
+def artifact_chunks(job):
+    """Yield a finished job's result one stored chunk at a time."""
+    for data in job.chunks.order_by('seq').values_list('data', flat=True).iterator(chunk_size=1):
+        yield bytes(data)
+
+
+def claim_next_job():
+    """Mark the oldest pending job RUNNING and return it (None when the queue is empty)."""
+    while True:
+        job = ReportJob.objects.filter(status='PENDING').order_by('created_at').first()
+        if job is None:
+            return None
+        # Another worker may win the race for this row; then try the next one
+        if ReportJob.objects.filter(pk=job.pk, status='PENDING').update(status='RUNNING', started_at=timezone.now()):
+            return job
+
+
+def requeue_jobs(job_ids):
+    """Put claimed jobs that never got to finish back in the queue."""
+    return ReportJob.objects.filter(pk__in=job_ids, status='RUNNING').update(status='PENDING', progress=0)
+
+
+def requeue_stale_jobs():
+    return ReportJob.objects.filter(
+        status='RUNNING', started_at__lt=timezone.now() - STALE_JOB_TIMEOUT
+    ).update(status='PENDING', progress=0)
+
+
+def prune_report_jobs():
+    expired = ReportJob.objects.filter(status__in=['DONE', 'FAILED'], finished_at__lt=timezone.now() - JOB_RETENTION)
+    # Results go with their jobs (the chunks cascade)
+    return expired.delete()[0]
+
+
+def fail_job(job_id, error):
+    ReportJob.objects.filter(pk=job_id).update(status='FAILED', error=error, finished_at=timezone.now())
+
+
+def run_job(job_id):
+    """Render one claimed job; runs inside a worker process."""
+    job = ReportJob.objects.get(pk=job_id)
+    reported = [0]
+
+    def progress(done, total):
+        percent = min(99, done * 100 // max(total, 1))
+        if percent > reported[0]:
+            reported[0] = percent
+            ReportJob.objects.filter(pk=job_id).update(progress=percent)
+
+    try:
+        # Queued reports tolerate replication lag; the job row itself is read above from the primary
+        with reads_from(settings.REPLICA_DATABASE_ALIAS or DEFAULT_DB_ALIAS):
+            result_name, content_type = RENDERERS[job.kind](job, progress)
+    except Exception as e:
+        fail_job(job_id, f'{type(e).__name__}: {e}')
+        return False
+    ReportJob.objects.filter(pk=job_id).update(
+        status='DONE', progress=100, result_name=result_name, content_type=content_type,
+        error='', finished_at=timezone.now()
+    )
+    return True
+
+
+def _parse_day(params, name):
+    # Submitted params are validated, but a job may also be queued by hand
+    try:
+        day = parse_date(params[name])
+    except ValueError:  # well formed but impossible, e.g. 2024-02-30
+        day = None
+    if day is None:
+        raise ValueError(f'{name} must be a YYYY-MM-DD date, not {params[name]!r}')
+    return day
+
+
+def _boundaries(params):
+    tz = timezone.get_current_timezone()
+    start = params.get('start') and _parse_day(params, 'start')
+    end = params.get('end') and _parse_day(params, 'end')
+    return (
+        timezone.make_aware(datetime.combine(start, time.min), tz) if start else None,
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz) if end else None,
+    )
+
+
+def _write_artifact(job, name, chunks):
+    """Store ``chunks`` (bytes) as the result of ``job``, ``ARTIFACT_CHUNK_SIZE`` at a time."""
+    # A requeued job may have stored part of a result before its worker died
+    job.chunks.all().delete()
+    seq, buffer = 0, bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= ARTIFACT_CHUNK_SIZE:
+            ReportArtifactChunk.objects.create(job=job, seq=seq, data=bytes(buffer[:ARTIFACT_CHUNK_SIZE]))
+            del buffer[:ARTIFACT_CHUNK_SIZE]
+            seq += 1
+    if buffer:
+        ReportArtifactChunk.objects.create(job=job, seq=seq, data=bytes(buffer))
+    return name
+
+
+def render_sales_export(job, progress):
+    """The sales export (archived months included), stored as the job's result."""
+    params = job.params
+    start, end = _boundaries(params)
+    queryset = Sale.objects.all()
+    archives = SaleArchive.objects.all()
+    if start:
+        queryset = queryset.filter(sale_date__gte=start)
+        archives = archives.filter(month__gte=timezone.localtime(start).date().replace(day=1))
+    if end:
+        queryset = queryset.filter(sale_date__lt=end)
+        archives = archives.filter(month__lt=timezone.localtime(end).date())
+    seller_ids = None
+    if params.get('seller'):
+        queryset = queryset.filter(seller_id=params['seller'])
+        seller_ids = {params['seller']}
+    # Archived months count in full, so progress is an estimate
+    total = queryset.count() + (archives.aggregate(rows=Sum('row_count'))['rows'] or 0)
+
+    def counted(rows):
+        for done, row in enumerate(rows, 1):
+            if done % PROGRESS_EVERY == 0:
+                progress(done, total)
+            yield row
+
+    fields = SALE_EXPORT_FIELDS
+    rows = counted(chain(
+        archived_sale_rows(fields, start, end, seller_ids),
+        queryset.order_by('sale_date', 'id').values_list(*fields).iterator(chunk_size=2000),
+    ))
+    export_format = params.get('export_format', 'csv')
+    compress = params.get('gzip', False)
+    name = f'report-{job.pk}.{export_format}' + ('.gz' if compress else '')
+    _write_artifact(job, name, stream_rows(rows, fields, export_format, compress))
+    return name, 'application/gzip' if compress else EXPORT_FORMATS[export_format]
+
+
+SUMMARY_PERIODS = {
+    'day': lambda: F('day'),
+    'week': lambda: TruncWeek('day'),
+    'month': lambda: TruncMonth('day'),
+}
+
+
+def render_sales_summary(job, progress):
+    """Sales, profit and volume per period and category, from the rollups."""
+    params = job.params
+    period = params.get('period', 'month')
+    rollups = DailySalesRollup.objects.all()
+    if params.get('start'):
+        rollups = rollups.filter(day__gte=_parse_day(params, 'start'))
+    if params.get('end'):
+        rollups = rollups.filter(day__lte=_parse_day(params, 'end'))
+    rows = list(
+        rollups
+        .annotate(period=SUMMARY_PERIODS[period]())
+        .values('period', 'product__category_name')
+        .annotate(
+            units=Sum('quantity'),
+            transactions=Sum('transaction_count'),
+            sales=Sum('total_sales'),
+            profit=Sum('total_profit'),
+            products=Count('product', distinct=True),
+        )
+        .order_by('period', 'product__category_name')
+    )
+    progress(1, 2)
+    payload = {
+        'period': period,
+        'start': params.get('start'),
+        'end': params.get('end'),
+        'rows': [
+            {
+                'period': row['period'],
+                'category': row['product__category_name'],
+                'quantity': row['units'],
+                'transaction_count': row['transactions'],
+                'total_sales': float(row['sales']),
+                'total_profit': float(row['profit']),
+                'products': row['products'],
+            }
+            for row in rows
+        ],
+    }
+    name = _write_artifact(job, f'report-{job.pk}.json', [DjangoJSONEncoder().encode(payload).encode()])
+    return name, 'application/json'
+
+
+RENDERERS = {
+    'sales_export': render_sales_export,
+    'sales_summary': render_sales_summary,
+}
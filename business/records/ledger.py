@@ -0,0 +1,125 @@
+# records/ledger.py
+"""
+Stock history from the ``StockMovement`` ledger.
+
+Every stock write appends a movement in its own transaction, so a
+product's stock at any moment is the sum of its movements up to then.
+``StockSnapshot`` rows checkpoint that sum: stock at ``X`` is the latest
+snapshot at or before ``X`` plus the (short) tail of movements after it,
+one index range per product instead of a replay of the whole ledger.
+
+``reconcile_range()`` compares ``stock_quantity`` with the ledger for a
+block of product ids in a single statement (so both sides come from the
+same database snapshot); ``manage.py reconcile_stock`` fans the blocks
+out over a process pool.
+"""
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import DateTimeField, Exists, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Product, StockMovement, StockSnapshot
+
+# Stands in for "no snapshot yet": every movement is after it
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+SNAPSHOT_BATCH_SIZE = 1000
+
+
+def with_ledger_stock(products, moment=None):
+    """
+    Annotate ``products`` with ``ledger_stock`` (stock at ``moment``, or
+    now) plus ``snapshot_at`` and ``has_tail`` (movements after the
+    snapshot), all from correlated subqueries on the snapshot and
+    movement indexes.
+    """
+    snapshots = StockSnapshot.objects.filter(product=OuterRef('pk'))
+    movements = StockMovement.objects.filter(product=OuterRef('pk'))
+    if moment is not None:
+        snapshots = snapshots.filter(taken_at__lte=moment)
+        movements = movements.filter(created_at__lte=moment)
+    latest = snapshots.order_by('-taken_at')
+    tail = movements.filter(
+        created_at__gt=Coalesce(OuterRef('snapshot_at'), Value(EPOCH, output_field=DateTimeField()))
+    )
+    return products.annotate(
+        snapshot_at=Subquery(latest.values('taken_at')[:1]),
+        snapshot_stock=Coalesce(Subquery(latest.values('stock_quantity')[:1]), 0),
+        tail_delta=Coalesce(
+            Subquery(tail.order_by().values('product').annotate(total=Sum('delta')).values('total')), 0
+        ),
+        ledger_stock=F('snapshot_stock') + F('tail_delta'),
+        has_tail=Exists(tail),
+    )
+
+
+def stock_at(moment, product_ids=None):
+    """``{product_id: stock}`` as of ``moment`` for the given (default: all) products."""
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    return dict(with_ledger_stock(products.order_by(), moment).values_list('pk', 'ledger_stock'))
+
+
+def snapshot_cutoff(day=None):
+    """Start of ``day`` (default today): snapshots are taken at day boundaries."""
+    day = day or timezone.localdate()
+    return timezone.make_aware(datetime.combine(day, time.min), timezone.get_current_timezone())
+
+
+def take_snapshots(taken_at, batch_size=SNAPSHOT_BATCH_SIZE):
+    """
+    Snapshot every product with movements between its latest snapshot and
+    ``taken_at``. Take them at a moment in the past (the default command
+    uses the start of today) so no movement can still be committing
+    behind the snapshot. Returns the number of snapshots written.
+    """
+    rows = (
+        with_ledger_stock(Product.objects.order_by('pk'), taken_at)
+        .filter(has_tail=True)
+        .values_list('pk', 'ledger_stock')
+        .iterator(chunk_size=batch_size)
+    )
+    written = 0
+    batch = []
+    for product_id, stock in rows:
+        batch.append(StockSnapshot(product_id=product_id, taken_at=taken_at, stock_quantity=stock))
+        if len(batch) == batch_size:
+            written += len(StockSnapshot.objects.bulk_create(batch, ignore_conflicts=True))
+            batch = []
+    if batch:
+        written += len(StockSnapshot.objects.bulk_create(batch, ignore_conflicts=True))
+    return written
+
+
+def id_ranges(chunk_size):
+    """Inclusive ``(first_id, last_id)`` blocks covering the product table."""
+    ids = Product.objects.order_by('pk').values_list('pk', flat=True)
+    first = ids.first()
+    last = ids.last()
+    if first is None:
+        return []
+    return [(start, min(start + chunk_size - 1, last)) for start in range(first, last + 1, chunk_size)]
+
+
+def reconcile_range(first_id, last_id):
+    """Products in ``[first_id, last_id]`` whose ``stock_quantity`` disagrees with the ledger."""
+    products = with_ledger_stock(Product.objects.filter(pk__gte=first_id, pk__lte=last_id).order_by('pk'))
+    return list(
+        products.filter(~Q(stock_quantity=F('ledger_stock')))
+        .values('id', 'name', 'stock_quantity', 'ledger_stock')
+    )
+
+
+def correct_ledger(mismatches):
+    """
+    Append CORRECTION movements so the ledger matches ``stock_quantity``.
+
+    The difference is unaffected by sales recorded since the check (they
+    move both sides), so the corrections stay right without a lock.
+    """
+    with transaction.atomic():
+        return StockMovement.objects.record(
+            {row['id']: row['stock_quantity'] - row['ledger_stock'] for row in mismatches}, 'CORRECTION'
+        )
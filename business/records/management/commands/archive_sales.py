@@ -0,0 +1,39 @@
+# records/management/commands/archive_sales.py
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from records.archive import archivable_months, archive_month
+
+
+class Command(BaseCommand):
+    help = 'Move closed months of sales out of the Sale table into compressed columnar archive chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-months', type=int, default=3,
+                            help='Recent months (including the current one) to keep in the database')
+        parser.add_argument('--month', help='Archive just this month (YYYY-MM)')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['month']:
+            try:
+                month = parse_date(f"{options['month']}-01")
+            except ValueError:  # well formed but impossible, e.g. 2024-13
+                month = None
+            if month is None:
+                raise CommandError('--month must look like YYYY-MM')
+            months = [month]
+        else:
+            if options['keep_months'] < 1:
+                raise CommandError('--keep-months must be at least 1')
+            months = archivable_months(options['keep_months'])
+
+        moved = 0
+        for month in months:
+            if options['dry_run']:
+                self.stdout.write(f'Would archive {month:%Y-%m}')
+                continue
+            count = archive_month(month)
+            moved += count
+            self.stdout.write(f'{month:%Y-%m}: archived {count} sales')
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} sales from {len(months)} months'))
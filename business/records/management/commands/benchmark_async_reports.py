@@ -0,0 +1,93 @@
+# records/management/commands/benchmark_async_reports.py
+import asyncio
+import json
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from records.authentication import issue_token
+from records.seeding import BusinessSeeder, SeedConfig
+
+User = get_user_model()
+
+# What the dashboard fetches one after another from the sync views
+SYNC_PATHS = [
+    '/api/profit_loss_report/',
+    '/api/products/low_stock/',
+    '/api/leaderboard/?period=monthly&page_size=10',
+]
+OVERVIEW_PATH = '/api/reports/overview/'
+
+
+def _summary(timings):
+    ordered = sorted(timings)
+    return statistics.median(ordered), ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = ('Compare the dashboard reports fetched one by one from the sync views with the '
+            'async overview that runs them concurrently (throwaway seeded test database)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sales', type=int, default=50_000)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        # Committed data in a real test database: the concurrent queries use their own connections
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            BusinessSeeder(SeedConfig(
+                sales=options['sales'], products=options['products'], days=90, end_date=timezone.localdate()
+            )).run()
+            self.compare(User.objects.filter(role='BOSS').order_by('id').first(), options['iterations'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def compare(self, boss, iterations):
+        # Per request: Django 4.2's AsyncClient drops client-level headers from the ASGI scope
+        headers = {'Authorization': f'Bearer {issue_token(boss)[0]}'}
+        client, async_client = Client(), AsyncClient()
+
+        def fetch_sync():
+            cache.clear()  # time the queries, not the report caches
+            start = time.perf_counter()
+            responses = [client.get(path, secure=True, headers=headers) for path in SYNC_PATHS]
+            elapsed = (time.perf_counter() - start) * 1000
+            if any(response.status_code != 200 for response in responses):
+                raise CommandError(f'sync path: HTTP {[response.status_code for response in responses]}')
+            return responses, elapsed
+
+        async def fetch_async():
+            cache.clear()
+            start = time.perf_counter()
+            response = await async_client.get(OVERVIEW_PATH, secure=True, headers=headers)
+            elapsed = (time.perf_counter() - start) * 1000
+            if response.status_code != 200:
+                raise CommandError(f'async overview: HTTP {response.status_code}')
+            return response, elapsed
+
+        async def run_async():
+            await fetch_async()  # warm up
+            return [(await fetch_async())[1] for _ in range(iterations)]
+
+        responses, _ = fetch_sync()
+        overview = json.loads(asyncio.run(fetch_async())[0].content)
+        report = json.loads(responses[0].content)
+        if any(overview[window] != report[window] for window in ('daily', 'weekly', 'monthly')):
+            raise CommandError('The overview totals differ from the profit/loss report')
+
+        sync_p50, sync_p95 = _summary([fetch_sync()[1] for _ in range(iterations)])
+        async_p50, async_p95 = _summary(asyncio.run(run_async()))
+        self.stdout.write(f'sync, {len(SYNC_PATHS)} requests  p50 {sync_p50:8.1f}ms  p95 {sync_p95:8.1f}ms')
+        self.stdout.write(f'async overview      p50 {async_p50:8.1f}ms  p95 {async_p95:8.1f}ms')
+        self.stdout.write(self.style.SUCCESS(f'x{sync_p50 / async_p50:.2f} at the median'))
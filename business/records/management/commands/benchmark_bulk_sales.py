@@ -0,0 +1,49 @@
+# records/management/commands/benchmark_bulk_sales.py
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from records.models import Product
+from records.views import SaleViewSet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compare single POST /sales/ against one POST /sales/bulk/ (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sales', type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = options['sales']
+        factory = APIRequestFactory()
+        create_view = SaleViewSet.as_view({'post': 'create'})
+        bulk_view = SaleViewSet.as_view({'post': 'bulk'})
+
+        with transaction.atomic():
+            seller = User.objects.create_user(username='bench-seller', password='bench', role='SELLER')
+            product = Product.objects.create(name='Bench Product', price=10, cost_price=4, stock_quantity=count * 2)
+            item = {'product': product.pk, 'quantity': 1, 'sale_price': '10.00'}
+
+            start = time.perf_counter()
+            for _ in range(count):
+                request = factory.post('/api/sales/', item, format='json')
+                force_authenticate(request, user=seller)
+                assert create_view(request).status_code == 201
+            single = time.perf_counter() - start
+
+            start = time.perf_counter()
+            request = factory.post('/api/sales/bulk/', [item] * count, format='json')
+            force_authenticate(request, user=seller)
+            assert bulk_view(request).status_code == 201
+            bulk = time.perf_counter() - start
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'single posts: {count / single:,.0f} sales/s ({single:.3f}s)')
+        self.stdout.write(f'bulk upload:  {count / bulk:,.0f} sales/s ({bulk:.3f}s)')
+        self.stdout.write(self.style.SUCCESS(f'speedup: {single / bulk:.1f}x'))
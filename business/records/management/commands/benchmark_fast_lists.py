@@ -0,0 +1,73 @@
+# records/management/commands/benchmark_fast_lists.py
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from records.renderers import FAST_LIST_PARAM
+from records.seeding import BusinessSeeder, SeedConfig
+from records.views import ProductViewSet, SaleViewSet
+
+User = get_user_model()
+
+# label -> (viewset, query params)
+CASES = {
+    'products (all)': (ProductViewSet, {}),
+    'sales (page of 500)': (SaleViewSet, {'page_size': 500}),
+    'sales (all)': (SaleViewSet, {}),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare regular and ?fast=1 list rendering on seeded data (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sales', type=int, default=20_000)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--iterations', type=int, default=10)
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+
+        def fetch(viewset, params, user, encoding=''):
+            request = factory.get('/api/', params, HTTP_HOST='localhost', HTTP_ACCEPT_ENCODING=encoding)
+            force_authenticate(request, user=user)
+            cache.clear()  # time rendering, not the catalog cache
+            start = time.perf_counter()
+            response = viewset.as_view({'get': 'list'})(request)
+            if hasattr(response, 'render'):
+                response.render()
+            return response, (time.perf_counter() - start) * 1000
+
+        with transaction.atomic():
+            BusinessSeeder(SeedConfig(
+                sales=options['sales'], products=options['products'], days=90, end_date=timezone.localdate()
+            )).run()
+            boss = User.objects.filter(role='BOSS').order_by('id').first()
+
+            for label, (viewset, params) in CASES.items():
+                fast_params = {**params, FAST_LIST_PARAM: '1'}
+                regular, _ = fetch(viewset, params, boss)
+                fast, _ = fetch(viewset, fast_params, boss)
+                # Next links legitimately differ by the fast=1 parameter
+                if regular.content != fast.content.replace(f'{FAST_LIST_PARAM}=1&'.encode(), b''):
+                    raise CommandError(f'{label}: fast output differs from the serializer output')
+
+                timings = {}
+                for mode, query in (('regular', params), ('fast', fast_params)):
+                    timings[mode] = statistics.median(
+                        fetch(viewset, query, boss)[1] for _ in range(options['iterations'])
+                    )
+                compressed, _ = fetch(viewset, fast_params, boss, encoding='gzip, br')
+                self.stdout.write(
+                    f"{label:<20} regular {timings['regular']:8.1f}ms  fast {timings['fast']:8.1f}ms  "
+                    f"x{timings['regular'] / timings['fast']:.1f}  "
+                    f"{len(regular.content) / 1024:,.0f}KB -> {len(compressed.content) / 1024:,.0f}KB "
+                    f"{compressed.get('Content-Encoding', 'identity')}"
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,75 @@
+# records/management/commands/benchmark_sale_listing.py
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from records.models import Product, Sale
+from records.seeding import insert_sales
+from records.views import SaleViewSet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Time first and deep keyset pages of GET /sales/ at several table sizes (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        list_view = SaleViewSet.as_view({'get': 'list'})
+
+        def fetch(boss, params):
+            request = factory.get('/api/sales/', params, HTTP_HOST='localhost')
+            force_authenticate(request, user=boss)
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = list_view(request)
+                response.render()
+                elapsed = time.perf_counter() - start
+            return response, elapsed, len(queries)
+
+        for size in options['sizes']:
+            with transaction.atomic():
+                boss = User.objects.create_user(username='bench-boss', password='bench', role='BOSS')
+                products = Product.objects.bulk_create(
+                    Product(name=f'Bench Product {i}', price=10, cost_price=4, stock_quantity=10**6) for i in range(50)
+                )
+                now = timezone.now()
+                for offset in range(0, size, options['batch_size']):
+                    insert_sales([
+                        Sale(
+                            product=products[i % len(products)], quantity=1, sale_price=10,
+                            total_amount=10, profit=6, seller=boss,
+                            sale_date=now - timedelta(seconds=i)
+                        )
+                        for i in range(offset, min(offset + options['batch_size'], size))
+                    ])
+
+                _, first, first_queries = fetch(boss, {'page_size': options['page_size']})
+                # Seek straight to the last page rather than walking there
+                paginator = SaleViewSet.pagination_class()
+                anchor = (
+                    Sale.objects.order_by(*paginator.ordering)
+                    .values('sale_date', 'id')[size - options['page_size'] - 1]
+                )
+                deep_cursor = paginator.encode_cursor([
+                    paginator._value(anchor, field.lstrip('-')) for field in paginator.ordering
+                ])
+                _, deep, deep_queries = fetch(boss, {'page_size': options['page_size'], 'cursor': deep_cursor})
+
+                transaction.set_rollback(True)
+
+            self.stdout.write(
+                f'{size:>9,} sales: first page {first * 1000:7.1f}ms ({first_queries} queries), '
+                f'deep page {deep * 1000:7.1f}ms ({deep_queries} queries)'
+            )
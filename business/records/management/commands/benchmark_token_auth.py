@@ -0,0 +1,76 @@
+# records/management/commands/benchmark_token_auth.py
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.views import APIView
+
+from records.authentication import issue_token
+from records.seeding import BusinessSeeder, SeedConfig
+
+User = get_user_model()
+
+# Cached endpoints, so authentication is most of what a request costs
+PATHS = {
+    'seller dashboard': ('/api/dashboard/seller/', 'SELLER'),
+    'low stock': ('/api/products/low_stock/', 'SELLER'),
+    'profit report': ('/api/profit_loss_report/', 'BOSS'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Requests/sec with session authentication (before) and signed tokens (after), on a throwaway database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per endpoint and mode')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            BusinessSeeder(SeedConfig(sales=5000, products=500, end_date=timezone.localdate())).run()
+            for label, (path, role) in PATHS.items():
+                user = User.objects.filter(role=role).order_by('id').first()
+                session = self.measure(self.session_client(user), path, options['requests'], sessions=True)
+                token = self.measure(self.token_client(user), path, options['requests'])
+                self.stdout.write(
+                    f'{label:<17} session {session[0]:7.0f} req/s ({session[1]} queries)  '
+                    f'token {token[0]:7.0f} req/s ({token[1]} queries)  x{token[0] / session[0]:.2f}'
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def session_client(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def token_client(self, user):
+        return Client(HTTP_AUTHORIZATION=f'Bearer {issue_token(user)[0]}')
+
+    def measure(self, client, path, count, sessions=False):
+        # The API no longer accepts sessions; put them back for the "before" run
+        # (function views copy authentication_classes when decorated, so patch the lookup)
+        original = APIView.get_authenticators
+        if sessions:
+            APIView.get_authenticators = lambda view: [SessionAuthentication()]
+        try:
+            response = client.get(path, secure=True)  # warm the caches
+            if response.status_code != 200:
+                raise CommandError(f'{path}: HTTP {response.status_code}')
+            with CaptureQueriesContext(connection) as queries:
+                client.get(path, secure=True)
+            query_count = len(queries)
+
+            start = time.perf_counter()
+            for _ in range(count):
+                client.get(path, secure=True)
+            return count / (time.perf_counter() - start), query_count
+        finally:
+            APIView.get_authenticators = original
@@ -0,0 +1,32 @@
+# records/management/commands/forecast_stock.py
+from django.core.management.base import BaseCommand
+
+from records.forecasting import DEFAULT_LEAD_TIME_DAYS, StockForecaster, planned_levels
+
+
+class Command(BaseCommand):
+    help = 'Forecast stock velocity and suggest (or, with --apply, set) min_stock_level reorder points'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lead-time', type=int, default=DEFAULT_LEAD_TIME_DAYS, help='Supplier lead time in days')
+        parser.add_argument('--minimum', type=int, default=0, help='Never set a reorder point below this (products without sales are never changed)')
+        parser.add_argument('--apply', action='store_true', help='Write the suggestions to min_stock_level')
+
+    def handle(self, *args, **options):
+        forecaster = StockForecaster()
+        forecaster.refresh()
+        rows = forecaster.forecast(options['lead_time'])
+        levels = planned_levels(rows, options['minimum'])
+        changes = [row for row in rows if row['product_id'] in levels]
+        for row in changes[:20]:
+            self.stdout.write(
+                f"{row['product_name']}: {row['velocity']}/day, cover {row['days_of_cover']} days, "
+                f"min {row['min_stock_level']} -> {levels[row['product_id']]}"
+            )
+        if len(changes) > 20:
+            self.stdout.write(f'... and {len(changes) - 20} more')
+        if options['apply']:
+            updated = forecaster.apply(rows, minimum=options['minimum'])
+            self.stdout.write(self.style.SUCCESS(f'Updated min_stock_level on {updated} products'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{len(changes)} of {len(rows)} products would change (use --apply)'))
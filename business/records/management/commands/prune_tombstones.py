@@ -0,0 +1,14 @@
+# records/management/commands/prune_tombstones.py
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from records.models import Tombstone
+from records.sync import TOMBSTONE_RETENTION
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones older than the retention window'
+
+    def handle(self, *args, **options):
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - TOMBSTONE_RETENTION).delete()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} tombstones'))
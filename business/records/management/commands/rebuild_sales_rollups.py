@@ -0,0 +1,15 @@
+# records/management/commands/rebuild_sales_rollups.py
+from django.core.management.base import BaseCommand
+
+from records.models import DailySalesRollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily sales rollups from the raw Sale table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = DailySalesRollup.objects.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} rollup rows'))
@@ -0,0 +1,50 @@
+# records/management/commands/reconcile_stock.py
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from records.ledger import correct_ledger, id_ranges, reconcile_range
+
+
+def _init_worker():
+    # Needed under the spawn start method; a no-op when the worker was forked
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Check Product.stock_quantity against the stock movement ledger, in blocks of product ids'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10_000, help='Product ids per block')
+        parser.add_argument('--workers', type=int, default=0,
+                            help='Worker processes; 0 checks the blocks in this process')
+        parser.add_argument('--fix', action='store_true',
+                            help='Append CORRECTION movements so the ledger matches stock_quantity')
+
+    def handle(self, *args, **options):
+        ranges = id_ranges(max(options['chunk_size'], 1))
+        if options['workers'] < 1:
+            results = [reconcile_range(first, last) for first, last in ranges]
+        else:
+            # Children must not inherit (and share) this process's DB connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+                results = list(pool.map(reconcile_range, *zip(*ranges))) if ranges else []
+        mismatches = [row for block in results for row in block]
+
+        for row in mismatches[:20]:
+            self.stdout.write(
+                f"{row['name']} (#{row['id']}): stock {row['stock_quantity']}, ledger {row['ledger_stock']}"
+            )
+        if len(mismatches) > 20:
+            self.stdout.write(f'... and {len(mismatches) - 20} more')
+        summary = f'{len(mismatches)} mismatched products in {len(ranges)} blocks'
+        if mismatches and options['fix']:
+            correct_ledger(mismatches)
+            self.stdout.write(self.style.SUCCESS(f'{summary}; ledger corrected'))
+        elif mismatches:
+            self.stdout.write(self.style.WARNING(f'{summary} (use --fix to correct the ledger)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,75 @@
+# records/management/commands/run_benchmarks.py
+import json
+import platform
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from records.benchmarks import LATENCY_THRESHOLD, EndpointBenchmark, compare_results
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the hot API endpoints on seeded test databases and compare with a JSON baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', type=int, nargs='+', default=[10_000, 100_000], help='Sales rows per run')
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+        parser.add_argument('--output', type=Path, help='Also write this run to a JSON file')
+        parser.add_argument('--update-baseline', action='store_true', help='Store this run as the new baseline')
+        parser.add_argument('--latency-threshold', type=float, default=LATENCY_THRESHOLD,
+                            help='p95 growth that is reported (0.5 = 50%%); a warning unless --gate-latency')
+        parser.add_argument('--gate-latency', action='store_true',
+                            help='Fail on p95 growth too (only meaningful against a baseline from this machine)')
+        parser.add_argument('--memory-threshold', type=float, default=0.25, help='Allowed peak memory growth')
+
+    def handle(self, *args, **options):
+        benchmark = EndpointBenchmark(iterations=options['iterations'])
+        log = self.stdout.write if options['verbosity'] > 1 else (lambda message: None)
+
+        results = {}
+        for scale in options['scales']:
+            self.stdout.write(f'Seeding and measuring {scale:,} sales...')
+            results[str(scale)] = benchmark.run_scale(scale, seed=options['seed'], log=log)
+            for name, metrics in results[str(scale)].items():
+                self.stdout.write(
+                    f"  {name:<20} p50 {metrics['p50_ms']:8.2f}ms  p95 {metrics['p95_ms']:8.2f}ms  "
+                    f"p99 {metrics['p99_ms']:8.2f}ms  {metrics['queries']:3d} queries  {metrics['peak_kb']:9.1f}KB  "
+                    f"(warm p95 {metrics['warm']['p95_ms']:.2f}ms, {metrics['warm']['queries']} queries)"
+                )
+
+        document = {
+            'machine': {'python': platform.python_version(), 'platform': platform.platform()},
+            'iterations': options['iterations'],
+            'seed': options['seed'],
+            'results': results,
+        }
+        if options['output']:
+            self._write(options['output'], document)
+
+        baseline_path = options['baseline']
+        if options['update_baseline']:
+            self._write(baseline_path, document)
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {baseline_path}'))
+            return
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING(f'No baseline at {baseline_path}; rerun with --update-baseline'))
+            return
+
+        baseline = json.loads(baseline_path.read_text())['results']
+        regressions, warnings = compare_results(
+            baseline, results, options['latency_threshold'], options['memory_threshold'], options['gate_latency']
+        )
+        for warning in warnings:
+            self.stdout.write(self.style.WARNING(f'Slower than baseline (advisory): {warning}'))
+        if regressions:
+            raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
+
+    def _write(self, path, document):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(document, indent=2, sort_keys=True) + '\n')
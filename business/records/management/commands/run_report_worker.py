@@ -0,0 +1,130 @@
+# records/management/commands/run_report_worker.py
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from records.jobs import (
+    JOB_TIMEOUT, STALE_CHECK_INTERVAL, claim_next_job, fail_job, prune_report_jobs, requeue_jobs,
+    requeue_stale_jobs, run_job,
+)
+
+
+def _init_worker():
+    # Needed under the spawn start method; a no-op when the worker was forked
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Run queued report jobs in a local process pool (no broker needed, only the database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2,
+                            help='Worker processes; 0 renders jobs in this process')
+        parser.add_argument('--poll-interval', type=float, default=2.0)
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        self.stale_checked_at = None
+        self.requeue_stale()
+        if options['workers'] < 1:
+            return self.run_inline(options)
+
+        # future -> (job, monotonic time it was submitted)
+        running = {}
+        pool = self.start_pool(options)
+        try:
+            while True:
+                self.requeue_stale()
+                while len(running) < options['workers']:
+                    job = claim_next_job()
+                    if job is None:
+                        break
+                    # Children must not inherit (and share) this process's DB connections
+                    connections.close_all()
+                    try:
+                        future = pool.submit(run_job, job.pk)
+                    except BrokenProcessPool:
+                        requeue_jobs([job.pk])
+                        pool = self.replace_pool(pool, running, options)
+                        continue
+                    running[future] = (job, time.monotonic())
+                    self.stdout.write(f'Started {job}')
+
+                if not running:
+                    prune_report_jobs()
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    job, _ = running.pop(future)
+                    try:
+                        future.result()
+                    except BrokenProcessPool:
+                        # A worker process died (killed, out of memory...) and took the pool with it
+                        broken = True
+                        fail_job(job.pk, 'BrokenProcessPool: the worker process running this job died')
+                    except Exception as e:
+                        # The worker process died before it could record the failure
+                        fail_job(job.pk, f'{type(e).__name__}: {e}')
+                    self.stdout.write(f'Finished {job}')
+
+                now = time.monotonic()
+                overdue = [future for future, (_, started) in running.items()
+                           if now - started > JOB_TIMEOUT.total_seconds()]
+                for future in overdue:
+                    job, _ = running.pop(future)
+                    fail_job(job.pk, f'TimeoutError: the job ran for longer than {JOB_TIMEOUT}')
+                    self.stdout.write(f'Timed out {job}')
+                if broken or overdue:
+                    pool = self.replace_pool(pool, running, options)
+        finally:
+            self.stop_pool(pool)
+
+    def start_pool(self, options):
+        return ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker)
+
+    def stop_pool(self, pool):
+        # ProcessPoolExecutor has no public way to stop a worker that is busy
+        # (or hung), so terminate the processes before shutting it down
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    def replace_pool(self, pool, running, options):
+        """Stop ``pool`` and start a fresh one; jobs still running in it go back in the queue."""
+        requeued = requeue_jobs([job.pk for job, _ in running.values()])
+        running.clear()
+        self.stop_pool(pool)
+        self.stdout.write(f'Restarted the worker pool ({requeued} jobs requeued)')
+        return self.start_pool(options)
+
+    def requeue_stale(self):
+        """Requeue jobs whose worker died, at most every ``STALE_CHECK_INTERVAL``."""
+        now = time.monotonic()
+        if self.stale_checked_at is not None and now - self.stale_checked_at < STALE_CHECK_INTERVAL.total_seconds():
+            return
+        self.stale_checked_at = now
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale jobs')
+
+    def run_inline(self, options):
+        while True:
+            self.requeue_stale()
+            job = claim_next_job()
+            if job is None:
+                prune_report_jobs()
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+                continue
+            run_job(job.pk)
+            self.stdout.write(f'Finished {job}')
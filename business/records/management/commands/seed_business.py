@@ -0,0 +1,55 @@
+# records/management/commands/seed_business.py
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from records.seeding import BusinessSeeder, SeedConfig
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic dataset (users, products, sales) at configurable scale'
+
+    def add_arguments(self, parser):
+        defaults = SeedConfig()
+        parser.add_argument('--seed', type=int, default=defaults.seed)
+        parser.add_argument('--bosses', type=int, default=defaults.bosses)
+        parser.add_argument('--managers', type=int, default=defaults.managers)
+        parser.add_argument('--sellers', type=int, default=defaults.sellers)
+        parser.add_argument('--products', type=int, default=defaults.products)
+        parser.add_argument('--sales', type=int, default=defaults.sales)
+        parser.add_argument('--days', type=int, default=defaults.days, help='Length of the sales history')
+        parser.add_argument('--end-date', help='Last day of history (YYYY-MM-DD, default today); fix it for reproducible dates')
+        parser.add_argument('--growth', type=float, default=defaults.growth, help='Relative volume increase from first to last day')
+        parser.add_argument('--password', default=defaults.password)
+        parser.add_argument('--batch-size', type=int, default=defaults.batch_size)
+
+    def handle(self, *args, **options):
+        end_date = None
+        if options['end_date']:
+            try:
+                end_date = parse_date(options['end_date'])
+            except ValueError:  # well formed but impossible, e.g. 2024-02-30
+                end_date = None
+            if end_date is None:
+                raise CommandError('--end-date must be YYYY-MM-DD')
+
+        config = SeedConfig(
+            seed=options['seed'],
+            bosses=options['bosses'],
+            managers=options['managers'],
+            sellers=options['sellers'],
+            products=options['products'],
+            sales=options['sales'],
+            days=options['days'],
+            end_date=end_date,
+            growth=options['growth'],
+            password=options['password'],
+            batch_size=options['batch_size'],
+        )
+        log = self.stdout.write if options['verbosity'] > 1 else (lambda message: None)
+        try:
+            counts = BusinessSeeder(config, log=log).run()
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            'Seeded {sellers} sellers, {products} products, {sales:,} sales ({rollups:,} rollup rows)'.format(**counts)
+        ))
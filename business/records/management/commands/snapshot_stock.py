@@ -0,0 +1,25 @@
+# records/management/commands/snapshot_stock.py
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from records.ledger import snapshot_cutoff, take_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Checkpoint the stock ledger: snapshot every product that has moved since its last snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--day', help='Snapshot as of the start of this day (YYYY-MM-DD); default today')
+
+    def handle(self, *args, **options):
+        day = None
+        if options['day']:
+            try:
+                day = parse_date(options['day'])
+            except ValueError:  # well formed but impossible, e.g. 2024-02-30
+                day = None
+            if day is None:
+                raise CommandError('--day must be YYYY-MM-DD')
+        taken_at = snapshot_cutoff(day)
+        written = take_snapshots(taken_at)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} stock snapshots as of {taken_at:%Y-%m-%d %H:%M %Z}'))
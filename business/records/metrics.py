@@ -0,0 +1,108 @@
+# records/metrics.py
+"""
+In-process rolling request metrics.
+
+Latencies go into fixed log-spaced buckets, so recording is O(1) and
+memory per view is constant. The window is split into slices that are
+recycled as time moves on, which makes the histograms "rolling" without
+storing individual samples.
+"""
+import bisect
+import threading
+import time
+
+# Upper bounds in milliseconds; the last bucket catches everything slower
+BUCKET_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+WINDOW_SLICES = 12
+SLICE_SECONDS = 300  # 12 x 5 minutes = the last hour
+
+
+class _Slice:
+    __slots__ = ('started', 'buckets', 'count', 'wall_ms', 'db_ms', 'queries', 'duplicate_requests')
+
+    def __init__(self, started):
+        self.started = started
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.wall_ms = 0.0
+        self.db_ms = 0.0
+        self.queries = 0
+        self.duplicate_requests = 0
+
+
+class RollingHistogram:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.slices = []
+
+    def _current(self):
+        now = self.clock()
+        start = now - now % SLICE_SECONDS
+        if not self.slices or self.slices[-1].started != start:
+            self.slices.append(_Slice(start))
+            horizon = start - SLICE_SECONDS * (WINDOW_SLICES - 1)
+            self.slices = [piece for piece in self.slices if piece.started >= horizon]
+        return self.slices[-1]
+
+    def record(self, wall_ms, db_ms, queries, duplicates):
+        piece = self._current()
+        piece.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, wall_ms)] += 1
+        piece.count += 1
+        piece.wall_ms += wall_ms
+        piece.db_ms += db_ms
+        piece.queries += queries
+        piece.duplicate_requests += bool(duplicates)
+
+    def summary(self):
+        self._current()
+        count = sum(piece.count for piece in self.slices)
+        if not count:
+            return None
+        buckets = [sum(column) for column in zip(*(piece.buckets for piece in self.slices))]
+        return {
+            'count': count,
+            'avg_ms': round(sum(piece.wall_ms for piece in self.slices) / count, 2),
+            'p50_ms': self._quantile(buckets, count, 0.50),
+            'p95_ms': self._quantile(buckets, count, 0.95),
+            'p99_ms': self._quantile(buckets, count, 0.99),
+            'avg_db_ms': round(sum(piece.db_ms for piece in self.slices) / count, 2),
+            'avg_queries': round(sum(piece.queries for piece in self.slices) / count, 2),
+            'duplicate_query_requests': sum(piece.duplicate_requests for piece in self.slices),
+            'histogram': dict(zip([f'<={bound}ms' for bound in BUCKET_BOUNDS_MS] + ['slower'], buckets)),
+        }
+
+    @staticmethod
+    def _quantile(buckets, count, fraction):
+        """Upper bound of the bucket holding the quantile (None if it is the overflow bucket)."""
+        target = fraction * count
+        running = 0
+        for index, bucket_count in enumerate(buckets):
+            running += bucket_count
+            if running >= target:
+                return BUCKET_BOUNDS_MS[index] if index < len(BUCKET_BOUNDS_MS) else None
+        return None
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, view, wall_ms, db_ms, queries, duplicates):
+        with self._lock:
+            histogram = self._histograms.get(view)
+            if histogram is None:
+                histogram = self._histograms[view] = RollingHistogram()
+            histogram.record(wall_ms, db_ms, queries, duplicates)
+
+    def snapshot(self):
+        with self._lock:
+            summaries = {view: histogram.summary() for view, histogram in self._histograms.items()}
+        return {view: summary for view, summary in sorted(summaries.items()) if summary}
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,167 @@
+# records/middleware.py
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from .metrics import registry
+from .routers import mark_recent_write
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that counts and times queries and spots repeated SQL."""
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.duplicates = 0
+        self._seen = set()
+        # The report overview runs a request's queries on several threads
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.duration += elapsed
+                self.count += 1
+                # Same SQL with different parameters is the N+1 signature
+                if sql in self._seen:
+                    self.duplicates += 1
+                else:
+                    self._seen.add(sql)
+
+
+# The sampled request's recorder. Context variables follow the request onto
+# the sync_to_async threads its queries run on, which a wrapper installed on
+# the request thread's own connections would miss.
+active_recorder = ContextVar('records_query_recorder', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    recorder = active_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """``connection_created`` receiver: put ``record_query`` on every connection."""
+    if record_query not in connection.execute_wrappers:
+        # First, so that ``execute_wrapper()`` blocks still pop their own wrapper
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class RequestMetricsMiddleware:
+    """
+    Record wall time, query count, DB time and duplicate queries per view.
+
+    Only a ``REQUEST_METRICS_SAMPLE_RATE`` fraction of requests is
+    instrumented; the rest pass straight through. Sampled responses carry a
+    ``Server-Timing`` header and feed the rolling histograms served by the
+    metrics endpoint. Works in sync and async stacks; queries count wherever
+    they run, including on the report overview's own threads.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        token = active_recorder.set(recorder)
+        try:
+            response = self.get_response(request)
+        finally:
+            active_recorder.reset(token)
+        return self.record(request, response, recorder, start)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        token = active_recorder.set(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            active_recorder.reset(token)
+        return self.record(request, response, recorder, start)
+
+    @staticmethod
+    def sampled():
+        sample_rate = getattr(settings, 'REQUEST_METRICS_SAMPLE_RATE', 1.0)
+        return sample_rate > 0 and random.random() < sample_rate
+
+    @staticmethod
+    def record(request, response, recorder, start):
+        wall_ms = (time.perf_counter() - start) * 1000
+        db_ms = recorder.duration * 1000
+
+        match = request.resolver_match
+        view = f"{request.method} {match.view_name if match else 'unresolved'}"
+        registry.record(view, wall_ms, db_ms, recorder.count, recorder.duplicates)
+
+        response['Server-Timing'] = (
+            f'db;dur={db_ms:.1f};desc="{recorder.count} queries, {recorder.duplicates} repeated", '
+            f'total;dur={wall_ms:.1f}'
+        )
+        return response
+
+
+class ReplicaStickyMiddleware:
+    """
+    Pin the user of every successful write request to the primary for a
+    few seconds (see ``records.routers``), whichever view handled it.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self.is_write(request, response):
+            self.mark_user(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self.is_write(request, response):
+            # Resolving the user and the sticky cache both touch the database
+            await sync_to_async(self.mark_user)(request)
+        return response
+
+    @staticmethod
+    def is_write(request, response):
+        return bool(settings.REPLICA_DATABASE_ALIAS) and request.method not in SAFE_METHODS and response.status_code < 400
+
+    @staticmethod
+    def mark_user(request):
+        # DRF copies the token-authenticated user onto the Django request
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            mark_recent_write(user)
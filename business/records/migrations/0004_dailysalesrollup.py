@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    Sale = apps.get_model('records', 'Sale')
+    DailySalesRollup = apps.get_model('records', 'DailySalesRollup')
+    rows = (
+        Sale.objects
+        .annotate(day=TruncDate('sale_date'))
+        .values('day', 'product_id', 'seller_id', 'payment_method')
+        .annotate(
+            quantity=Sum('quantity'),
+            transaction_count=Count('id'),
+            total_sales=Sum('total_amount'),
+            total_profit=Sum('profit'),
+        )
+        .order_by()
+    )
+    DailySalesRollup.objects.bulk_create(
+        (DailySalesRollup(**row) for row in rows.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('records', '0003_alter_product_options_alter_sale_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('payment_method', models.CharField(choices=[('CASH', 'Cash'), ('CARD', 'Card'), ('MOMO', 'Mobile Money')], max_length=50)),
+                ('quantity', models.IntegerField(default=0)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('total_sales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_profit', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='records.product')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalesrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'product', 'seller', 'payment_method'), name='unique_daily_sales_rollup'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
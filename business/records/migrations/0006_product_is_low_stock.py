@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:48
+
+from django.db import migrations, models
+from django.db.models import BooleanField, ExpressionWrapper, F, Q
+
+
+def backfill_low_stock(apps, schema_editor):
+    Product = apps.get_model('records', 'Product')
+    Product.objects.update(is_low_stock=ExpressionWrapper(
+        Q(stock_quantity__lte=F('min_stock_level')), output_field=BooleanField()
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0005_sale_date_product_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='is_low_stock',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_low_stock', True)), fields=['is_low_stock'], name='product_low_stock_idx'),
+        ),
+        migrations.RunPython(backfill_low_stock, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0012_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReorderPointChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('previous_level', models.IntegerField()),
+                ('new_level', models.IntegerField()),
+                ('velocity', models.FloatField(help_text='Units sold per day behind the suggestion')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reorder_point_changes', to='records.product')),
+            ],
+            options={
+                'ordering': ['-changed_at', '-id'],
+            },
+        ),
+    ]
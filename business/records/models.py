@@ -1,7 +1,84 @@
 # records/models.py
-from django.db import models
+from datetime import timedelta
+from itertools import islice
+
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Q, Max, Sum, Count, BooleanField, ExpressionWrapper
+from django.db.models.functions import TruncDate
 from django.core.validators import MinValueValidator
 from django.conf import settings
+from django.db.models.signals import post_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .caching import invalidate_dashboards, invalidate_stock_caches
+from .events import publish_on_commit
+
+class ProductManager(models.Manager):
+    def decrement_stock(self, product_id, quantity, user=None):
+        """
+        Take ``quantity`` units off a product's stock in one conditional UPDATE.
+
+        Returns False (and changes nothing) when there isn't enough stock, so
+        concurrent checkouts can never oversell or lose each other's writes.
+        The SALE movement is written alongside it; callers run both inside
+        their own ``transaction.atomic()`` so they commit together.
+        """
+        updated = self.filter(pk=product_id, stock_quantity__gte=quantity).update(
+            stock_quantity=F('stock_quantity') - quantity,
+            # Right-hand sides see the pre-update row: new stock <= min
+            is_low_stock=ExpressionWrapper(
+                Q(stock_quantity__lte=F('min_stock_level') + quantity),
+                output_field=BooleanField(),
+            ),
+            updated_at=timezone.now(),
+        )
+        if updated:
+            StockMovement.objects.record({product_id: -quantity}, 'SALE', user)
+            invalidate_stock_caches()
+        return bool(updated)
+
+    def adjust_stock(self, product_ids, delta, reason='ADJUSTMENT', user=None):
+        """
+        Add ``delta`` units (negative to remove) to many products in one UPDATE.
+
+        Products that would go below zero are left alone. Returns the ids
+        that were adjusted.
+        """
+        products = self.filter(pk__in=product_ids)
+        if delta < 0:
+            products = products.filter(stock_quantity__gte=-delta)
+        with transaction.atomic():
+            adjusted = list(products.select_for_update().values_list('pk', flat=True))
+            self.filter(pk__in=adjusted).update(
+                stock_quantity=F('stock_quantity') + delta,
+                is_low_stock=ExpressionWrapper(
+                    Q(stock_quantity__lte=F('min_stock_level') - delta),
+                    output_field=BooleanField(),
+                ),
+                updated_at=timezone.now(),
+            )
+            StockMovement.objects.record(dict.fromkeys(adjusted, delta), reason, user)
+            if adjusted:
+                invalidate_stock_caches()
+            for product_id in adjusted:
+                publish_on_commit('stock_changed', {'product_id': product_id, 'delta': delta})
+        return adjusted
+
+    def catalog_version(self):
+        """
+        Return ``(version, last_modified)`` for the whole catalog.
+
+        Every Product write, including checkout decrements, moves
+        ``updated_at`` and deletes change the count, so this pair changes
+        whenever the catalog does. It is derived from the table rather than
+        kept in a counter row so checkouts don't all contend on one row.
+        """
+        stats = self.aggregate(last_modified=Max('updated_at'), count=Count('id'))
+        last_modified = stats['last_modified']
+        stamp = int(last_modified.timestamp() * 1_000_000) if last_modified else 0
+        return f"{stats['count']}-{stamp}", last_modified
+
 
 class Product(models.Model):
     CATEGORY_CHOICES = [
@@ -18,9 +95,46 @@ class Product(models.Model):
     stock_quantity = models.IntegerField(default=0)
     min_stock_level = models.IntegerField(default=5)
     is_active = models.BooleanField(default=True)
+    # Denormalised stock_quantity <= min_stock_level, kept in step on every stock write
+    is_low_stock = models.BooleanField(default=False, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductManager()
+
+    class Meta:
+        indexes = [
+            # Only the (few) low-stock rows are indexed
+            models.Index(fields=['is_low_stock'], condition=Q(is_low_stock=True), name='product_low_stock_idx'),
+            models.Index(fields=['updated_at'], name='product_updated_at_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.is_low_stock = self.stock_quantity <= self.min_stock_level
+        update_fields = kwargs.get('update_fields')
+        tracks_stock = update_fields is None or 'stock_quantity' in update_fields
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding and tracks_stock:
+                # Lock the row so the ledger delta is against what is really stored
+                previous = (
+                    Product.objects.select_for_update().filter(pk=self.pk)
+                    .values_list('stock_quantity', flat=True).first()
+                )
+            super().save(*args, **kwargs)
+            if tracks_stock:
+                if previous is None:
+                    StockMovement.objects.record({self.pk: self.stock_quantity}, 'OPENING')
+                else:
+                    delta = self.stock_quantity - previous
+                    StockMovement.objects.record({self.pk: delta}, 'RESTOCK' if delta > 0 else 'ADJUSTMENT')
+        invalidate_stock_caches()
+        publish_on_commit('stock_changed', {'product_id': self.pk, 'stock_quantity': self.stock_quantity})
+
+    def delete(self, *args, **kwargs):
+        invalidate_stock_caches()
+        return super().delete(*args, **kwargs)
+
     def __str__(self):
         return self.name
 
@@ -44,11 +158,413 @@ class Sale(models.Model):
     seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sales')
     sale_date = models.DateTimeField(auto_now_add=True)
 
-    def save(self, *args, **kwargs):
+    class Meta:
+        indexes = [
+            # Also serves plain sale_date range filters (leading column)
+            models.Index(fields=['sale_date', 'product'], name='sale_date_product_idx'),
+        ]
+
+    def calculate_totals(self):
         self.total_amount = self.quantity * self.sale_price
         if self.product:
             self.profit = self.quantity * (self.sale_price - self.product.cost_price)
+
+    def save(self, *args, **kwargs):
+        self.calculate_totals()
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = Sale.objects.filter(pk=self.pk).first()
+            super().save(*args, **kwargs)
+            # Keep the daily rollups in step with the row we just wrote
+            if previous is not None:
+                DailySalesRollup.objects.apply_sale(previous, sign=-1)
+            DailySalesRollup.objects.apply_sale(self)
+            invalidate_dashboards()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            DailySalesRollup.objects.apply_sale(self, sign=-1)
+            invalidate_dashboards()
+            return super().delete(*args, **kwargs)
+
+    def __str__(self):
+        return f"Sale #{self.id} - {self.product.name if self.product else 'No Product'}"
+
+
+class DailySalesRollupManager(models.Manager):
+    @staticmethod
+    def _bucket_key(sale):
+        return (
+            timezone.localdate(sale.sale_date),
+            sale.product_id,
+            sale.seller_id,
+            sale.payment_method,
+        )
+
+    def apply_sale(self, sale, sign=1):
+        """Add (or with ``sign=-1`` subtract) a sale to its day bucket."""
+        self._apply_bucket(self._bucket_key(sale), {
+            'quantity': sign * sale.quantity,
+            'transaction_count': sign,
+            'total_sales': sign * (sale.total_amount or 0),
+            'total_profit': sign * (sale.profit or 0),
+        }, sign)
+
+    def apply_sales(self, sales, sign=1):
+        """Add (or with ``sign=-1`` subtract) a batch of sales with one write per touched bucket."""
+        buckets = {}
+        for sale in sales:
+            deltas = buckets.setdefault(self._bucket_key(sale), {
+                'quantity': 0, 'transaction_count': 0, 'total_sales': 0, 'total_profit': 0,
+            })
+            deltas['quantity'] += sign * sale.quantity
+            deltas['transaction_count'] += sign
+            deltas['total_sales'] += sign * (sale.total_amount or 0)
+            deltas['total_profit'] += sign * (sale.profit or 0)
+        for key, deltas in buckets.items():
+            self._apply_bucket(key, deltas, sign)
+
+    def _apply_bucket(self, key, deltas, sign=1):
+        key = dict(zip(('day', 'product_id', 'seller_id', 'payment_method'), key))
+        updates = {field: F(field) + value for field, value in deltas.items()}
+        if sign < 0:
+            self.filter(**key).update(**updates)
+            self.filter(**key, transaction_count__lte=0).delete()
+            return
+        if self.filter(**key).update(**updates):
+            return
+        try:
+            with transaction.atomic():
+                self.create(**key, **deltas)
+        except IntegrityError:
+            # Another writer created the bucket first
+            self.filter(**key).update(**updates)
+
+    def rebuild(self, batch_size=1000):
+        """Recompute every bucket from the raw Sale table (archived months are kept as they are)."""
+        rows = (
+            Sale.objects
+            .annotate(day=TruncDate('sale_date'))
+            .values('day', 'product_id', 'seller_id', 'payment_method')
+            .annotate(
+                quantity=Sum('quantity'),
+                transaction_count=Count('id'),
+                total_sales=Sum('total_amount'),
+                total_profit=Sum('profit'),
+            )
+            .order_by()
+            .iterator(chunk_size=batch_size)
+        )
+        created = 0
+        archived = SaleArchive.objects.archived_days()
+        with transaction.atomic():
+            (self.exclude(archived) if archived else self.all()).delete()
+            while True:
+                batch = [self.model(**row) for row in islice(rows, batch_size)]
+                if not batch:
+                    break
+                self.bulk_create(batch)
+                created += len(batch)
+        return created
+
+
+class DailySalesRollup(models.Model):
+    """Pre-aggregated sales per day, product, seller and payment method."""
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='rollups')
+    seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sales_rollups')
+    payment_method = models.CharField(max_length=50, choices=Sale.PAYMENT_METHODS)
+    quantity = models.IntegerField(default=0)
+    transaction_count = models.IntegerField(default=0)
+    total_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_profit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    objects = DailySalesRollupManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'product', 'seller', 'payment_method'],
+                name='unique_daily_sales_rollup',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.product_id} - {self.seller_id} - {self.payment_method}"
+
+
+class Tombstone(models.Model):
+    """Record of a deleted row so delta sync clients can drop it too."""
+    MODEL_CHOICES = [
+        ('product', 'Product'),
+        ('sale', 'Sale'),
+    ]
+
+    model_name = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model_name', 'deleted_at'], name='tombstone_model_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model_name} #{self.object_id} deleted {self.deleted_at}"
+
+
+class StockMovementManager(models.Manager):
+    def record(self, deltas, reason, user=None):
+        """
+        Append one movement per ``{product_id: delta}`` entry (zero deltas
+        are skipped). Call it in the transaction that changes the stock, so
+        the ledger and ``stock_quantity`` commit or roll back together.
+        """
+        now = timezone.now()
+        return self.bulk_create([
+            self.model(product_id=product_id, delta=delta, reason=reason, user=user, created_at=now)
+            for product_id, delta in deltas.items()
+            if delta
+        ])
+
+
+class StockMovement(models.Model):
+    """Append-only ledger of every change to ``Product.stock_quantity``."""
+    REASON_CHOICES = [
+        ('OPENING', 'Opening balance'),
+        ('SALE', 'Sale'),
+        ('RESTOCK', 'Restock'),
+        ('ADJUSTMENT', 'Adjustment'),
+        ('CORRECTION', 'Reconciliation correction'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements')
+    delta = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='stock_movements')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = StockMovementManager()
+
+    class Meta:
+        indexes = [
+            # Stock-at-time tails: one product, movements after its snapshot
+            models.Index(fields=['product', 'created_at'], name='stockmovement_product_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Stock movements are append-only')
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"Sale #{self.id} - {self.product.name if self.product else 'No Product'}"
\ No newline at end of file
+        return f"{self.product_id} {self.delta:+d} ({self.reason})"
+
+
+class StockSnapshot(models.Model):
+    """A product's stock as of ``taken_at``: the sum of its movements up to then."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_snapshots')
+    taken_at = models.DateTimeField()
+    stock_quantity = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            # Also the index behind "latest snapshot at or before X"
+            models.UniqueConstraint(fields=['product', 'taken_at'], name='unique_stock_snapshot'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.taken_at}: {self.stock_quantity}"
+
+
+class ReorderPointChange(models.Model):
+    """Audit trail of ``min_stock_level`` changes made from the stock forecast."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reorder_point_changes')
+    previous_level = models.IntegerField()
+    new_level = models.IntegerField()
+    velocity = models.FloatField(help_text='Units sold per day behind the suggestion')
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-changed_at', '-id']
+
+    def __str__(self):
+        return f"{self.product_id}: {self.previous_level} -> {self.new_level}"
+
+
+class SaleArchiveManager(models.Manager):
+    def archived_days(self):
+        """Q over ``day`` matching every archived month (empty Q when nothing is archived)."""
+        days = Q()
+        for archive in self.all():
+            days |= Q(day__gte=archive.month, day__lt=archive.next_month)
+        return days
+
+
+class SaleArchive(models.Model):
+    """A closed month of sales moved out of the Sale table into columnar chunks."""
+    month = models.DateField(unique=True, help_text='First day of the archived month')
+    row_count = models.IntegerField(default=0)
+    total_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    archived_at = models.DateTimeField(auto_now=True)
+
+    objects = SaleArchiveManager()
+
+    class Meta:
+        ordering = ['month']
+
+    @property
+    def next_month(self):
+        return (self.month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} ({self.row_count} sales)"
+
+
+class SaleArchiveChunk(models.Model):
+    """A slice of an archived month: compressed .npz of its columns."""
+    archive = models.ForeignKey(SaleArchive, on_delete=models.CASCADE, related_name='chunks')
+    seq = models.PositiveIntegerField()
+    row_count = models.IntegerField()
+    data = models.BinaryField()
+
+    class Meta:
+        ordering = ['archive', 'seq']
+        constraints = [
+            models.UniqueConstraint(fields=['archive', 'seq'], name='unique_sale_archive_chunk'),
+        ]
+
+
+class ReportJob(models.Model):
+    """A heavy report or export rendered by the report worker instead of a web request."""
+    KIND_CHOICES = [
+        ('sales_export', 'Sales export'),
+        ('sales_summary', 'Sales summary'),
+    ]
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+    # At most one job per params_key may be in these states at a time
+    ACTIVE_STATUSES = ['PENDING', 'RUNNING']
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict)
+    # Hash of kind + canonical params, used to de-duplicate identical requests
+    params_key = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    progress = models.PositiveSmallIntegerField(default=0)
+    result_name = models.CharField(max_length=255, blank=True, help_text='Download file name of the result')
+    content_type = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='report_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['params_key', 'created_at'], name='reportjob_params_key_idx'),
+            models.Index(fields=['status', 'created_at'], name='reportjob_status_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['params_key'],
+                condition=Q(status__in=['PENDING', 'RUNNING']),
+                name='unique_active_report_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class ReportArtifactChunk(models.Model):
+    """
+    One piece of a finished job's result. Results live in the database so
+    the web process can serve what any worker rendered.
+    """
+    job = models.ForeignKey(ReportJob, on_delete=models.CASCADE, related_name='chunks')
+    seq = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    class Meta:
+        ordering = ['job', 'seq']
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'seq'], name='unique_report_artifact_chunk'),
+        ]
+
+
+class RevokedTokenManager(models.Manager):
+    def revoke(self, jti, user_id, expires_at):
+        """Revoke one API token until it would have expired anyway."""
+        self.filter(expires_at__lte=timezone.now()).delete()
+        return self.create(jti=jti, user_id=user_id, expires_at=expires_at)
+
+    def revoke_user(self, user_id):
+        """Revoke every API token issued to ``user_id`` so far."""
+        self.filter(expires_at__lte=timezone.now()).delete()
+        return self.create(
+            user_id=user_id, expires_at=timezone.now() + timedelta(seconds=settings.API_TOKEN_TTL_SECONDS)
+        )
+
+
+class RevokedToken(models.Model):
+    """
+    An API token (``jti``), or with a blank ``jti`` every token of ``user``
+    issued before ``revoked_at``, that must no longer authenticate. Rows
+    are dropped once the tokens they cover have expired. Rows outlive the
+    user they name, so deleting a user still retires their tokens.
+    """
+    jti = models.CharField(max_length=32, blank=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, related_name='revoked_tokens'
+    )
+    revoked_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+
+    objects = RevokedTokenManager()
+
+    def __str__(self):
+        return f"{self.user_id}: {self.jti or 'all tokens'} until {self.expires_at}"
+
+
+# Signals rather than delete() overrides so queryset and cascade deletes
+# (e.g. a product taking its sales with it) leave tombstones as well
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Sale)
+def record_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(model_name=sender._meta.model_name, object_id=instance.pk)
+
+
+# Tokens carry the role and are checked without reading the user, so a
+# change of role, password or active flag must retire the old ones
+TOKEN_ACCESS_FIELDS = ('role', 'is_active', 'password')
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def revoke_tokens_on_access_change(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(TOKEN_ACCESS_FIELDS):
+        return
+    previous = sender.objects.filter(pk=instance.pk).values(*TOKEN_ACCESS_FIELDS).first()
+    if previous and any(previous[field] != getattr(instance, field) for field in TOKEN_ACCESS_FIELDS):
+        _revoke_user_tokens_on_commit(instance.pk)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def revoke_tokens_on_user_delete(sender, instance, **kwargs):
+    _revoke_user_tokens_on_commit(instance.pk)
+
+
+def _revoke_user_tokens_on_commit(user_id):
+    # Through the revocation list so this process stops accepting them at once
+    from .authentication import revocation_list
+
+    transaction.on_commit(lambda: revocation_list.revoke_user(user_id))
@@ -0,0 +1,93 @@
+# records/renderers.py
+"""
+Opt-in fast list rendering (``?fast=1``).
+
+``ValuesSerializer`` reads a DRF serializer's field list once and then
+serializes straight from ``values()`` rows: no model instances, no
+per-row serializer machinery, and plain ints/strings/bools/ids copied
+as they are. Only Decimal and datetime columns go through their DRF
+field's ``to_representation()``, which keeps the output identical to
+the regular serializer. The result is encoded with orjson and compressed
+with brotli or gzip according to ``Accept-Encoding``.
+"""
+import gzip
+
+import brotli
+import orjson
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework import serializers
+
+FAST_LIST_PARAM = 'fast'
+# Below this a compressed body is not worth the CPU
+COMPRESS_MIN_BYTES = 1024
+# Fields whose values() value is already what DRF would output
+PASSTHROUGH_FIELDS = (
+    serializers.IntegerField, serializers.CharField, serializers.ChoiceField,
+    serializers.BooleanField, serializers.ReadOnlyField, serializers.PrimaryKeyRelatedField,
+)
+
+
+def wants_fast_list(request):
+    return request.query_params.get(FAST_LIST_PARAM, '').lower() in ('1', 'true')
+
+
+class ValuesSerializer:
+    """
+    Serialize ``values()`` rows exactly as ``serializer_class`` would
+    serialize instances. ``annotations`` supply computed (non-column)
+    fields in SQL, e.g. a model property.
+    """
+    def __init__(self, serializer_class, annotations=None):
+        self.annotations = annotations or {}
+        self.columns = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            source = field.source.replace('.', '__')
+            convert = None if isinstance(field, PASSTHROUGH_FIELDS) else field.to_representation
+            self.columns.append((name, source, convert))
+
+    def values(self, queryset):
+        """The ``values()`` queryset these rows must come from."""
+        return queryset.annotate(**self.annotations).values(*[source for _, source, _ in self.columns])
+
+    def to_data(self, rows):
+        columns = self.columns
+        return [
+            {
+                name: row[source] if convert is None or row[source] is None else convert(row[source])
+                for name, source, convert in columns
+            }
+            for row in rows
+        ]
+
+
+def render_json(data):
+    # Match DRF's JSONRenderer, which escapes these for JavaScript
+    return orjson.dumps(data).replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+def _accepted_encodings(request):
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if coding and params.replace(' ', '') not in ('q=0', 'q=0.0'):
+            accepted.add(coding.lower())
+    return accepted
+
+
+def fast_json_response(request, body, headers=None):
+    """An ``application/json`` response for ``body``, compressed if the client accepts it."""
+    response = HttpResponse(content_type='application/json', headers=headers)
+    if len(body) >= COMPRESS_MIN_BYTES:
+        accepted = _accepted_encodings(request)
+        if 'br' in accepted:
+            body = brotli.compress(body, quality=4)
+            response['Content-Encoding'] = 'br'
+        elif 'gzip' in accepted:
+            body = gzip.compress(body, compresslevel=6, mtime=0)
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+    response.content = body
+    return response
@@ -0,0 +1,190 @@
+# records/reports.py
+import asyncio
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.db.models import Count, DecimalField, F, FloatField, Q, Sum, Value, Window
+from django.db.models.functions import Cast, Coalesce, Rank
+from django.utils import timezone
+
+from .models import DailySalesRollup, Product
+
+TOP_PRODUCTS_LIMIT = 5
+LEADERBOARD_PAGE_SIZE = 25
+OVERVIEW_LOW_STOCK_LIMIT = 20
+OVERVIEW_SELLERS_LIMIT = 10
+
+# Report window name -> number of days before today it reaches back
+REPORT_WINDOWS = {
+    'daily': 0,
+    'weekly': 6,
+    'monthly': 29,
+}
+
+
+def profit_loss_summary(today=None, top_limit=TOP_PRODUCTS_LIMIT):
+    """
+    Build the daily/weekly/monthly totals and top products in one query.
+
+    The rollups are scanned once over the widest window and grouped by
+    product; each window is a conditional sum, so the per-window totals are
+    just the column sums of the (at most one row per product) result.
+    """
+    today = today or timezone.localdate()
+    widest = max(REPORT_WINDOWS.values())
+
+    annotations = {'total_quantity': Sum('quantity')}
+    for name, days in REPORT_WINDOWS.items():
+        in_window = Q(day__gte=today - timedelta(days=days))
+        annotations[f'{name}_sales'] = Sum('total_sales', filter=in_window)
+        annotations[f'{name}_profit'] = Sum('total_profit', filter=in_window)
+        annotations[f'{name}_count'] = Sum('transaction_count', filter=in_window)
+
+    rows = list(
+        DailySalesRollup.objects
+        .filter(day__gte=today - timedelta(days=widest), day__lte=today)
+        .values('product_id', 'product__name')
+        .annotate(**annotations)
+        .order_by()
+    )
+
+    report = {}
+    for name in REPORT_WINDOWS:
+        report[name] = {
+            'total_sales': float(sum(row[f'{name}_sales'] or 0 for row in rows)),
+            'total_profit': float(sum(row[f'{name}_profit'] or 0 for row in rows)),
+            'transaction_count': sum(row[f'{name}_count'] or 0 for row in rows)
+        }
+
+    widest_name = max(REPORT_WINDOWS, key=REPORT_WINDOWS.get)
+    rows.sort(key=lambda row: row[f'{widest_name}_sales'] or 0, reverse=True)
+    report['top_products'] = [
+        {
+            'product_id': row['product_id'],
+            'product_name': row['product__name'],
+            'total_quantity': row['total_quantity'] or 0,
+            'total_sales': float(row[f'{widest_name}_sales'] or 0),
+            'total_profit': float(row[f'{widest_name}_profit'] or 0)
+        }
+        for row in rows[:top_limit]
+    ]
+    return report
+
+
+def seller_leaderboard(period='weekly', today=None, offset=0, limit=LEADERBOARD_PAGE_SIZE):
+    """
+    Rank sellers for one report window against the window just before it.
+
+    One grouped query over the rollups sums both windows per seller; RANK()
+    windows order sellers by current and previous sales, and COUNT() OVER ()
+    carries the total number of sellers, so a page of any size costs one
+    query however many sellers there are.
+    """
+    if period not in REPORT_WINDOWS:
+        raise ValueError(f"period must be one of {', '.join(REPORT_WINDOWS)}")
+    today = today or timezone.localdate()
+    span = REPORT_WINDOWS[period] + 1
+    start = today - timedelta(days=span - 1)
+    previous_start = start - timedelta(days=span)
+
+    current, previous = Q(day__gte=start), Q(day__lt=start)
+    zero = Value(0, output_field=DecimalField())
+    rows = list(
+        DailySalesRollup.objects
+        .filter(day__gte=previous_start, day__lte=today)
+        .values('seller_id', 'seller__username')
+        .annotate(
+            sales=Coalesce(Sum('total_sales', filter=current), zero),
+            profit=Coalesce(Sum('total_profit', filter=current), zero),
+            transactions=Coalesce(Sum('transaction_count', filter=current), 0),
+            previous_sales=Coalesce(Sum('total_sales', filter=previous), zero),
+        )
+        .annotate(
+            # Cast: SQLite cannot order a window by a NUMERIC-wrapped aggregate
+            rank=Window(Rank(), order_by=Cast(F('sales'), FloatField()).desc()),
+            previous_rank=Window(Rank(), order_by=Cast(F('previous_sales'), FloatField()).desc()),
+            sellers=Window(Count('seller_id')),
+        )
+        .order_by('rank', 'seller_id')[offset:offset + limit]
+    )
+
+    results = []
+    for row in rows:
+        total_sales, previous_sales = float(row['sales']), float(row['previous_sales'])
+        count = row['transactions']
+        results.append({
+            'rank': row['rank'],
+            'previous_rank': row['previous_rank'] if previous_sales else None,
+            'seller_id': row['seller_id'],
+            'seller_name': row['seller__username'],
+            'total_sales': total_sales,
+            'total_profit': float(row['profit']),
+            'transaction_count': count,
+            'average_ticket': round(total_sales / count, 2) if count else 0,
+            'previous_sales': previous_sales,
+            'change': round((total_sales - previous_sales) / previous_sales, 4) if previous_sales else None,
+        })
+    return {
+        'period': period,
+        'start': start,
+        'end': today,
+        'count': rows[0]['sellers'] if rows else 0,
+        'results': results,
+    }
+
+
+def low_stock_summary(limit=OVERVIEW_LOW_STOCK_LIMIT):
+    """Active low-stock products, emptiest first, from the partial index."""
+    rows = list(
+        Product.objects.filter(is_low_stock=True, is_active=True)
+        .annotate(low_stock_count=Window(Count('id')))
+        .order_by('stock_quantity', 'id')
+        .values('id', 'name', 'stock_quantity', 'min_stock_level', 'low_stock_count')[:limit]
+    )
+    return {
+        'count': rows[0]['low_stock_count'] if rows else 0,
+        'results': [
+            {
+                'product_id': row['id'],
+                'product_name': row['name'],
+                'stock_quantity': row['stock_quantity'],
+                'min_stock_level': row['min_stock_level'],
+            }
+            for row in rows
+        ],
+    }
+
+
+def _in_own_thread(function, *args):
+    """
+    Run ``function`` on an executor thread with its own database connection.
+
+    Django's async ORM methods all hop onto the one thread-sensitive
+    executor, so gathering them still runs the queries one after another;
+    ``thread_sensitive=False`` is what lets independent queries overlap.
+    The connection is recycled per ``CONN_MAX_AGE`` like a request's, and
+    its queries still count towards a sampled request's metrics (see
+    ``records.middleware.active_recorder``).
+    """
+    def run():
+        close_old_connections()
+        try:
+            return function(*args)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)()
+
+
+async def report_overview(today=None):
+    """
+    The boss dashboard payload: window totals and top products, low stock
+    and the month's top sellers, queried concurrently.
+    """
+    today = today or timezone.localdate()
+    summary, low_stock, sellers = await asyncio.gather(
+        _in_own_thread(profit_loss_summary, today),
+        _in_own_thread(low_stock_summary),
+        _in_own_thread(seller_leaderboard, 'monthly', today, 0, OVERVIEW_SELLERS_LIMIT),
+    )
+    return {**summary, 'low_stock': low_stock, 'sellers': sellers}
@@ -0,0 +1,79 @@
+# records/routers.py
+"""
+Read-replica routing for reports and exports.
+
+Nothing is sent to the replica implicitly: report, analytics and export
+views opt in with ``@replica_reads`` (or ``reads_from()``), and only
+while ``settings.REPLICA_DATABASE_ALIAS`` is configured. A user whose
+request just wrote anything (``ReplicaStickyMiddleware``) is pinned to
+the primary for ``REPLICA_STICKY_SECONDS`` so their own reports always
+include it, however far the replica lags. The marker lives in the
+``replica-sticky`` cache, which every web process and worker shares.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpRequest
+from rest_framework.request import Request
+
+# Longer than the replica's normal replication lag
+REPLICA_STICKY_SECONDS = 15
+STICKY_CACHE_ALIAS = 'replica-sticky'
+
+_read_alias = ContextVar('records_read_alias', default=None)
+
+
+def _sticky_key(user):
+    return f'records:replica-sticky:{user.pk}'
+
+
+def mark_recent_write(user):
+    """Pin ``user``'s reads to the primary for the next few seconds."""
+    if settings.REPLICA_DATABASE_ALIAS and user.pk:
+        caches[STICKY_CACHE_ALIAS].set(_sticky_key(user), True, REPLICA_STICKY_SECONDS)
+
+
+def read_alias(request):
+    """The database this request's report reads should use."""
+    alias = settings.REPLICA_DATABASE_ALIAS
+    if not alias or (request.user.pk and caches[STICKY_CACHE_ALIAS].get(_sticky_key(request.user))):
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+@contextmanager
+def reads_from(alias):
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def replica_reads(view):
+    """Run a view (function or viewset method) with its reads routed by ``read_alias()``."""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        request = next(arg for arg in args if isinstance(arg, (Request, HttpRequest)))
+        with reads_from(read_alias(request)):
+            return view(*args, **kwargs)
+    return wrapped
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, settings.REPLICA_DATABASE_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
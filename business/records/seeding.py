@@ -0,0 +1,213 @@
+# records/seeding.py
+"""
+Deterministic synthetic data for development, perf tests and benchmarks.
+
+Everything is drawn from one ``random.Random(seed)`` and anchored to an
+explicit end date, so the same arguments always produce the same rows.
+Sales are skewed the way real tills are: a few products sell most of the
+volume (Zipf), trade grows over the period, weekends and lunch/evening
+hours are busier, and most baskets are a single unit.
+"""
+import csv
+import io
+import random
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Product, Sale, DailySalesRollup, StockMovement
+
+User = get_user_model()
+
+SEED_USERNAME_PREFIX = 'seed-'
+
+PRODUCT_TEMPLATES = {
+    'DATA_PLANS': (['4G Data Plan', '5G Data Plan', 'Night Data Bundle', 'Weekly Data Pass'], (2000, 60000)),
+    'ROUTERS': (['Fiber Optic Router', 'Mesh Wi-Fi Node', 'Portable MiFi', '4G Home Router'], (45000, 350000)),
+    'BUNDLES': (['Home Internet Bundle', 'Family Combo', 'Business Starter Pack', 'Student Bundle'], (20000, 150000)),
+    'ACCESSORIES': (['Ethernet Cable', 'Signal Booster', 'Power Bank', 'SIM Adapter Kit'], (1500, 40000)),
+}
+QUANTITY_WEIGHTS = {1: 70, 2: 20, 3: 7, 5: 3}
+PAYMENT_WEIGHTS = {'CASH': 50, 'MOMO': 35, 'CARD': 15}
+# Monday..Sunday
+WEEKDAY_WEIGHTS = [0.9, 0.85, 0.9, 1.0, 1.2, 1.4, 0.8]
+# Trading hours 08:00-21:00 with lunch and after-work peaks
+HOUR_WEIGHTS = {8: 3, 9: 5, 10: 6, 11: 8, 12: 10, 13: 10, 14: 7, 15: 6, 16: 7, 17: 9, 18: 10, 19: 8, 20: 5, 21: 2}
+
+
+@dataclass
+class SeedConfig:
+    seed: int = 42
+    bosses: int = 1
+    managers: int = 2
+    sellers: int = 10
+    products: int = 1000
+    sales: int = 100_000
+    days: int = 365
+    end_date: object = None
+    growth: float = 1.0
+    zipf_exponent: float = 1.1
+    password: str = 'password'
+    batch_size: int = 10_000
+
+
+SALE_INSERT_COLUMNS = (
+    'product_id', 'quantity', 'sale_price', 'total_amount', 'profit', 'payment_method', 'seller_id', 'sale_date',
+)
+
+
+def insert_sales(sales):
+    """
+    Insert unsaved ``sales`` keeping the ``sale_date`` each one carries.
+
+    ``bulk_create()`` would stamp them with now() (``auto_now_add``), so the
+    rows are written directly: COPY on PostgreSQL, a parameterised
+    executemany elsewhere. Stock, rollups and the ledger are left alone.
+    """
+    table = Sale._meta.db_table
+    if connection.vendor == 'postgresql':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for sale in sales:
+            writer.writerow([getattr(sale, column) for column in SALE_INSERT_COLUMNS])
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.cursor.copy_expert(
+                f"COPY {table} ({', '.join(SALE_INSERT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        return
+    fields = {field.attname: field for field in Sale._meta.concrete_fields}
+    fields = [fields[column] for column in SALE_INSERT_COLUMNS]
+    rows = [[field.get_db_prep_save(getattr(sale, field.attname), connection) for field in fields] for sale in sales]
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(SALE_INSERT_COLUMNS)}) "
+            f"VALUES ({', '.join(['%s'] * len(SALE_INSERT_COLUMNS))})",
+            rows,
+        )
+
+
+class BusinessSeeder:
+    def __init__(self, config, log=lambda message: None):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.log = log
+
+    def run(self):
+        config = self.config
+        if config.sellers < 1 or config.products < 1:
+            raise ValueError('Need at least one seller and one product')
+        if User.objects.filter(username__startswith=SEED_USERNAME_PREFIX).exists():
+            raise ValueError('This database has already been seeded')
+
+        with transaction.atomic():
+            sellers = self.create_users()
+            products = self.create_products()
+        self.log(f'{len(sellers)} sellers, {len(products)} products')
+
+        created = 0
+        for batch in self.sale_batches(products, sellers):
+            with transaction.atomic():
+                insert_sales(batch)
+            created += len(batch)
+            self.log(f'{created:,}/{config.sales:,} sales')
+
+        rollups = DailySalesRollup.objects.rebuild()
+        self.log(f'{rollups:,} rollup rows')
+        return {'sellers': len(sellers), 'products': len(products), 'sales': created, 'rollups': rollups}
+
+    def create_users(self):
+        config = self.config
+        password = make_password(config.password)  # hash once, not per user
+        users = []
+        for role, count in (('BOSS', config.bosses), ('MANAGER', config.managers), ('SELLER', config.sellers)):
+            for i in range(1, count + 1):
+                users.append(User(
+                    username=f'{SEED_USERNAME_PREFIX}{role.lower()}-{i}',
+                    email=f'{role.lower()}{i}@seed.local',
+                    password=password,
+                    role=role,
+                    employee_id=f'SEED-{role[:3]}{i:04d}',
+                ))
+        users = User.objects.bulk_create(users, batch_size=config.batch_size)
+        return [user for user in users if user.role == 'SELLER']
+
+    def create_products(self):
+        config, rng = self.config, self.rng
+        products = []
+        for i in range(config.products):
+            category = rng.choice(list(PRODUCT_TEMPLATES))
+            names, (low, high) = PRODUCT_TEMPLATES[category]
+            price = Decimal(rng.randrange(low, high, 500))
+            cost_price = (price * Decimal(rng.uniform(0.55, 0.85))).quantize(Decimal('1'))
+            stock = rng.randint(0, 500)
+            min_stock = rng.choice([5, 10, 20])
+            products.append(Product(
+                name=f'{rng.choice(names)} {i + 1:05d}',
+                category_name=category,
+                price=price,
+                cost_price=cost_price,
+                stock_quantity=stock,
+                min_stock_level=min_stock,
+                is_low_stock=stock <= min_stock,
+                is_active=rng.random() > 0.03,
+            ))
+        products = Product.objects.bulk_create(products, batch_size=config.batch_size)
+        # bulk_create skips save(), so open the stock ledger here
+        StockMovement.objects.record({product.pk: product.stock_quantity for product in products}, 'OPENING')
+        return products
+
+    def sale_batches(self, products, sellers):
+        config, rng = self.config, self.rng
+        end_date = config.end_date or timezone.localdate()
+        start_date = end_date - timedelta(days=config.days - 1)
+        tz = timezone.get_current_timezone()
+
+        ranked = products[:]
+        rng.shuffle(ranked)
+        product_cum = list(accumulate(1 / (rank ** config.zipf_exponent) for rank in range(1, len(ranked) + 1)))
+        day_list = [start_date + timedelta(days=d) for d in range(config.days)]
+        day_cum = list(accumulate(
+            (1 + config.growth * d / max(config.days - 1, 1)) * WEEKDAY_WEIGHTS[day.weekday()]
+            for d, day in enumerate(day_list)
+        ))
+        seller_cum = list(accumulate(rng.uniform(0.5, 2.0) for _ in sellers))
+        hours, hour_cum = list(HOUR_WEIGHTS), list(accumulate(HOUR_WEIGHTS.values()))
+        quantities, quantity_cum = list(QUANTITY_WEIGHTS), list(accumulate(QUANTITY_WEIGHTS.values()))
+        methods, method_cum = list(PAYMENT_WEIGHTS), list(accumulate(PAYMENT_WEIGHTS.values()))
+
+        remaining = config.sales
+        while remaining:
+            size = min(config.batch_size, remaining)
+            remaining -= size
+            batch = []
+            for product, day, seller, hour, quantity, method in zip(
+                rng.choices(ranked, cum_weights=product_cum, k=size),
+                rng.choices(day_list, cum_weights=day_cum, k=size),
+                rng.choices(sellers, cum_weights=seller_cum, k=size),
+                rng.choices(hours, cum_weights=hour_cum, k=size),
+                rng.choices(quantities, cum_weights=quantity_cum, k=size),
+                rng.choices(methods, cum_weights=method_cum, k=size),
+            ):
+                sale_price = product.price
+                if rng.random() < 0.1:
+                    sale_price = (sale_price * Decimal('0.9')).quantize(Decimal('0.01'))
+                moment = datetime.combine(day, time(hour, rng.randrange(60), rng.randrange(60), rng.randrange(1_000_000)))
+                sale = Sale(
+                    product=product,
+                    quantity=quantity,
+                    sale_price=sale_price,
+                    payment_method=method,
+                    seller=seller,
+                    sale_date=timezone.make_aware(moment, tz),
+                )
+                sale.calculate_totals()
+                batch.append(sale)
+            batch.sort(key=lambda sale: sale.sale_date)
+            yield batch
@@ -1,7 +1,8 @@
 # records/serializers.py
 from rest_framework import serializers
-from django.contrib.auth import get_user_model
-from .models import Product, Sale
+from django.contrib.auth import authenticate, get_user_model
+from .models import Product, Sale, ReportJob
+from .exports import EXPORT_FORMATS
 
 User = get_user_model()
 
@@ -19,4 +20,61 @@ class SaleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Sale
         fields = '__all__'
-        read_only_fields = ('total_amount', 'profit', 'seller', 'sale_date')
\ No newline at end of file
+        read_only_fields = ('total_amount', 'profit', 'seller', 'sale_date')
+
+    def validate_quantity(self, value):
+        if value < 1:
+            raise serializers.ValidationError('Quantity must be at least 1')
+        return value
+
+class BulkSaleItemSerializer(serializers.Serializer):
+    """One till sale in a bulk upload; products are resolved by the view in a single query."""
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+    sale_price = serializers.DecimalField(max_digits=10, decimal_places=2, default=0)
+    payment_method = serializers.ChoiceField(choices=Sale.PAYMENT_METHODS, default='CASH')
+
+class SalesExportJobParamsSerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    seller = serializers.IntegerField(required=False)
+    export_format = serializers.ChoiceField(choices=list(EXPORT_FORMATS), default='csv')
+    gzip = serializers.BooleanField(default=False)
+
+class SalesSummaryJobParamsSerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    period = serializers.ChoiceField(choices=['day', 'week', 'month'], default='month')
+
+REPORT_JOB_PARAMS_SERIALIZERS = {
+    'sales_export': SalesExportJobParamsSerializer,
+    'sales_summary': SalesSummaryJobParamsSerializer,
+}
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    requested_by_name = serializers.CharField(source='requested_by.username', read_only=True, default=None)
+
+    class Meta:
+        model = ReportJob
+        fields = ('id', 'kind', 'params', 'status', 'progress', 'error', 'content_type',
+                  'requested_by', 'requested_by_name', 'created_at', 'started_at', 'finished_at')
+        read_only_fields = ('status', 'progress', 'error', 'content_type', 'requested_by', 'created_at', 'started_at', 'finished_at')
+
+    def validate(self, attrs):
+        # Normalise params so identical requests hash to the same job
+        params = REPORT_JOB_PARAMS_SERIALIZERS[attrs['kind']](data=attrs.get('params') or {})
+        params.is_valid(raise_exception=True)
+        attrs['params'] = {key: value for key, value in params.data.items() if value is not None}
+        return attrs
+
+class TokenRequestSerializer(serializers.Serializer):
+    username = serializers.CharField()
+    password = serializers.CharField(write_only=True, trim_whitespace=False)
+
+    def validate(self, attrs):
+        user = authenticate(self.context.get('request'), username=attrs['username'], password=attrs['password'])
+        # authenticate() already refuses inactive users
+        if user is None:
+            raise serializers.ValidationError('Invalid username or password')
+        attrs['user'] = user
+        return attrs
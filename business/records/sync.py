@@ -0,0 +1,118 @@
+# records/sync.py
+"""
+Delta sync: ``?since=<token>`` returns only rows changed after the token.
+
+Tokens are opaque to clients (microseconds since the epoch). A new token is
+taken slightly before the query runs so rows committed late by concurrent
+transactions are picked up on the next sync; clients therefore see a few
+rows twice and must apply results as upserts.
+
+Results come in keyset pages over ``(timestamp, id)``. While ``next`` is
+set the client follows it (it carries the sync's ``since`` and ``token``)
+and only stores ``token`` once a page comes back with ``next: null``.
+"""
+import base64
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
+
+from .models import Tombstone
+from .pagination import KeysetPagination
+
+SYNC_OVERLAP = timedelta(seconds=5)
+# Tokens older than this may have missed pruned tombstones: force a full resync
+TOMBSTONE_RETENTION = timedelta(days=30)
+SYNC_PAGE_SIZE = 500
+SYNC_MAX_PAGE_SIZE = 2000
+
+
+def encode_token(moment):
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def decode_token(token):
+    try:
+        return datetime.fromtimestamp(int(token) / 1_000_000, tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise ValidationError({'since': ['Invalid sync token']})
+
+
+class SyncPagination(KeysetPagination):
+    """
+    Keyset pages over ``(timestamp_field, id)`` for one sync. The cursor
+    also carries the sync's ``since`` and ``token`` so every page of it
+    answers the same question.
+    """
+    page_size = SYNC_PAGE_SIZE
+    max_page_size = SYNC_MAX_PAGE_SIZE
+
+    def __init__(self, timestamp_field):
+        self.ordering = (timestamp_field, 'id')
+
+    def encode_sync_cursor(self, since_token, token, last):
+        return self.encode_cursor([since_token, token] + [self._value(last, field) for field in self.ordering])
+
+    def decode_sync_cursor(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (TypeError, ValueError):
+            values = None
+        if not isinstance(values, list) or len(values) != 2 + len(self.ordering):
+            raise ValidationError({'cursor': ['Invalid sync cursor']})
+        since_token, token, *seek = values
+        return since_token, token, seek
+
+
+def sync_payload(queryset, timestamp_field, serializer_class, request, context=None):
+    """
+    Build ``{'token', 'reset', 'results', 'deleted', 'next'}`` for
+    ``queryset`` from the request's ``?since=``, ``?cursor=`` and
+    ``?page_size=``.
+
+    Without a token (or with one older than the tombstone retention) the
+    whole queryset is returned with ``reset: true`` so the client replaces
+    its copy; otherwise only rows whose ``timestamp_field`` moved, plus the
+    ids deleted (on the first page), since the token.
+    """
+    params = request.query_params
+    paginator = SyncPagination(timestamp_field)
+    page_size = paginator.get_page_size(request)
+    now = timezone.now()
+    if params.get('cursor'):
+        since_token, token, seek = paginator.decode_sync_cursor(params['cursor'])
+    else:
+        since_token, token, seek = params.get('since'), encode_token(now - SYNC_OVERLAP), None
+    since = decode_token(since_token) if since_token else None
+    reset = since is None or since < decode_token(token) - TOMBSTONE_RETENTION
+
+    deleted = []
+    if not reset:
+        queryset = queryset.filter(**{f'{timestamp_field}__gte': since})
+        if seek is None:
+            deleted = list(
+                Tombstone.objects
+                .filter(model_name=queryset.model._meta.model_name, deleted_at__gte=since)
+                .values_list('object_id', flat=True)
+            )
+    queryset = queryset.order_by(*paginator.ordering)
+    if seek is not None:
+        queryset = queryset.filter(paginator._seek_filter(seek))
+
+    rows = list(queryset[:page_size + 1])
+    next_url = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        url = replace_query_param(request.build_absolute_uri(), paginator.page_size_query_param, page_size)
+        next_url = replace_query_param(
+            url, paginator.cursor_query_param, paginator.encode_sync_cursor(since_token, token, rows[-1])
+        )
+    return {
+        'token': token,
+        'reset': reset,
+        'results': serializer_class(rows, many=True, context=context).data,
+        'deleted': deleted,
+        'next': next_url,
+    }
@@ -1,3 +1,1362 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import brotli
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core import signing
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from .analytics import SalesCube, sales_cube
+from .archive import _columns, archive_month
+from .authentication import TOKEN_SALT, issue_stream_ticket, issue_token, revocation_list, user_from_stream_ticket
+from .benchmarks import EndpointBenchmark, compare_results
+from .forecasting import StockForecaster
+from .jobs import requeue_stale_jobs
+from .ledger import snapshot_cutoff, stock_at, take_snapshots
+from .events import broker
+from .metrics import registry as metrics_registry
+from .middleware import QueryRecorder, ReplicaStickyMiddleware, RequestMetricsMiddleware
+from .routers import STICKY_CACHE_ALIAS
+from .models import (
+    Product, Sale, DailySalesRollup, ReorderPointChange, ReportJob, RevokedToken, SaleArchive, StockMovement, Tombstone,
+)
+from .seeding import BusinessSeeder, SeedConfig
+from .sync import encode_token
+from .views import live_events
+
+User = get_user_model()
+
+
+class RecordsTestMixin:
+    def setUp(self):
+        self.boss = User.objects.create_user(username='boss', password='password', role='BOSS', employee_id='BOSS001')
+        self.seller = User.objects.create_user(username='seller', password='password', role='SELLER', employee_id='SEL001')
+        self.router = Product.objects.create(name='Router', category_name='ROUTERS', price=100, cost_price=60, stock_quantity=50)
+        self.plan = Product.objects.create(name='Data Plan', price=20, cost_price=5, stock_quantity=50)
+
+    def make_sale(self, product, quantity=1, days_ago=0, **kwargs):
+        sale = Sale.objects.create(product=product, quantity=quantity, sale_price=product.price, seller=self.seller, **kwargs)
+        if days_ago:
+            sale.sale_date = timezone.now() - timedelta(days=days_ago)
+            sale.save()
+        return sale
+
+
+class DailySalesRollupTests(RecordsTestMixin, TestCase):
+    def test_sale_save_updates_rollup(self):
+        self.make_sale(self.router, quantity=2)
+        self.make_sale(self.router, quantity=1)
+        rollup = DailySalesRollup.objects.get()
+        self.assertEqual(rollup.quantity, 3)
+        self.assertEqual(rollup.transaction_count, 2)
+        self.assertEqual(rollup.total_sales, Decimal('300'))
+        self.assertEqual(rollup.total_profit, Decimal('120'))
+
+    def test_edit_and_delete_move_rollup(self):
+        sale = self.make_sale(self.plan, quantity=2, days_ago=3)
+        rollup = DailySalesRollup.objects.get()
+        self.assertEqual(rollup.day, timezone.localdate() - timedelta(days=3))
+        self.assertEqual(rollup.quantity, 2)
+        sale.delete()
+        self.assertFalse(DailySalesRollup.objects.exists())
+
+    def test_rebuild_matches_incremental(self):
+        self.make_sale(self.router, quantity=2, payment_method='CARD')
+        self.make_sale(self.plan, quantity=4, days_ago=10)
+        self.make_sale(self.plan, quantity=1)
+        expected = sorted(DailySalesRollup.objects.values_list(
+            'day', 'product_id', 'payment_method', 'quantity', 'transaction_count', 'total_sales', 'total_profit'))
+        DailySalesRollup.objects.rebuild()
+        rebuilt = sorted(DailySalesRollup.objects.values_list(
+            'day', 'product_id', 'payment_method', 'quantity', 'transaction_count', 'total_sales', 'total_profit'))
+        self.assertEqual(rebuilt, expected)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ProfitLossReportTests(RecordsTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.boss)
+
+    def test_report_windows_and_top_products(self):
+        self.make_sale(self.router, quantity=1)
+        self.make_sale(self.plan, quantity=2, days_ago=3)
+        self.make_sale(self.plan, quantity=5, days_ago=20)
+        self.make_sale(self.router, quantity=9, days_ago=40)
+
+        response = self.client.get(reverse('profit-loss-report'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['daily'], {'total_sales': 100.0, 'total_profit': 40.0, 'transaction_count': 1})
+        self.assertEqual(response.data['weekly'], {'total_sales': 140.0, 'total_profit': 70.0, 'transaction_count': 2})
+        self.assertEqual(response.data['monthly'], {'total_sales': 240.0, 'total_profit': 145.0, 'transaction_count': 3})
+        self.assertEqual(
+            [(row['product_name'], row['total_quantity']) for row in response.data['top_products']],
+            [('Data Plan', 7), ('Router', 1)],
+        )
+
+    def test_report_is_a_single_query(self):
+        for days_ago in (0, 2, 5, 12, 25):
+            self.make_sale(self.router, days_ago=days_ago)
+            self.make_sale(self.plan, days_ago=days_ago, payment_method='MOMO')
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('profit-loss-report'))
+
+        self.assertEqual(response.data['monthly']['transaction_count'], 10)
+        self.assertEqual(len(response.data['top_products']), 2)
+
+    def test_report_requires_boss(self):
+        self.client.force_authenticate(self.seller)
+        response = self.client.get(reverse('profit-loss-report'))
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SaleCheckoutTests(RecordsTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def test_create_decrements_stock(self):
+        response = self.client.post(reverse('sale-list'), {'product': self.router.pk, 'quantity': 3, 'sale_price': '100'})
+        self.assertEqual(response.status_code, 201)
+        self.router.refresh_from_db()
+        self.assertEqual(self.router.stock_quantity, 47)
+        self.assertEqual(response.data['seller'], self.seller.pk)
+
+    def test_oversell_is_rejected(self):
+        response = self.client.post(reverse('sale-list'), {'product': self.router.pk, 'quantity': 51, 'sale_price': '100'})
+        self.assertEqual(response.status_code, 400)
+        self.router.refresh_from_db()
+        self.assertEqual(self.router.stock_quantity, 50)
+        self.assertFalse(Sale.objects.exists())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class LowStockTests(RecordsTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def low_stock_names(self):
+        return [row['name'] for row in self.client.get(reverse('product-low-stock')).data]
+
+    def test_checkout_flags_product_and_invalidates_cache(self):
+        self.assertEqual(self.low_stock_names(), [])
+        with self.assertNumQueries(0):
+            self.low_stock_names()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('sale-list'), {'product': self.plan.pk, 'quantity': 45, 'sale_price': '20'})
+
+        self.plan.refresh_from_db()
+        self.assertTrue(self.plan.is_low_stock)
+        self.assertEqual(self.low_stock_names(), ['Data Plan'])
+
+    def test_admin_style_save_updates_flag(self):
+        self.low_stock_names()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.router.min_stock_level = 60
+            self.router.save()
+        self.assertEqual(self.low_stock_names(), ['Router'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ProductCatalogCachingTests(RecordsTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def test_etag_round_trip(self):
+        first = self.client.get(reverse('product-list'))
+        self.assertEqual(len(first.data), 2)
+
+        # Only the version query runs for a revalidation
+        with self.assertNumQueries(1):
+            cached = self.client.get(reverse('product-list'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+        self.client.post(reverse('sale-list'), {'product': self.plan.pk, 'quantity': 1, 'sale_price': '20'})
+        changed = self.client.get(reverse('product-list'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+        self.assertEqual(changed.data[1]['stock_quantity'], 49)
+
+    def test_repeat_requests_are_served_from_cache(self):
+        url = reverse('product-detail', args=[self.router.pk])
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.data['name'], 'Router')
+        self.assertIn('Last-Modified', response)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class DeltaSyncTests(RecordsTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.boss)
+
+    def test_initial_sync_is_a_full_reset(self):
+        response = self.client.get(reverse('product-sync'))
+        self.assertTrue(response.data['reset'])
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertTrue(response.data['token'])
+
+    def test_incremental_sync_returns_changes_and_tombstones(self):
+        since = encode_token(timezone.now())
+        Product.objects.filter(pk=self.router.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.plan.price = 25
+        self.plan.save()
+        sale = self.make_sale(self.plan)
+        old_sale = self.make_sale(self.router, days_ago=2)
+        old_sale_id = old_sale.pk
+        old_sale.delete()
+
+        products = self.client.get(reverse('product-sync'), {'since': since}).data
+        sales = self.client.get(reverse('sale-sync'), {'since': since}).data
+
+        self.assertFalse(products['reset'])
+        self.assertEqual([row['name'] for row in products['results']], ['Data Plan'])
+        self.assertEqual([row['id'] for row in sales['results']], [sale.pk])
+        self.assertEqual(sales['deleted'], [old_sale_id])
+
+    def test_cascade_delete_leaves_tombstones(self):
+        sale = self.make_sale(self.router)
+        expected = {('sale', sale.pk), ('product', self.router.pk)}
+        self.router.delete()
+        self.assertEqual(set(Tombstone.objects.values_list('model_name', 'object_id')), expected)
+
+    def test_sync_is_paged_with_a_continuation_cursor(self):
+        sales = [self.make_sale(self.router, days_ago=days_ago) for days_ago in (3, 2, 1)]
+        since = encode_token(timezone.now() - timedelta(days=2, hours=1))
+        deleted_id = sales[0].pk
+        sales[0].delete()
+
+        first = self.client.get(reverse('sale-sync'), {'since': since, 'page_size': 1}).data
+        self.assertEqual([row['id'] for row in first['results']], [sales[1].pk])
+        self.assertEqual(first['deleted'], [deleted_id])
+        second = self.client.get(first['next']).data
+        self.assertEqual([row['id'] for row in second['results']], [sales[2].pk])
+        self.assertEqual((second['token'], second['deleted'], second['next']), (first['token'], [], None))
+
+        pages, url = [], reverse('product-sync') + '?page_size=1'
+        while url:
+            page = self.client.get(url).data
+            self.assertTrue(page['reset'])
+            pages.append([row['id'] for row in page['results']])
+            url = page['next']
+        self.assertEqual(pages, [[self.router.pk], [self.plan.pk]])
+
+    def test_invalid_token(self):
+        response = self.client.get(reverse('sale-sync'), {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(reverse('sale-sync'), {'cursor': 'nope'}).status_code, 400)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class BulkSaleTests(RecordsTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def post_bulk(self, items):
+        return self.client.post(reverse('sale-bulk'), items, format='json')
+
+    def test_bulk_creates_sales_stock_and_rollups(self):
+        items = [
+            {'product': self.router.pk, 'quantity': 2, 'sale_price': '100'},
+            {'product': self.plan.pk, 'quantity': 3, 'sale_price': '20', 'payment_method': 'MOMO'},
+            {'product': self.router.pk, 'quantity': 1, 'sale_price': '90'},
+        ]
+        response = self.post_bulk(items)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([row['total_amount'] for row in response.data], ['200.00', '60.00', '90.00'])
+        self.assertTrue(all(row['id'] and row['sale_date'] for row in response.data))
+        self.router.refresh_from_db()
+        self.plan.refresh_from_db()
+        self.assertEqual((self.router.stock_quantity, self.plan.stock_quantity), (47, 47))
+        router_rollup = DailySalesRollup.objects.get(product=self.router)
+        self.assertEqual((router_rollup.transaction_count, router_rollup.total_profit), (2, Decimal('110')))
+
+    def test_bulk_reports_per_item_errors_and_writes_nothing(self):
+        items = [
+            {'product': self.router.pk, 'quantity': 1, 'sale_price': '100'},
+            {'product': self.plan.pk, 'quantity': 30, 'sale_price': '20'},
+            {'product': self.plan.pk, 'quantity': 30, 'sale_price': '20'},
+        ]
+        response = self.post_bulk(items)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('quantity', response.data[1])
+        self.assertIn('quantity', response.data[2])
+        self.assertFalse(Sale.objects.exists())
+        self.router.refresh_from_db()
+        self.assertEqual(self.router.stock_quantity, 50)
+
+    def test_oversized_batch_is_rejected_before_validation(self):
+        with mock.patch('records.views.BULK_MAX_ITEMS', 2), \
+                mock.patch('records.views.BulkSaleItemSerializer') as serializer:
+            response = self.post_bulk([{'product': self.plan.pk, 'quantity': 1, 'sale_price': '20'}] * 3)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['non_field_errors'], ['At most 2 sales per upload'])
+        serializer.assert_not_called()
+
+    def test_bulk_query_count_does_not_grow_with_batch(self):
+        def count_queries(size):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.post_bulk([{'product': self.plan.pk, 'quantity': 1, 'sale_price': '20'}] * size)
+            self.assertEqual(response.status_code, 201)
+            return len(ctx)
+
+        count_queries(1)  # creates the rollup bucket
+        self.assertEqual(count_queries(2), count_queries(20))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SaleListingTests(RecordsTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.boss)
+        sales = [
+            Sale(product=product, quantity=1, sale_price=product.price, seller=self.seller)
+            for product in [self.router, self.plan] * 6
+        ]
+        Sale.objects.bulk_create(sales)
+        # Force timestamp ties so the id tie-breaker matters
+        Sale.objects.filter(pk__in=[sale.pk for sale in sales[:4]]).update(sale_date=timezone.now() - timedelta(days=1))
+
+    def test_keyset_pages_cover_every_sale_once(self):
+        url, seen = reverse('sale-list') + '?page_size=5', []
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+
+        expected = list(Sale.objects.order_by('-sale_date', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_unpaginated_list_is_joined(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('sale-list'))
+        self.assertEqual(len(response.data), 12)
+        self.assertEqual(response.data[0]['seller_name'], 'seller')
+
+    def test_bad_cursor_is_404(self):
+        response = self.client.get(reverse('sale-list') + '?cursor=nope')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ExportTests(RecordsTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.boss)
+        self.old_sale = self.make_sale(self.router, quantity=2, days_ago=10)
+        self.new_sale = self.make_sale(self.plan, quantity=1)
+
+    def read(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_sales_csv_with_date_range(self):
+        start = (timezone.localdate() - timedelta(days=1)).isoformat()
+        response = self.client.get(reverse('sale-export'), {'start': start})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(self.read(response).decode())))
+        self.assertEqual(rows[0][:4], ['id', 'sale_date', 'product_id', 'product__name'])
+        self.assertEqual([row[0] for row in rows[1:]], [str(self.new_sale.pk)])
+
+    def test_impossible_dates_are_rejected(self):
+        for value in ('2024-02-30', 'yesterday'):
+            response = self.client.get(reverse('sale-export'), {'start': value})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('start', response.data)
+
+    def test_sales_ndjson_gzip(self):
+        response = self.client.get(reverse('sale-export'), {'export_format': 'ndjson', 'gzip': '1', 'seller': self.seller.pk})
+
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        lines = gzip.decompress(self.read(response)).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([record['id'] for record in records], [self.old_sale.pk, self.new_sale.pk])
+        self.assertEqual(records[0]['total_amount'], '200.00')
+
+    def test_products_export(self):
+        response = self.client.get(reverse('product-export'))
+        rows = list(csv.reader(io.StringIO(self.read(response).decode())))
+        self.assertEqual([row[1] for row in rows[1:]], ['Router', 'Data Plan'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, REPLICA_DATABASE_ALIAS='replica')
+class ReplicaRoutingTests(RecordsTestMixin, TestCase):
+    # The test replica is a separate, empty database, so reads that reach it see no sales
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.boss)
+
+    def test_reports_read_primary_right_after_a_write(self):
+        response = self.client.post(reverse('sale-list'), {'product': self.router.pk, 'quantity': 1, 'sale_price': '100'})
+        self.assertEqual(response.status_code, 201)
+
+        report = self.client.get(reverse('profit-loss-report')).data
+        self.assertEqual(report['daily']['transaction_count'], 1)
+
+        caches[STICKY_CACHE_ALIAS].clear()  # the sticky window has passed
+        report = self.client.get(reverse('profit-loss-report')).data
+        self.assertEqual(report['daily']['transaction_count'], 0)
+
+    def test_every_write_pins_reads_to_primary(self):
+        sale = self.make_sale(self.router)
+        report = lambda: self.client.get(reverse('profit-loss-report')).data['daily']['transaction_count']
+        self.assertEqual(report(), 0)
+
+        response = self.client.patch(reverse('sale-detail', args=[sale.pk]), {'payment_method': 'CARD'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(report(), 1)
+
+        caches[STICKY_CACHE_ALIAS].clear()
+        self.assertEqual(self.client.delete(reverse('sale-detail', args=[sale.pk])).status_code, 204)
+        self.assertTrue(caches[STICKY_CACHE_ALIAS].get(f'records:replica-sticky:{self.boss.pk}'))
+
+    async def test_async_stack_pins_writers(self):
+        async def view(request):
+            return HttpResponse(status=201)
+        middleware = ReplicaStickyMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        request = RequestFactory().post('/api/sales/')
+        request.user = self.seller
+        await middleware(request)
+        self.assertTrue(await sync_to_async(caches[STICKY_CACHE_ALIAS].get)(f'records:replica-sticky:{self.seller.pk}'))
+
+    def test_exports_read_replica(self):
+        self.make_sale(self.router)
+        response = self.client.get(reverse('sale-export'))
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 1)
+
+        with override_settings(REPLICA_DATABASE_ALIAS=None):
+            response = self.client.get(reverse('sale-export'))
+            rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 2)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SaleArchiveTests(RecordsTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.boss)
+        self.old_sales = [self.make_sale(self.router, quantity=2, days_ago=100), self.make_sale(self.plan, days_ago=100)]
+        self.new_sale = self.make_sale(self.plan, quantity=3)
+
+    def export(self, **params):
+        return b''.join(self.client.get(reverse('sale-export'), params).streaming_content)
+
+    def test_archived_months_stay_visible(self):
+        export = self.export()
+        ndjson = self.export(export_format='ndjson')
+        report = self.client.get(reverse('profit-loss-report')).data
+
+        # One sale per chunk, so reading the month back spans chunks
+        with mock.patch('records.archive.ARCHIVE_CHUNK_ROWS', 1):
+            call_command('archive_sales', keep_months=2, stdout=io.StringIO())
+
+        self.assertEqual(list(Sale.objects.values_list('id', flat=True)), [self.new_sale.pk])
+        archive = SaleArchive.objects.get()
+        self.assertEqual((archive.row_count, archive.total_sales), (2, Decimal('220')))
+        self.assertEqual(list(archive.chunks.values_list('seq', 'row_count')), [(0, 1), (1, 1)])
+        self.assertEqual(self.export(), export)
+        self.assertEqual(self.export(export_format='ndjson'), ndjson)
+        self.assertEqual(self.client.get(reverse('profit-loss-report')).data, report)
+        self.assertFalse(Tombstone.objects.exists())
+
+        start = (timezone.localdate() - timedelta(days=1)).isoformat()
+        self.assertEqual(len(self.export(start=start).splitlines()), 2)
+
+        DailySalesRollup.objects.rebuild()
+        self.assertEqual(DailySalesRollup.objects.aggregate(total=Sum('total_sales'))['total'], Decimal('280'))
+        cube = SalesCube()
+        cube.reload()
+        self.assertEqual(sum(row['total_sales'] for row in cube.aggregate(['category'])), 280)
+
+    def test_rearchiving_merges_late_sales(self):
+        month = timezone.localdate(self.old_sales[0].sale_date).replace(day=1)
+        call_command('archive_sales', month=f'{month:%Y-%m}', stdout=io.StringIO())
+        self.make_sale(self.router, days_ago=100)
+        call_command('archive_sales', month=f'{month:%Y-%m}', stdout=io.StringIO())
+        self.assertEqual(SaleArchive.objects.get().row_count, 3)
+        self.assertEqual(Sale.objects.count(), 1)
+
+    def test_impossible_month_is_a_command_error(self):
+        for month in ('2024-13', 'last-month'):
+            with self.assertRaisesMessage(CommandError, '--month must look like YYYY-MM'):
+                call_command('archive_sales', month=month, stdout=io.StringIO())
+
+    def test_rows_stay_unless_the_stored_copy_reads_back(self):
+        month = timezone.localdate(self.old_sales[0].sale_date).replace(day=1)
+        with mock.patch('records.archive.read_chunk', side_effect=lambda data: _columns([])):
+            with self.assertRaises(RuntimeError):
+                archive_month(month)
+        self.assertEqual(Sale.objects.count(), 3)
+        self.assertFalse(SaleArchive.objects.exists())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class StockLedgerTests(RecordsTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.boss)
+
+    def backdate(self, days):
+        StockMovement.objects.update(created_at=timezone.now() - timedelta(days=days))
+
+    def test_every_stock_write_is_ledgered(self):
+        self.client.post(reverse('sale-list'), {'product': self.router.pk, 'quantity': 3, 'sale_price': '100'})
+        self.client.post(reverse('sale-bulk'), [
+            {'product': self.router.pk, 'quantity': 2, 'sale_price': '100'},
+            {'product': self.router.pk, 'quantity': 1, 'sale_price': '100'},
+        ], format='json')
+        Product.objects.adjust_stock([self.router.pk, self.plan.pk], -4, user=self.boss)
+        self.router.refresh_from_db()
+        self.router.stock_quantity += 10
+        self.router.save()
+
+        movements = list(StockMovement.objects.filter(product=self.router).order_by('id').values_list('delta', 'reason'))
+        self.assertEqual(movements, [(50, 'OPENING'), (-3, 'SALE'), (-3, 'SALE'), (-4, 'ADJUSTMENT'), (10, 'RESTOCK')])
+        self.assertEqual(stock_at(timezone.now()), {self.router.pk: 50, self.plan.pk: 46})
+
+    def test_stock_at_is_snapshot_plus_tail(self):
+        Product.objects.adjust_stock([self.router.pk], -10)
+        self.backdate(5)
+        self.assertEqual(take_snapshots(snapshot_cutoff(timezone.localdate() - timedelta(days=2))), 2)
+        Product.objects.adjust_stock([self.router.pk], 7)
+
+        with self.assertNumQueries(1):
+            now = stock_at(timezone.now(), [self.router.pk])
+        self.assertEqual(now, {self.router.pk: 47})
+        self.assertEqual(stock_at(timezone.now() - timedelta(days=1))[self.router.pk], 40)
+        self.assertEqual(stock_at(timezone.now() - timedelta(days=10))[self.router.pk], 0)
+        # Nothing moved since, so a second snapshot at the same time is a no-op
+        self.assertEqual(take_snapshots(snapshot_cutoff(timezone.localdate() - timedelta(days=2))), 0)
+
+        day = (timezone.localdate() - timedelta(days=1)).isoformat()
+        data = self.client.get(reverse('product-stock-at'), {'at': day, 'product': self.router.pk}).data
+        self.assertEqual(data['results'], [
+            {'product_id': self.router.pk, 'product_name': 'Router', 'stock_quantity': 40, 'current_stock': 47}
+        ])
+        for value in ('yesterday', '2024-02-30', '2024-02-30T10:00'):
+            self.assertEqual(self.client.get(reverse('product-stock-at'), {'at': value}).status_code, 400)
+        for value in ('yesterday', '2024-02-30'):
+            with self.assertRaisesMessage(CommandError, '--day must be YYYY-MM-DD'):
+                call_command('snapshot_stock', day=value, stdout=io.StringIO())
+
+    def test_reconcile_finds_and_fixes_drift(self):
+        extra = [Product.objects.create(name=f'Extra {i}', stock_quantity=i) for i in range(5)]
+        # Writes that bypass the ledger
+        Product.objects.filter(pk__in=[self.plan.pk, extra[3].pk]).update(stock_quantity=F('stock_quantity') + 2)
+
+        out = io.StringIO()
+        call_command('reconcile_stock', '--chunk-size', '2', stdout=out)
+        self.assertIn('2 mismatched products in 4 blocks', out.getvalue())
+        self.assertIn('Data Plan', out.getvalue())
+
+        call_command('reconcile_stock', '--fix', stdout=io.StringIO())
+        self.assertEqual(StockMovement.objects.filter(reason='CORRECTION').count(), 2)
+        out = io.StringIO()
+        call_command('reconcile_stock', stdout=out)
+        self.assertIn('0 mismatched products', out.getvalue())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class StockForecastTests(RecordsTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # Two routers a day for the last fortnight of a 28-day window
+        for days_ago in range(14):
+            self.make_sale(self.router, quantity=2, days_ago=days_ago)
+
+    def test_velocity_cover_and_incremental_refresh(self):
+        forecaster = StockForecaster()
+        forecaster.refresh()
+        router, plan = forecaster.forecast(lead_time=7)
+        self.assertEqual((router['velocity'], router['moving_average'], router['daily_std']), (1.0, 2.0, 1.0))
+        self.assertEqual((router['days_of_cover'], router['suggested_min_stock_level']), (25.0, 19))
+        self.assertEqual((plan['velocity'], plan['days_of_cover'], plan['suggested_min_stock_level']), (0.0, None, 0))
+
+        self.make_sale(self.router, quantity=3)
+        self.make_sale(self.plan, quantity=7)
+        with CaptureQueriesContext(connection) as queries:
+            forecaster.refresh()
+        self.assertEqual(len(queries), 1)
+        router, plan = forecaster.forecast()
+        self.assertEqual((router['moving_average'], plan['moving_average']), (round(17 / 7, 3), 1.0))
+
+        # A day later the window drops nothing yet but the week average moves
+        forecaster.refresh(timezone.localdate() + timedelta(days=1))
+        self.assertEqual(forecaster.forecast()[0]['moving_average'], round(15 / 7, 3))
+
+    def test_apply_command_and_endpoint(self):
+        published = []
+        original, broker.publish = broker.publish, lambda *event: published.append(event)
+        self.addCleanup(setattr, broker, 'publish', original)
+        plan_level = self.plan.min_stock_level
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('forecast_stock', '--apply', '--minimum', '5', stdout=io.StringIO())
+        self.router.refresh_from_db()
+        self.plan.refresh_from_db()
+        self.assertEqual((self.router.min_stock_level, self.router.is_low_stock), (19, False))
+        # No sales in the window: the plan keeps its reorder point
+        self.assertEqual(self.plan.min_stock_level, plan_level)
+        change = ReorderPointChange.objects.get()
+        self.assertEqual((change.product, change.new_level, change.velocity), (self.router, 19, 1.0))
+        self.assertEqual(published, [('stock_changed', {
+            'product_id': self.router.pk, 'min_stock_level': 19, 'is_low_stock': False,
+        })])
+        forecaster = StockForecaster()
+        forecaster.refresh()
+        self.assertEqual(forecaster.apply(forecaster.forecast(), minimum=5), 0)
+
+        client = APIClient()
+        client.force_authenticate(self.boss)
+        rows = client.get(reverse('product-forecast'), {'lead_time': 14}).data['results']
+        self.assertEqual([row['product_id'] for row in rows], [self.router.pk, self.plan.pk])
+        self.assertEqual(client.get(reverse('product-forecast'), {'cover_below': 10}).data['results'], [])
+        self.assertEqual(client.get(reverse('product-forecast'), {'lead_time': 0}).status_code, 400)
+        client.force_authenticate(self.seller)
+        self.assertEqual(client.get(reverse('product-forecast')).status_code, 403)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False,
+                   STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class AdminTests(RecordsTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        admin_user = User.objects.create_superuser(username='admin', password='password', employee_id='ADM001')
+        self.client.force_login(admin_user)
+
+    def test_sale_changelist_queries_do_not_grow_with_rows(self):
+        url = reverse('admin:records_sale_changelist')
+        self.make_sale(self.router)
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        other = User.objects.create_user(username='other', password='password', role='SELLER', employee_id='SEL002')
+        for _ in range(10):
+            Sale.objects.create(product=self.plan, sale_price=20, seller=other)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url)
+        self.assertEqual(len(many), len(few))
+
+        response = self.client.get(url, {'seller_username': 'other', 'category': 'DATA_PLANS'})
+        self.assertEqual(response.context['cl'].result_count, 10)
+
+    def test_bulk_sale_delete_reverses_rollups_in_batch(self):
+        url = reverse('admin:records_sale_changelist')
+        kept = self.make_sale(self.plan, quantity=2)
+        deleted = [self.make_sale(self.router, days_ago=3) for _ in range(5)]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {
+                'action': 'delete_selected', 'post': 'yes', '_selected_action': [sale.pk for sale in deleted],
+            })
+        self.assertEqual(response.status_code, 302)
+
+        # One update (and cleanup) for the shared bucket and one bulk delete, not one of each per sale
+        sql = [query['sql'] for query in queries]
+        self.assertEqual(len([q for q in sql if 'records_dailysalesrollup' in q]), 2)
+        self.assertEqual(len([q for q in sql if q.startswith('DELETE FROM "records_sale"')]), 1)
+        self.assertEqual(list(Sale.objects.all()), [kept])
+        self.assertEqual(
+            list(DailySalesRollup.objects.values_list('product', 'quantity', 'transaction_count')),
+            [(self.plan.pk, 2, 1)],
+        )
+        self.assertEqual(Tombstone.objects.filter(model_name='sale').count(), 5)
+
+    def test_bulk_stock_adjustment(self):
+        url = reverse('admin:records_product_changelist')
+        self.router.stock_quantity = 10
+        self.router.save()
+        response = self.client.post(url, {
+            'action': 'adjust_stock', 'stock_delta': '-20',
+            '_selected_action': [self.router.pk, self.plan.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.router.refresh_from_db()
+        self.plan.refresh_from_db()
+        self.assertEqual((self.router.stock_quantity, self.plan.stock_quantity), (10, 30))
+
+        self.client.post(url, {'action': 'adjust_stock', 'stock_delta': '-26', '_selected_action': [self.plan.pk]})
+        self.plan.refresh_from_db()
+        self.assertEqual((self.plan.stock_quantity, self.plan.is_low_stock), (4, True))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FastListTests(RecordsTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.plan.name = 'Data Plan \u2028 "Café"'
+        self.plan.cost_price = Decimal('5.05')
+        self.plan.save()
+        for days_ago in range(3):
+            self.make_sale(self.router, days_ago=days_ago)
+            self.make_sale(self.plan, quantity=2, days_ago=days_ago)
+        self.client = APIClient()
+        self.client.force_authenticate(self.boss)
+
+    def assertSameBody(self, path, params):
+        regular = self.client.get(path, params).content
+        fast = self.client.get(path, {**params, 'fast': '1'}).content
+        self.assertEqual(fast.replace(b'fast=1&', b''), regular)
+
+    def test_byte_compatible_with_serializers(self):
+        self.assertSameBody(reverse('product-list'), {})
+        self.assertSameBody(reverse('sale-list'), {})
+        self.assertSameBody(reverse('sale-list'), {'page_size': 4})
+        self.client.force_authenticate(self.seller)
+        self.assertSameBody(reverse('sale-list'), {'page_size': 2})
+
+    def test_compression_is_negotiated(self):
+        response = self.client.get(reverse('sale-list'), {'fast': '1'}, HTTP_ACCEPT_ENCODING='gzip;q=1, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), self.client.get(reverse('sale-list')).content)
+        self.assertFalse(self.client.get(reverse('sale-list'), {'fast': '1'}).has_header('Content-Encoding'))
+
+    def test_brotli_round_trips(self):
+        response = self.client.get(reverse('sale-list'), {'fast': '1'}, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), self.client.get(reverse('sale-list')).content)
+
+
+class ReportJobTestMixin(RecordsTestMixin):
+    def setUp(self):
+        super().setUp()
+        self.enterContext(override_settings(SECURE_SSL_REDIRECT=False))
+        self.client = APIClient()
+        self.client.force_authenticate(self.boss)
+        self.make_sale(self.router, quantity=2, days_ago=10)
+        self.make_sale(self.plan, quantity=1)
+
+    def submit(self, kind, **params):
+        return self.client.post(reverse('report-job-list'), {'kind': kind, 'params': params}, format='json')
+
+    def download(self, job_id):
+        return b''.join(self.client.get(reverse('report-job-download', args=[job_id])).streaming_content)
+
+
+class ReportJobTests(ReportJobTestMixin, TestCase):
+    def test_export_job_is_deduplicated_and_matches_export(self):
+        first = self.submit('sales_export', export_format='ndjson', seller=self.seller.pk)
+        self.assertEqual((first.status_code, first.data['status']), (202, 'PENDING'))
+        again = self.submit('sales_export', seller=self.seller.pk, export_format='ndjson', gzip=False)
+        self.assertEqual((again.status_code, again.data['id']), (200, first.data['id']))
+        self.assertEqual(self.client.get(reverse('report-job-download', args=[first.data['id']])).status_code, 409)
+
+        # Small pieces, so the download has to stitch several stored chunks together
+        with mock.patch('records.jobs.ARTIFACT_CHUNK_SIZE', 64):
+            call_command('run_report_worker', workers=0, once=True, stdout=io.StringIO())
+
+        job = self.client.get(reverse('report-job-detail', args=[first.data['id']])).data
+        self.assertEqual((job['status'], job['progress']), ('DONE', 100))
+        self.assertGreater(ReportJob.objects.get(pk=job['id']).chunks.count(), 1)
+        direct = self.client.get(reverse('sale-export'), {'export_format': 'ndjson', 'seller': self.seller.pk})
+        self.assertEqual(self.download(job['id']), b''.join(direct.streaming_content))
+        self.assertEqual(self.submit('sales_export', export_format='ndjson', seller=self.seller.pk).data['id'], job['id'])
+
+    def test_summary_job_and_validation(self):
+        job_id = self.submit('sales_summary', period='day').data['id']
+        call_command('run_report_worker', workers=0, once=True, stdout=io.StringIO())
+        rows = json.loads(self.download(job_id))['rows']
+        self.assertEqual([(row['category'], row['total_sales']) for row in rows], [('ROUTERS', 200.0), ('DATA_PLANS', 20.0)])
+
+        self.assertEqual(self.submit('payroll').status_code, 400)
+        self.assertEqual(self.submit('sales_summary', period='decade').status_code, 400)
+        self.assertEqual(self.submit('sales_summary', start='2024-02-30').status_code, 400)
+        # Queued without going through the API: the job fails instead of the worker
+        job = ReportJob.objects.create(kind='sales_summary', params={'start': '2024-02-30'}, params_key='manual')
+        call_command('run_report_worker', workers=0, once=True, stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'FAILED')
+        self.assertIn('start must be a YYYY-MM-DD date', job.error)
+        self.client.force_authenticate(self.seller)
+        self.assertEqual(self.submit('sales_summary').status_code, 403)
+
+    def test_concurrent_identical_submissions_share_one_job(self):
+        first = self.submit('sales_summary', period='day')
+        self.assertEqual(first.status_code, 202)
+        # The second request's pre-check ran before the first job was committed,
+        # so only the unique_active_report_job constraint stands in its way
+        with mock.patch('records.jobs.reusable_job', return_value=None):
+            second = self.submit('sales_summary', period='day')
+        self.assertEqual((second.status_code, second.data['id']), (200, first.data['id']))
+        self.assertEqual(ReportJob.objects.count(), 1)
+
+        ReportJob.objects.filter(pk=first.data['id']).update(status='FAILED')
+        with mock.patch('records.jobs.reusable_job', return_value=None):
+            self.assertEqual(self.submit('sales_summary', period='day').status_code, 202)
+
+
+def crash_or_hang_weekly_jobs(job_id):
+    """Stand-in for run_job (module level so pool workers can unpickle it)."""
+    from .jobs import run_job
+    period = ReportJob.objects.get(pk=job_id).params.get('period')
+    if period == 'week':
+        os._exit(1)
+    if period == 'month':
+        time.sleep(60)
+    return run_job(job_id)
+
+
+class ReportWorkerPoolTests(ReportJobTestMixin, TransactionTestCase):
+    def test_jobs_render_in_worker_processes(self):
+        ids = [self.submit('sales_summary', period=period).data['id'] for period in ('day', 'month')]
+        call_command('run_report_worker', workers=2, once=True, stdout=io.StringIO())
+        self.assertEqual(set(ReportJob.objects.filter(pk__in=ids).values_list('status', flat=True)), {'DONE'})
+        self.assertEqual(sum(row['total_sales'] for row in json.loads(self.download(ids[1]))['rows']), 220.0)
+
+    @mock.patch('records.management.commands.run_report_worker.JOB_TIMEOUT', timedelta(seconds=1))
+    @mock.patch('records.management.commands.run_report_worker.run_job', crash_or_hang_weekly_jobs)
+    def test_dead_and_hung_workers_fail_their_job_and_the_pool_is_replaced(self):
+        ids = [self.submit('sales_summary', period=period).data['id'] for period in ('week', 'month', 'day')]
+        output = io.StringIO()
+        call_command('run_report_worker', workers=1, once=True, poll_interval=0.1, stdout=output)
+
+        jobs = ReportJob.objects.in_bulk(ids)
+        self.assertEqual([jobs[pk].status for pk in ids], ['FAILED', 'FAILED', 'DONE'])
+        self.assertIn('BrokenProcessPool', jobs[ids[0]].error)
+        self.assertIn('TimeoutError', jobs[ids[1]].error)
+        self.assertEqual(output.getvalue().count('Restarted the worker pool'), 2)
+        # The failed jobs no longer block identical submissions
+        self.assertEqual(self.submit('sales_summary', period='week').status_code, 202)
+
+    @mock.patch('records.management.commands.run_report_worker.STALE_CHECK_INTERVAL', timedelta(0))
+    def test_stale_jobs_are_requeued_while_the_worker_runs(self):
+        job_id = self.submit('sales_summary', period='day').data['id']
+        ReportJob.objects.filter(pk=job_id).update(status='RUNNING', started_at=timezone.now() - timedelta(hours=2))
+        with mock.patch('records.management.commands.run_report_worker.requeue_stale_jobs',
+                        wraps=requeue_stale_jobs) as requeue:
+            call_command('run_report_worker', workers=1, once=True, stdout=io.StringIO())
+        self.assertEqual(ReportJob.objects.get(pk=job_id).status, 'DONE')
+        self.assertGreater(requeue.call_count, 1)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class LiveEventsTests(RecordsTestMixin, TestCase):
+    async def test_stream_receives_filtered_events(self):
+        request = RequestFactory().get('/api/events/')
+        request.user = self.seller
+        response = await live_events(request)
+        stream = response.streaming_content
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+
+        broker.publish('report_delta', {'total_sales': 10})
+        broker.publish('sale_created', {'id': 1, 'seller_id': self.boss.pk})
+        broker.publish('sale_created', {'id': 2, 'seller_id': self.seller.pk})
+        frame = (await anext(stream)).decode()
+
+        self.assertIn('event: sale_created', frame)
+        self.assertIn('"id":2', frame)
+        await stream.aclose()
+
+    def test_checkout_publishes_after_commit(self):
+        published = []
+        original, broker.publish = broker.publish, lambda *event: published.append(event)
+        self.addCleanup(setattr, broker, 'publish', original)
+        client = APIClient()
+        client.force_authenticate(self.seller)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(reverse('sale-list'), {'product': self.router.pk, 'quantity': 2, 'sale_price': '100'})
+
+        self.assertEqual([event_type for event_type, _ in published], ['sale_created', 'stock_changed', 'report_delta'])
+        self.assertEqual(published[1][1], {'product_id': self.router.pk, 'delta': -2})
+
+
+class SeedBusinessTests(TestCase):
+    def seed_fingerprint(self, seed):
+        config = SeedConfig(seed=seed, sellers=3, products=20, sales=300, days=30,
+                            end_date=timezone.localdate(), batch_size=100)
+        with transaction.atomic():
+            counts = BusinessSeeder(config).run()
+            fingerprint = list(
+                Sale.objects.order_by('sale_date')
+                .values_list('product__name', 'quantity', 'sale_price', 'payment_method', 'seller__username', 'sale_date')
+            )
+            transaction.set_rollback(True)
+        return counts, fingerprint
+
+    def test_seed_is_deterministic_and_dated(self):
+        counts, first = self.seed_fingerprint(7)
+        _, again = self.seed_fingerprint(7)
+        _, other = self.seed_fingerprint(8)
+
+        self.assertEqual(counts['sales'], 300)
+        self.assertEqual(first, again)
+        self.assertNotEqual(first, other)
+        # Dates are spread over the requested history, not all "now"
+        self.assertGreater((first[-1][-1] - first[0][-1]).days, 20)
+
+    def test_impossible_end_date_is_a_command_error(self):
+        for end_date in ('tomorrow', '2024-02-30'):
+            with self.assertRaisesMessage(CommandError, '--end-date must be YYYY-MM-DD'):
+                call_command('seed_business', end_date=end_date, stdout=io.StringIO())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, REQUEST_METRICS_SAMPLE_RATE=1.0)
+class RequestMetricsTests(RecordsTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        metrics_registry.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.boss)
+
+    def test_server_timing_and_metrics_endpoint(self):
+        response = self.client.get(reverse('profit-loss-report'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+        views = self.client.get(reverse('request-metrics')).data['views']
+        report = views['GET profit-loss-report']
+        self.assertEqual(report['count'], 1)
+        self.assertEqual(report['avg_queries'], 1)
+
+    def test_metrics_are_boss_only(self):
+        self.client.force_authenticate(self.seller)
+        self.assertEqual(self.client.get(reverse('request-metrics')).status_code, 403)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_untouched(self):
+        response = self.client.get(reverse('profit-loss-report'))
+        self.assertNotIn('Server-Timing', response)
+
+    async def test_async_stack_counts_queries_on_other_threads(self):
+        async def view(request):
+            # Like a sync view under ASGI: the query runs on an executor thread
+            await sync_to_async(Product.objects.count)()
+            return HttpResponse()
+        middleware = RequestMetricsMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        request = RequestFactory().get('/api/anything/')
+        request.resolver_match = None
+        response = await middleware(request)
+        self.assertIn('"1 queries, 0 repeated"', response['Server-Timing'])
+
+    def test_recorder_flags_repeated_sql(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            Product.objects.get(pk=self.router.pk)
+            Product.objects.get(pk=self.plan.pk)
+        self.assertEqual((recorder.count, recorder.duplicates), (2, 1))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SalesAnalyticsTests(RecordsTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_sale(self.router, quantity=2, payment_method='MOMO')
+        self.make_sale(self.router, quantity=1, days_ago=40)
+        self.make_sale(self.plan, quantity=5, days_ago=3)
+
+    def test_cube_matches_orm_and_refreshes_incrementally(self):
+        cube = SalesCube()
+        cube.refresh()
+        self.make_sale(self.plan, quantity=1, payment_method='MOMO')
+        with self.assertNumQueries(0):
+            cube.refresh()
+        self.assertEqual(len(cube), 3)
+        cube.refresh(force=True)
+        self.assertEqual(len(cube), 4)
+
+        expected = {
+            (row['product__category_name'], row['payment_method']): row
+            for row in Sale.objects.values('product__category_name', 'payment_method')
+            .annotate(count=Count('id'), quantity=Sum('quantity'), total_sales=Sum('total_amount'))
+        }
+        rows = cube.aggregate(['category', 'payment_method'])
+        self.assertEqual(len(rows), len(expected))
+        for row in rows:
+            orm = expected[(row['category'], row['payment_method'])]
+            self.assertEqual((row['count'], row['quantity']), (orm['count'], orm['quantity']))
+            self.assertEqual(Decimal(str(row['total_sales'])), orm['total_sales'])
+
+        recent = cube.aggregate(['product'], start=timezone.now() - timedelta(days=7))
+        self.assertEqual([(row['product'], row['quantity']) for row in recent], [(self.router.pk, 2), (self.plan.pk, 6)])
+
+    def test_reload_swaps_in_a_complete_cube(self):
+        cube = SalesCube()
+        cube.reload()
+        before = cube.aggregate(['product'])
+        seen_during_reload = []
+        original = cube._new_sale_columns
+
+        def new_sale_columns(after_id):
+            # A concurrent query while the new columns are being built
+            seen_during_reload.append(cube.aggregate(['product']))
+            return original(after_id)
+
+        Sale.objects.filter(pk=Sale.objects.order_by('id').first().pk).delete()
+        with mock.patch.object(cube, '_new_sale_columns', new_sale_columns):
+            cube.reload()
+        self.assertEqual(seen_during_reload, [before])
+        self.assertEqual(len(cube), 2)
+        # Codes are stable across reloads, so old and new columns share labels
+        self.assertEqual(cube.product_ids, [self.router.pk, self.plan.pk])
+        with self.assertRaises(ValueError):
+            cube.aggregate(['product'], limit=-1)
+
+    def test_time_buckets_follow_dst(self):
+        self.make_sale(self.plan)
+        moments = ['2024-01-15T04:30:00Z', '2024-07-15T03:30:00Z', '2024-03-10T06:30:00Z', '2024-03-10T07:30:00Z']
+        for sale_id, moment in zip(Sale.objects.order_by('id').values_list('id', flat=True), moments):
+            Sale.objects.filter(pk=sale_id).update(sale_date=moment)
+        cube = SalesCube()
+        with timezone.override('America/New_York'):
+            cube.reload()
+            days = {row['day']: row['count'] for row in cube.aggregate(['day'])}
+            hours = {row['hour']: row['count'] for row in cube.aggregate(['hour'])}
+        # 23:30 local in both winter and summer; 01:30 EST then 03:30 EDT on the changeover day
+        self.assertEqual(days, {'2024-01-14': 1, '2024-07-14': 1, '2024-03-10': 2})
+        self.assertEqual(hours, {23: 2, 1: 1, 3: 1})
+
+    def test_api_groups_and_labels(self):
+        sales_cube.reload()
+        client = APIClient()
+        client.force_authenticate(self.boss)
+        response = client.get(reverse('sales-analytics'), {'group_by': 'product', 'order_by': 'quantity', 'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['product_name'], 'Data Plan')
+
+        cohorts = client.get(reverse('sales-analytics'), {'report': 'cohorts'}).data['cohorts']
+        self.assertEqual(cohorts[0]['sellers'], 1)
+        self.assertEqual(sum(cohorts[0]['revenue']), 400)
+
+        self.assertEqual(client.get(reverse('sales-analytics'), {'group_by': 'colour'}).status_code, 400)
+        self.assertEqual(client.get(reverse('sales-analytics'), {'start': '2024-02-30'}).status_code, 400)
+        for limit in ('-1', 'ten'):
+            self.assertEqual(client.get(reverse('sales-analytics'), {'limit': limit}).status_code, 400)
+        client.force_authenticate(self.seller)
+        self.assertEqual(client.get(reverse('sales-analytics')).status_code, 403)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SellerLeaderboardTests(RecordsTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.other = User.objects.create_user(username='other', password='password', role='SELLER', employee_id='SEL002')
+        self.make_sale(self.router, quantity=2)
+        self.make_sale(self.router, quantity=1, days_ago=8)
+        Sale.objects.create(product=self.plan, quantity=1, sale_price=20, seller=self.other)
+        self.client = APIClient()
+        self.client.force_authenticate(self.boss)
+
+    def test_ranks_and_change_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(reverse('seller-leaderboard'), {'page_size': 1}).data
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(data['count'], 2)
+        leader = data['results'][0]
+        self.assertEqual((leader['rank'], leader['seller_name'], leader['total_sales']), (1, 'seller', 200.0))
+        self.assertEqual((leader['previous_sales'], leader['change'], leader['average_ticket']), (100.0, 1.0, 200.0))
+
+        second = self.client.get(reverse('seller-leaderboard'), {'page_size': 1, 'page': 2}).data['results']
+        self.assertEqual([(row['rank'], row['seller_name'], row['change']) for row in second], [(2, 'other', None)])
+
+    def test_cached_and_role_checked(self):
+        self.client.get(reverse('seller-leaderboard'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('seller-leaderboard'))
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(self.client.get(reverse('seller-leaderboard'), {'period': 'yearly'}).status_code, 400)
+        self.client.force_authenticate(self.seller)
+        self.assertEqual(self.client.get(reverse('seller-leaderboard')).status_code, 403)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class RoleDashboardTests(RecordsTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.manager = User.objects.create_user(username='manager', password='password', role='MANAGER', employee_id='MGR001')
+        self.make_sale(self.router, quantity=2)
+        self.client = APIClient()
+
+    def dashboard(self, user, role):
+        self.client.force_authenticate(user)
+        return self.client.get(reverse('role-dashboard', args=[role]))
+
+    def test_boss_dashboard_is_built_once_then_cached(self):
+        with self.assertNumQueries(6):
+            data = self.dashboard(self.boss, 'boss').data
+        self.assertEqual(data['report']['daily']['total_sales'], 200.0)
+        self.assertEqual([row['seller_name'] for row in data['sellers']], ['seller'])
+        self.assertEqual(data['users'], {'BOSS': 1, 'MANAGER': 1, 'SELLER': 1})
+        self.assertEqual(data['products']['units_in_stock'], 100)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.dashboard(self.boss, 'boss').data, data)
+
+    def test_writes_retire_cached_dashboards(self):
+        self.assertEqual(self.dashboard(self.manager, 'manager').data['low_stock']['count'], 0)
+        self.client.force_authenticate(self.seller)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('sale-list'), {'product': self.plan.pk, 'quantity': 46, 'sale_price': '20'})
+
+        data = self.dashboard(self.manager, 'manager').data
+        self.assertEqual(data['low_stock']['count'], 1)
+        self.assertEqual(data['recent_sales'][0]['quantity'], 46)
+
+    def test_seller_dashboards_are_per_seller(self):
+        other = User.objects.create_user(username='other', password='password', role='SELLER', employee_id='SEL002')
+        mine = self.dashboard(self.seller, 'seller').data
+        self.assertEqual(mine['totals']['today'], {'total_sales': 200.0, 'transaction_count': 1, 'quantity': 2})
+        theirs = self.dashboard(other, 'seller').data
+        self.assertEqual(theirs['totals']['today']['transaction_count'], 0)
+        self.assertEqual(theirs['recent_sales'], [])
+
+        self.assertEqual(self.dashboard(self.seller, 'boss').status_code, 403)
+        self.assertEqual(self.dashboard(self.seller, 'cashier').status_code, 404)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SignedTokenAuthTests(RecordsTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        revocation_list.refresh(force=True)
+        self.client = APIClient()
+
+    def use_token(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_password_for_token_then_no_auth_queries(self):
+        response = self.client.post(reverse('obtain-token'), {'username': 'boss', 'password': 'password'})
+        self.assertEqual(response.data['role'], 'BOSS')
+        self.use_token(response.data['token'])
+        self.client.get(reverse('role-dashboard', args=['boss']))
+
+        # Cached dashboard: neither the session nor the user table is read
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('role-dashboard', args=['boss'])).status_code, 200)
+        self.assertEqual(self.client.post(reverse('obtain-token'), {'username': 'boss', 'password': 'nope'}).status_code, 400)
+
+    def test_token_user_can_write(self):
+        self.use_token(issue_token(self.seller)[0])
+        response = self.client.post(reverse('sale-list'), {'product': self.router.pk, 'quantity': 1, 'sale_price': '100'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Sale.objects.get().seller, self.seller)
+
+    def test_bad_expired_and_revoked_tokens(self):
+        token = issue_token(self.boss)[0]
+        self.use_token(token[:-2] + 'xx')
+        self.assertEqual(self.client.get(reverse('profit-loss-report')).status_code, 401)
+        self.use_token(token)
+        with override_settings(API_TOKEN_TTL_SECONDS=-1):
+            self.assertEqual(self.client.get(reverse('profit-loss-report')).status_code, 401)
+
+        self.assertEqual(self.client.post(reverse('revoke-token')).status_code, 204)
+        self.assertEqual(self.client.get(reverse('profit-loss-report')).status_code, 401)
+
+    def test_stream_ticket_is_single_use(self):
+        self.use_token(issue_token(self.seller)[0])
+        ticket = self.client.post(reverse('live-events-ticket')).data['ticket']
+
+        self.assertEqual(user_from_stream_ticket(ticket).pk, self.seller.pk)
+        with self.assertRaisesMessage(AuthenticationFailed, 'already been used'):
+            user_from_stream_ticket(ticket)
+
+    def test_stream_ticket_expires_and_follows_its_token(self):
+        token = issue_token(self.seller)[0]
+        self.use_token(token)
+        with mock.patch('records.authentication.STREAM_TICKET_TTL_SECONDS', -1):
+            ticket = self.client.post(reverse('live-events-ticket')).data['ticket']
+            with self.assertRaises(AuthenticationFailed):
+                user_from_stream_ticket(ticket)
+
+        ticket = self.client.post(reverse('live-events-ticket')).data['ticket']
+        self.client.post(reverse('revoke-token'))
+        with self.assertRaisesMessage(AuthenticationFailed, 'revoked'):
+            user_from_stream_ticket(ticket)
+
+        # Tickets are only handed out against an API token
+        session_client = APIClient()
+        session_client.force_authenticate(self.seller)
+        self.assertEqual(session_client.post(reverse('live-events-ticket')).status_code, 400)
+
+    def test_role_change_revokes_existing_tokens(self):
+        self.use_token(issue_token(self.boss)[0])
+        self.assertEqual(self.client.get(reverse('profit-loss-report')).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.boss.role = 'SELLER'
+            self.boss.save()
+        # This process stops accepting the token at once, without a refresh
+        self.assertEqual(self.client.get(reverse('profit-loss-report')).status_code, 401)
+
+    def test_deleted_user_tokens_are_revoked(self):
+        temp = User.objects.create_user(username='temp', password='password', role='SELLER', employee_id='SEL009')
+        self.use_token(issue_token(temp)[0])
+        temp_id = temp.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            temp.delete()
+        # The revocation survives its user
+        self.assertTrue(RevokedToken.objects.filter(user_id=temp_id, jti='').exists())
+        response = self.client.post(reverse('sale-list'), {'product': self.router.pk, 'quantity': 1, 'sale_price': '100'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_event_stream_takes_ticket_not_token_in_query(self):
+        token = issue_token(self.seller)[0]
+        ticket, _ = issue_stream_ticket(signing.loads(token, salt=TOKEN_SALT))
+        response = await live_events(RequestFactory().get('/api/events/', {'ticket': ticket}))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        await response.streaming_content.aclose()
+        for query in ({'ticket': ticket}, {'ticket': 'forged'}, {'token': token}):
+            request = RequestFactory().get('/api/events/', query)
+            request.user = AnonymousUser()
+            response = await live_events(request)
+            self.assertEqual(response.status_code, 401)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ReportOverviewTests(RecordsTestMixin, TransactionTestCase):
+    # Transactional: the overview's concurrent queries run on their own connections
+
+    def test_overview_gathers_every_part(self):
+        self.make_sale(self.router, quantity=2)
+        self.make_sale(self.plan, quantity=3, days_ago=10)
+        Product.objects.adjust_stock([self.plan.pk], -47)
+        client = APIClient()
+        client.force_authenticate(self.boss)
+
+        data = client.get(reverse('report-overview')).json()
+
+        self.assertEqual(data['daily'], {'total_sales': 200.0, 'total_profit': 80.0, 'transaction_count': 1})
+        self.assertEqual(data['monthly']['transaction_count'], 2)
+        self.assertEqual([row['product_name'] for row in data['top_products']], ['Router', 'Data Plan'])
+        self.assertEqual(data['low_stock']['count'], 1)
+        self.assertEqual(data['low_stock']['results'][0]['stock_quantity'], 3)
+        self.assertEqual([(row['seller_name'], row['total_sales']) for row in data['sellers']['results']], [('seller', 260.0)])
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=1.0)
+    def test_overview_metrics_count_queries_on_its_threads(self):
+        metrics_registry.clear()
+        client = APIClient()
+        client.force_authenticate(self.boss)
+        client.get(reverse('report-overview'))
+        # One query each, at least, for the summary, low stock and sellers
+        self.assertGreaterEqual(metrics_registry.snapshot()['GET report-overview']['avg_queries'], 3)
+
+    def test_overview_is_boss_only(self):
+        client = APIClient()
+        self.assertEqual(client.get(reverse('report-overview')).status_code, 401)
+        client.force_authenticate(self.seller)
+        self.assertEqual(client.get(reverse('report-overview')).status_code, 403)
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+class EndpointBenchmarkTests(RecordsTestMixin, TestCase):
+    def test_gated_numbers_are_cold(self):
+        metrics = EndpointBenchmark(iterations=2, warmup=1).measure('low_stock')
+        # The cached list would otherwise hide the query behind it
+        self.assertEqual(metrics['queries'], 1)
+        self.assertEqual(metrics['warm']['queries'], 0)
+
+
+class BenchmarkComparisonTests(SimpleTestCase):
+    baseline = {'10000': {'sale_list': {'p95_ms': 20.0, 'queries': 1, 'peak_kb': 300.0}}}
+
+    def compare(self, gate_latency=False, **metrics):
+        current = dict(self.baseline['10000']['sale_list'], **metrics)
+        return compare_results(
+            self.baseline, {'10000': {'sale_list': current}, '1000000': {'sale_list': current}},
+            gate_latency=gate_latency,
+        )
+
+    def test_within_thresholds(self):
+        self.assertEqual(self.compare(p95_ms=29.0, peak_kb=360.0), ([], []))
+
+    def test_flags_each_kind_of_regression(self):
+        self.assertEqual(len(self.compare(queries=2)[0]), 1)
+        self.assertEqual(len(self.compare(peak_kb=400.0)[0]), 1)
+
+    def test_latency_is_advisory_unless_gated(self):
+        regressions, warnings = self.compare(p95_ms=40.0)
+        self.assertEqual((len(regressions), len(warnings)), (0, 1))
+        regressions, warnings = self.compare(gate_latency=True, p95_ms=40.0)
+        self.assertEqual((len(regressions), len(warnings)), (1, 0))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ConcurrentCheckoutTests(RecordsTestMixin, TransactionTestCase):
+    WORKERS = 8
+    SALES_PER_WORKER = 10
+
+    def test_parallel_sales_never_oversell(self):
+        # 80 attempted single-unit sales against 50 units of stock
+        results = []
+        lock = threading.Lock()
+
+        def worker():
+            client = APIClient()
+            client.force_authenticate(self.seller)
+            try:
+                for _ in range(self.SALES_PER_WORKER):
+                    response = client.post(reverse('sale-list'), {'product': self.router.pk, 'quantity': 1, 'sale_price': '100'})
+                    with lock:
+                        results.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.router.refresh_from_db()
+        self.assertEqual(results.count(201), 50)
+        self.assertEqual(results.count(400), self.WORKERS * self.SALES_PER_WORKER - 50)
+        self.assertEqual(self.router.stock_quantity, 0)
+        self.assertEqual(Sale.objects.filter(product=self.router).count(), 50)
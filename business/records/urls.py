@@ -1,9 +1,27 @@
 # records/urls.py
-from django.urls import path
-from .views import profit_loss_report, create_test_data
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import (
+    ProductViewSet, SaleViewSet, ReportJobViewSet, profit_loss_report, live_events, live_events_ticket,
+    request_metrics, sales_analytics, seller_leaderboard_report, report_overview_view, role_dashboard,
+    obtain_token, revoke_token
+)
+
+router = DefaultRouter()
+router.register('products', ProductViewSet, basename='product')
+router.register('sales', SaleViewSet, basename='sale')
+router.register('report-jobs', ReportJobViewSet, basename='report-job')
 
-# Use simple paths for now - we'll add ViewSets later
 urlpatterns = [
+    path('auth/token/', obtain_token, name='obtain-token'),
+    path('auth/token/revoke/', revoke_token, name='revoke-token'),
     path('profit_loss_report/', profit_loss_report, name='profit-loss-report'),
-    path('create-test-data/', create_test_data, name='create-test-data'),
+    path('events/', live_events, name='live-events'),
+    path('events/ticket/', live_events_ticket, name='live-events-ticket'),
+    path('metrics/', request_metrics, name='request-metrics'),
+    path('analytics/', sales_analytics, name='sales-analytics'),
+    path('leaderboard/', seller_leaderboard_report, name='seller-leaderboard'),
+    path('reports/overview/', report_overview_view, name='report-overview'),
+    path('dashboard/<str:role>/', role_dashboard, name='role-dashboard'),
+    path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,17 +1,56 @@
 # records/views.py
-from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework import mixins, viewsets, permissions, status
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, action
 from rest_framework.response import Response
-from django.db.models import Sum, Count
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.request import Request
+from rest_framework.views import APIView
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Sum, Count, ExpressionWrapper, FloatField
+from django.db.models.functions import Cast
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date, parse_http_date_safe
+from datetime import datetime, time, timedelta
+import asyncio
+from collections import Counter
 from django.contrib.auth import get_user_model  # Use this instead of direct import
+from asgiref.sync import sync_to_async
 
 # Get the custom User model
 User = get_user_model()
 
-from .models import Product, Sale  # Remove User from this import
-from .serializers import ProductSerializer, SaleSerializer
+from .models import Product, Sale, DailySalesRollup, ReportJob  # Remove User from this import
+from .serializers import (
+    ProductSerializer, SaleSerializer, BulkSaleItemSerializer, ReportJobSerializer, TokenRequestSerializer
+)
+from .reports import LEADERBOARD_PAGE_SIZE, profit_loss_summary, report_overview, seller_leaderboard
+from .pagination import ProductKeysetPagination, SaleKeysetPagination
+from .caching import (
+    CATALOG_CACHE_TIMEOUT, DASHBOARD_CACHE_TIMEOUT, LEADERBOARD_CACHE_TIMEOUT, LOW_STOCK_CACHE_KEY,
+    LOW_STOCK_CACHE_TIMEOUT, catalog_cache_key, dashboard_cache_key, leaderboard_cache_key
+)
+from .events import broker, publish_sales
+from .metrics import registry as metrics_registry
+from .analytics import DIMENSIONS, sales_cube
+from .archive import archived_sale_rows
+from .sync import sync_payload
+from .jobs import artifact_chunks, submit_job
+from .forecasting import DEFAULT_LEAD_TIME_DAYS, stock_forecaster
+from .ledger import snapshot_cutoff, with_ledger_stock
+from .dashboards import DASHBOARD_ROLES, build_dashboard
+from .authentication import issue_stream_ticket, issue_token, revocation_list, user_from_stream_ticket
+from .routers import read_alias, reads_from, replica_reads
+from .renderers import ValuesSerializer, fast_json_response, render_json, wants_fast_list
+from .exports import EXPORT_FORMATS, PRODUCT_EXPORT_FIELDS, SALE_EXPORT_FIELDS, stream_export
+
+# Request size limits
+BULK_MAX_ITEMS = 1000
+LEADERBOARD_MAX_PAGE_SIZE = 100
 
 class IsBoss(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -21,10 +60,56 @@ class IsBossOrManager(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user.role in ['BOSS', 'MANAGER']
 
-class ProductViewSet(viewsets.ModelViewSet):
+def export_response(request, queryset, fields, name, leading_rows=()):
+    """Stream ``queryset`` as CSV or NDJSON (``?export_format=``), gzipped with ``?gzip=1``."""
+    export_format = request.query_params.get('export_format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        raise ValidationError({'export_format': [f"Choose one of: {', '.join(EXPORT_FORMATS)}"]})
+    compress = request.query_params.get('gzip', '').lower() in ('1', 'true')
+
+    filename = f'{name}.{export_format}'
+    content_type = EXPORT_FORMATS[export_format]
+    if compress:
+        filename += '.gz'
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(
+        stream_export(queryset.using(read_alias(request)), fields, export_format, compress, leading_rows=leading_rows),
+        content_type=content_type
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+class FastListMixin:
+    """
+    ``?fast=1`` list mode: rows come from ``values()`` and are encoded with
+    orjson, producing the same JSON as the regular serializer path.
+    """
+    fast_annotations = {}
+    # (viewset, serializer class) -> ValuesSerializer, built on first use
+    _fast_serializers = {}
+
+    def fast_list_body(self, request):
+        key = (type(self), self.get_serializer_class())
+        fast = self._fast_serializers.get(key)
+        if fast is None:
+            fast = self._fast_serializers[key] = ValuesSerializer(key[1], self.fast_annotations)
+        rows = fast.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return render_json(fast.to_data(rows))
+        return render_json({'next': self.paginator.get_next_link(), 'results': fast.to_data(page)})
+
+class ProductViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ProductKeysetPagination
+    fast_annotations = {
+        # Same float arithmetic as Product.profit_margin, done by the database
+        'profit_margin': ExpressionWrapper(
+            Cast('price', FloatField()) - Cast('cost_price', FloatField()), output_field=FloatField()
+        ),
+    }
 
     def get_queryset(self):
         queryset = Product.objects.all()
@@ -33,36 +118,315 @@ class ProductViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(is_active=is_active.lower() == 'true')
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        if wants_fast_list(request):
+            return self._versioned_response(request, self.fast_list_body)
+        return self._versioned_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._versioned_response(request, super().retrieve, *args, **kwargs)
+
+    def _versioned_response(self, request, build, *args, **kwargs):
+        """
+        Answer conditional GETs from the catalog version and serve repeat
+        requests from the local cache instead of re-serializing.
+        """
+        version, last_modified = Product.objects.catalog_version()
+        headers = {'ETag': f'W/"{version}"'}
+        if last_modified:
+            headers['Last-Modified'] = http_date(last_modified.timestamp())
+
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            not_modified = headers['ETag'] in [tag.strip() for tag in if_none_match.split(',')]
+        else:
+            since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+            not_modified = bool(since and last_modified and int(last_modified.timestamp()) <= since)
+        if not_modified:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        key = catalog_cache_key(version, request.get_full_path())
+        data = cache.get(key)
+        if data is None:
+            data = build(request, *args, **kwargs)
+            # Fast list bodies are already-rendered bytes
+            if not isinstance(data, bytes):
+                if data.status_code != status.HTTP_200_OK:
+                    return data
+                data = data.data
+            cache.set(key, data, CATALOG_CACHE_TIMEOUT)
+        if isinstance(data, bytes):
+            return fast_json_response(request, data, headers)
+        return Response(data, headers=headers)
+
     @action(detail=False, methods=['get'])
     def low_stock(self, request):
-        low_stock_products = Product.objects.filter(
-            stock_quantity__lte=models.F('min_stock_level'),
-            is_active=True
-        )
-        serializer = self.get_serializer(low_stock_products, many=True)
-        return Response(serializer.data)
+        data = cache.get(LOW_STOCK_CACHE_KEY)
+        if data is None:
+            # Served from the partial index on is_low_stock, not a catalog scan
+            low_stock_products = Product.objects.filter(is_low_stock=True, is_active=True)
+            data = list(self.get_serializer(low_stock_products, many=True).data)
+            cache.set(LOW_STOCK_CACHE_KEY, data, LOW_STOCK_CACHE_TIMEOUT)
+        return Response(data)
 
-class SaleViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated, IsBossOrManager])
+    @replica_reads
+    def forecast(self, request):
+        """
+        Sales velocity, days of cover and suggested reorder points, most
+        urgent first. ``?lead_time=`` (days, default 7) and ``?cover_below=``
+        (only products with fewer days of cover).
+        """
+        params = request.query_params
+        try:
+            lead_time = int(params.get('lead_time', DEFAULT_LEAD_TIME_DAYS))
+            cover_below = float(params['cover_below']) if params.get('cover_below') else None
+        except ValueError:
+            raise ValidationError({'lead_time': ['lead_time and cover_below must be numbers']})
+        if not 1 <= lead_time <= 90:
+            raise ValidationError({'lead_time': ['Must be between 1 and 90 days']})
+
+        stock_forecaster.refresh()
+        rows = stock_forecaster.forecast(lead_time)
+        if cover_below is not None:
+            rows = [row for row in rows if row['days_of_cover'] is not None and row['days_of_cover'] < cover_below]
+        rows.sort(key=lambda row: (row['days_of_cover'] is None, row['days_of_cover'] or 0, row['product_id']))
+        return Response({'lead_time': lead_time, 'window_days': stock_forecaster.window, 'results': rows})
+
+    @action(detail=False, methods=['get'], url_path='stock-at',
+            permission_classes=[permissions.IsAuthenticated, IsBossOrManager])
+    @replica_reads
+    def stock_at(self, request):
+        """
+        Stock of every product as of ``?at=`` (an ISO datetime, or a date
+        meaning the end of that day), from the ledger snapshots. ``?product=``
+        (repeatable) narrows it down.
+        """
+        value = request.query_params.get('at', '')
+        try:
+            moment = parse_datetime(value)
+            day = parse_date(value) if moment is None else None
+        except ValueError:  # well formed but impossible, e.g. 2024-02-30
+            moment = day = None
+        if moment is None:
+            if day is None:
+                raise ValidationError({'at': ['Use YYYY-MM-DD or an ISO 8601 datetime']})
+            moment = snapshot_cutoff(day + timedelta(days=1)) - timedelta(microseconds=1)
+        elif timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+
+        products = self.get_queryset().order_by('id')
+        product_ids = request.query_params.getlist('product')
+        if product_ids:
+            if not all(pk.isdigit() for pk in product_ids):
+                raise ValidationError({'product': ['Product ids must be integers']})
+            products = products.filter(pk__in=product_ids)
+        rows = with_ledger_stock(products, moment).values_list('id', 'name', 'ledger_stock', 'stock_quantity')
+        return Response({
+            'at': moment,
+            'results': [
+                {'product_id': pk, 'product_name': name, 'stock_quantity': stock, 'current_stock': current}
+                for pk, name, stock, current in rows
+            ],
+        })
+
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """Products created, updated or deleted since ``?since=<token>``."""
+        return Response(sync_payload(
+            self.get_queryset(), 'updated_at', self.get_serializer_class(),
+            request, self.get_serializer_context()
+        ))
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        queryset = self.get_queryset().order_by('id')
+        return export_response(request, queryset, PRODUCT_EXPORT_FIELDS, 'products')
+
+class SaleViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = Sale.objects.all()  # Add this line
     serializer_class = SaleSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SaleKeysetPagination
+
+    def list(self, request, *args, **kwargs):
+        if wants_fast_list(request):
+            return fast_json_response(request, self.fast_list_body(request))
+        return super().list(request, *args, **kwargs)
 
     def get_queryset(self):
         user = self.request.user
+        # SaleSerializer reads product.name and seller.username
+        queryset = Sale.objects.select_related('product', 'seller')
         if hasattr(user, 'role'):
             if user.role in ['BOSS', 'MANAGER']:
-                return Sale.objects.all()
-        return Sale.objects.filter(seller=user)
+                return queryset
+        return queryset.filter(seller=user)
+
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """Sales recorded or deleted since ``?since=<token>``."""
+        return Response(sync_payload(
+            self.get_queryset(), 'sale_date', self.get_serializer_class(),
+            request, self.get_serializer_context()
+        ))
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Full sales history, archived months included, optionally narrowed by
+        ?start=, ?end= (dates, inclusive) and ?seller=.
+        """
+        queryset = self.get_queryset()
+        params = request.query_params
+        archived = {}
+        for param, lookup, offset in (('start', 'sale_date__gte', 0), ('end', 'sale_date__lt', 1)):
+            if params.get(param):
+                try:
+                    day = parse_date(params[param])
+                except ValueError:  # well formed but impossible, e.g. 2024-02-30
+                    day = None
+                if day is None:
+                    raise ValidationError({param: ['Use YYYY-MM-DD']})
+                boundary = timezone.make_aware(datetime.combine(day + timedelta(days=offset), time.min))
+                queryset = queryset.filter(**{lookup: boundary})
+                archived[param] = boundary
+        if getattr(request.user, 'role', None) not in ['BOSS', 'MANAGER']:
+            archived['seller_ids'] = {request.user.pk}
+        if params.get('seller'):
+            if not params['seller'].isdigit():
+                raise ValidationError({'seller': ['Must be a user id']})
+            queryset = queryset.filter(seller_id=params['seller'])
+            archived['seller_ids'] = {int(params['seller'])} & archived.get('seller_ids', {int(params['seller'])})
+        return export_response(
+            request, queryset.order_by('sale_date', 'id'), SALE_EXPORT_FIELDS, 'sales',
+            leading_rows=archived_sale_rows(SALE_EXPORT_FIELDS, **archived)
+        )
 
     def perform_create(self, serializer):
-        sale = serializer.save(seller=self.request.user)
-        # Update product stock
-        product = sale.product
-        product.stock_quantity -= sale.quantity
-        product.save()
+        product = serializer.validated_data['product']
+        quantity = serializer.validated_data.get('quantity', 1)
+        with transaction.atomic():
+            # Conditional decrement first: the row lock it takes only lives
+            # until the sale insert below commits
+            if not Product.objects.decrement_stock(product.pk, quantity, self.request.user):
+                raise ValidationError({'quantity': f'Insufficient stock for {product.name}'})
+            sale = serializer.save(seller=self.request.user)
+            publish_sales([sale])
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Record a batch of till sales at once.
+
+        The batch is all-or-nothing: on any problem nothing is written and the
+        response is a list of per-item errors in request order ({} for items
+        that were fine).
+        """
+        # Before validation, which would otherwise run over the whole oversized batch
+        if isinstance(request.data, list) and len(request.data) > BULK_MAX_ITEMS:
+            raise ValidationError({'non_field_errors': [f'At most {BULK_MAX_ITEMS} sales per upload']})
+        items = BulkSaleItemSerializer(data=request.data, many=True)
+        items.is_valid(raise_exception=True)
+        rows = items.validated_data
+
+        products = Product.objects.in_bulk({row['product'] for row in rows})
+        errors = [{} for _ in rows]
+        demand = Counter()
+        for index, row in enumerate(rows):
+            if row['product'] not in products:
+                errors[index]['product'] = [f"Invalid pk \"{row['product']}\" - object does not exist."]
+            else:
+                demand[row['product']] += row['quantity']
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            # One conditional decrement per product, however many items it has
+            for product_id, quantity in demand.items():
+                if not Product.objects.decrement_stock(product_id, quantity, request.user):
+                    for index, row in enumerate(rows):
+                        if row['product'] == product_id:
+                            errors[index]['quantity'] = [f'Insufficient stock for {products[product_id].name}']
+            if any(errors):
+                transaction.set_rollback(True)
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+            sales = []
+            for row in rows:
+                sale = Sale(
+                    product=products[row['product']],
+                    quantity=row['quantity'],
+                    sale_price=row['sale_price'],
+                    payment_method=row['payment_method'],
+                    seller=request.user
+                )
+                sale.calculate_totals()
+                sales.append(sale)
+            Sale.objects.bulk_create(sales)
+            DailySalesRollup.objects.apply_sales(sales)
+            publish_sales(sales)
+
+        serializer = self.get_serializer(sales, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+class ReportJobViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                       mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Submit heavy reports for the report worker and poll them.
+
+    POST ``{"kind": ..., "params": {...}}`` answers 202 with the job (or 200
+    with the existing one when an identical request is pending or fresh);
+    poll the job for ``status``/``progress`` and fetch ``download`` when DONE.
+    """
+    queryset = ReportJob.objects.select_related('requested_by')
+    serializer_class = ReportJobSerializer
+    permission_classes = [permissions.IsAuthenticated, IsBossOrManager]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job, created = submit_job(serializer.validated_data['kind'], serializer.validated_data['params'], request.user)
+        return Response(
+            self.get_serializer(job).data,
+            status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK
+        )
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != 'DONE':
+            return Response({'error': f'Job is {job.status}'}, status=status.HTTP_409_CONFLICT)
+        response = StreamingHttpResponse(artifact_chunks(job), content_type=job.content_type)
+        response['Content-Disposition'] = f'attachment; filename="{job.result_name}"'
+        return response
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def obtain_token(request):
+    """Exchange a username and password for a signed API token."""
+    serializer = TokenRequestSerializer(data=request.data, context={'request': request})
+    serializer.is_valid(raise_exception=True)
+    user = serializer.validated_data['user']
+    token, expires_at = issue_token(user)
+    return Response({'token': token, 'expires_at': expires_at, 'user_id': user.pk, 'role': user.role})
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def revoke_token(request):
+    """Revoke the token used for this request, or with ``?all=1`` every token of this user."""
+    if request.query_params.get('all', '').lower() in ('1', 'true'):
+        revocation_list.revoke_user(request.user.pk)
+    elif isinstance(request.auth, dict):
+        revocation_list.revoke(request.auth)
+    else:
+        raise ValidationError({'non_field_errors': ['This request was not made with an API token']})
+    return Response(status=status.HTTP_204_NO_CONTENT)
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@replica_reads
 def profit_loss_report(request):
     try:
         # Check if user is boss
@@ -72,33 +436,7 @@ def profit_loss_report(request):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        today = timezone.now().date()
-        
-        # Daily stats
-        daily_sales = Sale.objects.filter(sale_date__date=today).aggregate(
-            total_sales=Sum('total_amount'),
-            total_profit=Sum('profit'),
-            transaction_count=Count('id')
-        )
-        
-        return Response({
-            'daily': {
-                'total_sales': float(daily_sales['total_sales'] or 0),
-                'total_profit': float(daily_sales['total_profit'] or 0),
-                'transaction_count': daily_sales['transaction_count'] or 0
-            },
-            'weekly': {
-                'total_sales': 0,
-                'total_profit': 0,
-                'transaction_count': 0
-            },
-            'monthly': {
-                'total_sales': 0,
-                'total_profit': 0,
-                'transaction_count': 0
-            },
-            'top_products': []
-        })
+        return Response(profit_loss_summary())
         
     except Exception as e:
         return Response(
@@ -106,37 +444,211 @@ def profit_loss_report(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-@api_view(['POST'])
-def create_test_data(request):
-    """Create test data for development"""
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsBossOrManager])
+@replica_reads
+def seller_leaderboard_report(request):
+    """
+    Sellers ranked by sales for ``?period=daily|weekly|monthly`` (default
+    weekly), with period-over-period change; paged with ``page``/``page_size``.
+    """
+    params = request.query_params
+    period = params.get('period', 'weekly')
     try:
-        # Create test users
-        boss_user = User.objects.create_user(
-            username='boss',
-            email='boss@company.com',
-            password='password',
-            role='BOSS',
-            employee_id='BOSS001'
-        )
-        
-        manager_user = User.objects.create_user(
-            username='manager',
-            email='manager@company.com',
-            password='password',
-            role='MANAGER',
-            employee_id='MGR001'
+        page = max(int(params.get('page', 1)), 1)
+        page_size = min(max(int(params.get('page_size', LEADERBOARD_PAGE_SIZE)), 1), LEADERBOARD_MAX_PAGE_SIZE)
+    except ValueError:
+        raise ValidationError({'page': ['page and page_size must be integers']})
+
+    today = timezone.localdate()
+    key = leaderboard_cache_key(period, today, page, page_size)
+    payload = cache.get(key)
+    if payload is None:
+        try:
+            payload = seller_leaderboard(period, today, offset=(page - 1) * page_size, limit=page_size)
+        except ValueError as e:
+            raise ValidationError({'period': [str(e)]})
+        payload['page'] = page
+        cache.set(key, payload, LEADERBOARD_CACHE_TIMEOUT)
+    return Response(payload)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def role_dashboard(request, role):
+    """
+    Everything the ``role`` dashboard shows, in one (usually cached)
+    response. Users can only load their own role's dashboard; sellers get
+    their own figures.
+    """
+    role = role.upper()
+    if role not in DASHBOARD_ROLES:
+        raise Http404('Unknown dashboard')
+    if request.user.role != role:
+        return Response({'error': f'Only {role} users can load this dashboard'}, status=status.HTTP_403_FORBIDDEN)
+
+    key = dashboard_cache_key(role, request.user.pk)
+    payload = cache.get(key)
+    if payload is None:
+        payload = build_dashboard(role, request.user)
+        cache.set(key, payload, DASHBOARD_CACHE_TIMEOUT)
+    return Response(payload)
+
+async def _api_user(request):
+    """Authenticate an async view's request with the same classes as the DRF views."""
+    drf_request = Request(request, authenticators=APIView().get_authenticators())
+    return await sync_to_async(lambda: drf_request.user)()
+
+async def report_overview_view(request):
+    """
+    Boss dashboard in one request: window totals, top products, low stock
+    and top sellers, with the independent queries run concurrently
+    (needs an ASGI server to overlap with other requests too).
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    request.user = await _api_user(request)
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+    if request.user.role != 'BOSS':
+        return JsonResponse({'error': 'Only BOSS can access profit reports'}, status=status.HTTP_403_FORBIDDEN)
+    with reads_from(read_alias(request)):
+        data = await report_overview()
+    return JsonResponse(data, encoder=DjangoJSONEncoder)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsBoss])
+def request_metrics(request):
+    """Rolling per-view latency, query and DB-time histograms from this process."""
+    return Response({
+        'sample_rate': settings.REQUEST_METRICS_SAMPLE_RATE,
+        'views': metrics_registry.snapshot()
+    })
+
+def _parse_day_param(request, param):
+    value = request.query_params.get(param)
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:  # well formed but impossible, e.g. 2024-02-30
+        day = None
+    if day is None:
+        raise ValidationError({param: ['Use YYYY-MM-DD']})
+    return day
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsBoss])
+@replica_reads
+def sales_analytics(request):
+    """
+    Ad-hoc sales aggregations answered from the in-memory columnar cube.
+
+    ``?group_by=category,hour`` (any of the cube's dimensions), optional
+    ``start``/``end`` dates (inclusive), ``order_by`` metric and ``limit``;
+    ``?report=cohorts&period=month`` returns seller cohort revenue curves.
+    """
+    sales_cube.refresh()
+    params = request.query_params
+    if params.get('report') == 'cohorts':
+        try:
+            cohorts = sales_cube.seller_cohorts(params.get('period', 'month'))
+        except ValueError as e:
+            raise ValidationError({'period': [str(e)]})
+        return Response({'cohorts': cohorts})
+
+    group_by = [name for name in params.get('group_by', '').split(',') if name]
+    unknown = [name for name in group_by if name not in DIMENSIONS]
+    if unknown:
+        raise ValidationError({'group_by': [f"Unknown dimension(s) {', '.join(unknown)}; choose from {', '.join(DIMENSIONS)}"]})
+    start, end = _parse_day_param(request, 'start'), _parse_day_param(request, 'end')
+    try:
+        limit = int(params['limit']) if params.get('limit') else None
+    except ValueError:
+        raise ValidationError({'limit': ['limit must be an integer']})
+    if limit is not None and limit < 0:
+        raise ValidationError({'limit': ['limit must be zero (no limit) or more']})
+    try:
+        rows = sales_cube.aggregate(
+            group_by,
+            start=timezone.make_aware(datetime.combine(start, time.min)) if start else None,
+            end=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)) if end else None,
+            limit=limit,
+            order_by=params.get('order_by', 'total_sales')
         )
-        
-        # Create products
-        products_data = [
-            {'name': '4G Data Plan 10GB', 'category_name': 'DATA_PLANS', 'price': 25000, 'cost_price': 15000, 'stock_quantity': 100},
-            {'name': 'Fiber Optic Router', 'category_name': 'ROUTERS', 'price': 299999, 'cost_price': 199999, 'stock_quantity': 15},
-        ]
-        
-        for product_data in products_data:
-            Product.objects.create(**product_data)
-        
-        return Response({'message': 'Test data created successfully'})
-    
-    except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+    except ValueError as e:
+        raise ValidationError({'detail': [str(e)]})
+
+    # Dense cube codes are ids; attach display names for the groups returned
+    if 'product' in group_by:
+        names = dict(Product.objects.filter(pk__in={row['product'] for row in rows}).values_list('id', 'name'))
+        for row in rows:
+            row['product_name'] = names.get(row['product'])
+    if 'seller' in group_by:
+        names = dict(User.objects.filter(pk__in={row['seller'] for row in rows}).values_list('id', 'username'))
+        for row in rows:
+            row['seller_name'] = names.get(row['seller'])
+    return Response({'group_by': group_by, 'sales_loaded': len(sales_cube), 'results': rows})
+
+LIVE_EVENTS_KEEPALIVE_SECONDS = 15
+# Streams end after this long and EventSource reconnects, so a client that
+# vanished without us noticing can't pin a subscription forever
+LIVE_EVENTS_MAX_SECONDS = 300
+
+def _live_event_filter(user):
+    if user.role == 'BOSS':
+        return lambda event_type, payload: True
+    if user.role == 'MANAGER':
+        return lambda event_type, payload: event_type != 'report_delta'
+    return lambda event_type, payload: (
+        event_type == 'stock_changed'
+        or (event_type == 'sale_created' and payload['seller_id'] == user.pk)
+    )
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def live_events_ticket(request):
+    """A short-lived, single-use ``?ticket=`` for opening the live-events stream."""
+    if not isinstance(request.auth, dict):
+        raise ValidationError({'non_field_errors': ['This request was not made with an API token']})
+    ticket, expires_at = issue_stream_ticket(request.auth)
+    return Response({'ticket': ticket, 'expires_at': expires_at})
+
+async def live_events(request):
+    """
+    Server-sent events stream of sale, stock and report updates (needs an
+    ASGI server). Authenticated by a ``?ticket=`` from ``live_events_ticket``
+    (EventSource cannot send an Authorization header) or the admin session.
+
+    Events only reach streams served by the process that published them;
+    clients keep a slow poll as a backstop (see ``useLiveEvents``).
+    """
+    ticket = request.GET.get('ticket')
+    if ticket:
+        try:
+            user = await sync_to_async(user_from_stream_ticket)(ticket)
+        except AuthenticationFailed:
+            user = None
+    else:
+        user = await sync_to_async(lambda: request.user if request.user.is_authenticated else None)()
+    if user is None:
+        return JsonResponse({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    subscription = broker.subscribe(_live_event_filter(user))
+
+    async def stream():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + LIVE_EVENTS_MAX_SECONDS
+        try:
+            yield b'retry: 3000\n\n'
+            while loop.time() < deadline:
+                try:
+                    yield await subscription.get(timeout=LIVE_EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b': keepalive\n\n'
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
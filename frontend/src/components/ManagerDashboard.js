@@ -1,28 +1,21 @@
 import React, { useState, useEffect } from 'react';
-import { productsAPI, salesAPI } from '../services/api';
+import { LIVE_EVENTS_URL, dashboardAPI } from '../services/api';
+import { useLiveEvents } from '../hooks/useAutoRefresh';
 import './ManagerDashboard.css';
 
 const ManagerDashboard = () => {
-  const [products, setProducts] = useState([]);
-  const [lowStock, setLowStock] = useState([]);
-  const [sales, setSales] = useState([]);
+  const [dashboard, setDashboard] = useState(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
     loadData();
   }, []);
 
+  // Stock figures, low stock, top sellers and recent sales in one cached request
   const loadData = async () => {
     try {
-      const [productsRes, lowStockRes, salesRes] = await Promise.all([
-        productsAPI.getAll(),
-        productsAPI.getLowStock(),
-        salesAPI.getAll()
-      ]);
-      
-      setProducts(productsRes.data);
-      setLowStock(lowStockRes.data);
-      setSales(salesRes.data);
+      const response = await dashboardAPI.get('manager');
+      setDashboard(response.data);
     } catch (error) {
       console.error('Error loading data:', error);
     } finally {
@@ -30,8 +23,18 @@ const ManagerDashboard = () => {
     }
   };
 
-  const totalSales = sales.reduce((sum, sale) => sum + parseFloat(sale.total_amount), 0);
-  const totalTransactions = sales.length;
+  // Refresh when the server says something changed instead of on a timer
+  useLiveEvents(LIVE_EVENTS_URL, {
+    sale_created: loadData,
+    stock_changed: loadData,
+  }, loadData);
+
+  const products = dashboard?.products || {};
+  const lowStock = dashboard?.low_stock?.results || [];
+  const sellers = dashboard?.sellers || [];
+  const sales = dashboard?.recent_sales || [];
+  const weeklySales = sellers.reduce((sum, seller) => sum + seller.total_sales, 0);
+  const weeklyTransactions = sellers.reduce((sum, seller) => sum + seller.transaction_count, 0);
 
   return (
     <div className="manager-dashboard">
@@ -42,14 +45,16 @@ const ManagerDashboard = () => {
         <div className="summary-cards">
           <div className="summary-card">
             <div className="card-content">
-              <h4>Total Sales</h4>
-              <p className="summary-value">${totalSales.toLocaleString()}</p>
+              <h4>Top Sellers: Sales</h4>
+              <p className="summary-value">${weeklySales.toLocaleString()}</p>
+              <span className="summary-label">Last 7 days</span>
             </div>
           </div>
           <div className="summary-card">
             <div className="card-content">
-              <h4>Total Transactions</h4>
-              <p className="summary-value">{totalTransactions}</p>
+              <h4>Top Sellers: Transactions</h4>
+              <p className="summary-value">{weeklyTransactions}</p>
+              <span className="summary-label">Last 7 days</span>
             </div>
           </div>
         </div>
@@ -57,15 +62,17 @@ const ManagerDashboard = () => {
       
       <div className="low-stock-section">
         <h3>Low Stock Alert</h3>
-        {lowStock.length === 0 ? (
+        {loading ? (
+          <div className="loading">Loading stock alerts...</div>
+        ) : lowStock.length === 0 ? (
           <p className="no-alert">All products are well stocked</p>
         ) : (
           <div className="alert-warning">
             <h4>Products needing restock:</h4>
             <ul className="alert-list">
               {lowStock.map(product => (
-                <li key={product.id} className="alert-item">
-                  <strong>{product.name}</strong> - Current: {product.current_stock}, Minimum: {product.min_stock}
+                <li key={product.product_id} className="alert-item">
+                  <strong>{product.product_name}</strong> - Current: {product.stock_quantity}, Minimum: {product.min_stock_level}
                 </li>
               ))}
             </ul>
@@ -74,50 +81,59 @@ const ManagerDashboard = () => {
       </div>
       
       <div className="products-section">
-        <h3>Product Inventory</h3>
+        <h3>Inventory</h3>
         {loading ? (
-          <div className="loading">Loading products...</div>
+          <div className="loading">Loading inventory...</div>
         ) : (
-          <div className="table-container">
-            <table className="data-table">
-              <thead>
-                <tr>
-                  <th>Product Name</th>
-                  <th>Category</th>
-                  <th>Price</th>
-                  <th>Stock Level</th>
-                  <th>Status</th>
-                </tr>
-              </thead>
-              <tbody>
-                {products.map(product => (
-                  <tr key={product.id}>
-                    <td className="product-name">{product.name}</td>
-                    <td className="product-category">{product.category_name}</td>
-                    <td className="product-price">${product.price}</td>
-                    <td className={`stock-level ${
-                      product.stock_quantity < product.min_stock_level 
-                        ? 'low-stock' 
-                        : product.stock_quantity < product.min_stock_level * 2 
-                          ? 'medium-stock' 
-                          : 'good-stock'
-                    }`}>
-                      {product.stock_quantity}
-                      {product.stock_quantity < product.min_stock_level && ' ⚠️'}
-                    </td>
-                    <td>
-                      <span className={`status-badge ${product.is_active ? 'active' : 'inactive'}`}>
-                        {product.is_active ? 'Active' : 'Inactive'}
-                      </span>
-                    </td>
-                  </tr>
-                ))}
-              </tbody>
-            </table>
+          <div className="summary-cards">
+            <div className="summary-card">
+              <div className="card-content">
+                <h4>Active Products</h4>
+                <p className="summary-value">{products.active} / {products.total}</p>
+              </div>
+            </div>
+            <div className="summary-card">
+              <div className="card-content">
+                <h4>Units in Stock</h4>
+                <p className="summary-value">{(products.units_in_stock || 0).toLocaleString()}</p>
+              </div>
+            </div>
+            <div className="summary-card">
+              <div className="card-content">
+                <h4>Stock Value (cost)</h4>
+                <p className="summary-value">${(products.stock_value || 0).toLocaleString()}</p>
+              </div>
+            </div>
           </div>
         )}
       </div>
 
+      <div className="top-sellers">
+        <h3>Top Sellers This Week</h3>
+        <div className="table-container">
+          <table className="data-table">
+            <thead>
+              <tr>
+                <th>Rank</th>
+                <th>Seller</th>
+                <th>Sales</th>
+                <th>Transactions</th>
+              </tr>
+            </thead>
+            <tbody>
+              {sellers.map(seller => (
+                <tr key={seller.seller_id}>
+                  <td>#{seller.rank}</td>
+                  <td className="seller-name">{seller.seller_name}</td>
+                  <td className="sale-amount">${seller.total_sales.toLocaleString()}</td>
+                  <td>{seller.transaction_count}</td>
+                </tr>
+              ))}
+            </tbody>
+          </table>
+        </div>
+      </div>
+
       <div className="recent-sales">
         <h3>Recent Sales</h3>
         <div className="table-container">
@@ -132,7 +148,7 @@ const ManagerDashboard = () => {
               </tr>
             </thead>
             <tbody>
-              {sales.slice(0, 10).map(sale => (
+              {sales.map(sale => (
                 <tr key={sale.id}>
                   <td className="sale-id">#{sale.id}</td>
                   <td className="seller-name">{sale.seller_name}</td>
@@ -1,42 +1,38 @@
 // components/ProfitDashboard.js
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import { reportsAPI, salesAPI, productsAPI } from '../services/api';
+import { LIVE_EVENTS_URL, dashboardAPI } from '../services/api';
+import { useLiveEvents } from '../hooks/useAutoRefresh';
 
 const ProfitDashboard = () => {
-  const [profitData, setProfitData] = useState(null);
-  const [salesData, setSalesData] = useState([]);
-  const [products, setProducts] = useState([]);
+  const [dashboard, setDashboard] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
-  useEffect(() => {
-    const fetchData = async () => {
-      try {
-        setLoading(true);
-        setError(null);
-        
-        const [profitRes, salesRes, productsRes] = await Promise.all([
-          reportsAPI.profitLossReport().catch(() => ({ data: null })),
-          salesAPI.getAll().catch(() => ({ data: [] })),
-          productsAPI.getAll().catch(() => ({ data: [] }))
-        ]);
-        
-        setProfitData(profitRes?.data);
-        setSalesData(salesRes.data?.sales || salesRes.data || []);
-        setProducts(productsRes.data || []);
-        
-      } catch (error) {
-        setError('Unable to connect to the server. Please make sure the backend is running.');
-        console.error('Error fetching data:', error);
-      } finally {
-        setLoading(false);
-      }
-    };
+  // Report, products, users and recent sales arrive in one cached request
+  const fetchData = async () => {
+    try {
+      setError(null);
+      const response = await dashboardAPI.get('boss');
+      setDashboard(response.data);
+    } catch (error) {
+      setError('Unable to connect to the server. Please make sure the backend is running.');
+      console.error('Error fetching data:', error);
+    } finally {
+      setLoading(false);
+    }
+  };
 
+  useEffect(() => {
     fetchData();
   }, []);
 
+  // Refresh when the server says something changed instead of on a timer
+  useLiveEvents(LIVE_EVENTS_URL, {
+    sale_created: fetchData,
+    stock_changed: fetchData,
+  }, fetchData);
+
   if (loading) return <div className="loading">Loading dashboard data...</div>;
   
   if (error) return (
@@ -53,8 +49,10 @@ const ProfitDashboard = () => {
   );
 
   // Safe data access
-  const dailyData = profitData?.daily || {};
+  const dailyData = dashboard?.report?.daily || {};
   const { total_sales = 0, total_profit = 0, transaction_count = 0 } = dailyData;
+  const activeProducts = dashboard?.products?.active || 0;
+  const recentSales = dashboard?.recent_sales || [];
 
   return (
     <div className="profit-dashboard">
@@ -83,12 +81,12 @@ const ProfitDashboard = () => {
         </div>
         <div className="stat-card">
           <h3>Products</h3>
-          <p className="stat-number">{products.length}</p>
+          <p className="stat-number">{activeProducts}</p>
           <span className="stat-label">Active</span>
         </div>
       </div>
 
-      {salesData.length === 0 && products.length === 0 && (
+      {recentSales.length === 0 && activeProducts === 0 && (
         <div className="empty-state">
           <h3>Welcome to Your Business Dashboard!</h3>
           <p>Get started by adding products and recording sales through the Admin Panel.</p>
@@ -1,16 +1,29 @@
 import React, { useState, useEffect } from 'react';
-import { productsAPI, salesAPI } from '../services/api';
+import { LIVE_EVENTS_URL, dashboardAPI, productsAPI, salesAPI } from '../services/api';
+import { useLiveEvents } from '../hooks/useAutoRefresh';
 import './SellerDashboard.css';
 
 const SellerDashboard = () => {
   const [products, setProducts] = useState([]);
   const [cart, setCart] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [summary, setSummary] = useState(null);
 
   useEffect(() => {
     loadProducts();
+    loadSummary();
   }, []);
 
+  // The seller's own totals and recent sales in one cached request
+  const loadSummary = async () => {
+    try {
+      const response = await dashboardAPI.get('seller');
+      setSummary(response.data);
+    } catch (error) {
+      console.error('Error loading sales summary:', error);
+    }
+  };
+
   const loadProducts = async () => {
     try {
       const response = await productsAPI.getAll();
@@ -22,6 +35,15 @@ const SellerDashboard = () => {
     }
   };
 
+  // Other tills change stock; this seller's own sales move the totals
+  useLiveEvents(LIVE_EVENTS_URL, {
+    stock_changed: loadProducts,
+    sale_created: loadSummary,
+  }, () => {
+    loadProducts();
+    loadSummary();
+  });
+
   const addToCart = (product) => {
     if (product.stock_quantity === 0) return;
     
@@ -73,6 +95,7 @@ const SellerDashboard = () => {
       setCart([]);
       alert('Sale completed successfully!');
       loadProducts();
+      loadSummary();
     } catch (error) {
       console.error('Error processing sale:', error);
       alert('Error processing sale');
@@ -83,6 +106,9 @@ const SellerDashboard = () => {
     total + (item.product.price * item.quantity), 0
   );
 
+  const today = summary?.totals?.today;
+  const weekly = summary?.totals?.weekly;
+
   return (
     <div className="seller-dashboard">
       <div className="dashboard-header">
@@ -100,6 +126,13 @@ const SellerDashboard = () => {
         </div>
       </div>
 
+      {today && weekly && (
+        <div className="seller-totals">
+          <span>Today: <strong>${today.total_sales.toLocaleString()}</strong> ({today.transaction_count} sales)</span>
+          <span>Last 7 days: <strong>${weekly.total_sales.toLocaleString()}</strong> ({weekly.transaction_count} sales)</span>
+        </div>
+      )}
+
       <div className="dashboard-content">
         <div className="products-section">
           <h3>Available Products</h3>
@@ -1,4 +1,5 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
+import { eventsAPI } from '../services/api';
 
 export const useDataLoader = (fetchFunction) => {
   const [data, setData] = useState(null);
@@ -28,4 +29,61 @@ export const useDataLoader = (fetchFunction) => {
   };
 
   return { data, loading, error, manualRefresh };
-};
\ No newline at end of file
+};
+// Subscribe to the server-sent events stream instead of polling on a fast timer.
+// handlers maps event names (sale_created, stock_changed, report_delta) to callbacks.
+// Events only reach streams served by the server process that published them,
+// so poll (if given) still runs every POLL_FALLBACK_MS as a backstop.
+const POLL_FALLBACK_MS = 60000;
+const RECONNECT_DELAY_MS = 3000;
+
+export const useLiveEvents = (url, handlers, poll) => {
+  // Callers pass new handlers and poll functions on every render; keep the
+  // latest in refs so the stream is only reopened when the URL changes
+  const handlersRef = useRef(handlers);
+  const pollRef = useRef(poll);
+  useEffect(() => {
+    handlersRef.current = handlers;
+    pollRef.current = poll;
+  });
+
+  useEffect(() => {
+    let source = null;
+    let reconnectTimer = null;
+    let closed = false;
+
+    // EventSource cannot send an Authorization header, and a token in the URL
+    // ends up in access logs, so each connection uses a single-use ticket
+    const connect = async () => {
+      let ticket;
+      try {
+        ticket = (await eventsAPI.ticket()).data.ticket;
+      } catch (err) {
+        console.error('Error fetching live events ticket:', err);
+      }
+      if (closed) return;
+      if (!ticket) {
+        reconnectTimer = setTimeout(connect, RECONNECT_DELAY_MS);
+        return;
+      }
+      source = new EventSource(`${url}${url.includes('?') ? '&' : '?'}ticket=${encodeURIComponent(ticket)}`);
+      Object.keys(handlersRef.current).forEach((eventType) => {
+        source.addEventListener(eventType, (event) => handlersRef.current[eventType]?.(JSON.parse(event.data)));
+      });
+      // The browser would retry with the same, already used, ticket
+      source.onerror = () => {
+        source.close();
+        reconnectTimer = setTimeout(connect, RECONNECT_DELAY_MS);
+      };
+    };
+    connect();
+    const pollTimer = setInterval(() => pollRef.current?.(), POLL_FALLBACK_MS);
+
+    return () => {
+      closed = true;
+      clearTimeout(reconnectTimer);
+      clearInterval(pollTimer);
+      if (source) source.close();
+    };
+  }, [url]);
+};
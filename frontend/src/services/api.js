@@ -6,6 +6,9 @@ const API_BASE = process.env.NODE_ENV === 'development'
 
 console.log('🔧 API Base URL:', API_BASE);
 
+// Server-sent events stream (see useLiveEvents)
+export const LIVE_EVENTS_URL = `${API_BASE}/events/`;
+
 const api = axios.create({
   baseURL: API_BASE,
   timeout: 10000,
@@ -50,51 +53,33 @@ api.interceptors.response.use(
   }
 );
 
-// Auth API (keep as is since it's for login)
+// Auth API: signed tokens from the backend, sent as "Authorization: Bearer"
 export const authAPI = {
   login: async (credentials) => {
     try {
-      const mockUsers = {
-        'boss': { 
-          id: 1, 
-          username: 'boss', 
-          role: 'BOSS', 
-          email: 'boss@company.com',
-          token: 'mock-jwt-token-boss'
-        },
-        'manager': { 
-          id: 2, 
-          username: 'manager', 
-          role: 'MANAGER', 
-          email: 'manager@company.com',
-          token: 'mock-jwt-token-manager'
-        },
-        'seller1': { 
-          id: 3, 
-          username: 'seller1', 
-          role: 'SELLER', 
-          email: 'seller1@company.com',
-          token: 'mock-jwt-token-seller'
-        }
-      };
-      
-      if (mockUsers[credentials.username] && credentials.password === 'password') {
-        const user = mockUsers[credentials.username];
-        localStorage.setItem('token', user.token);
-        localStorage.setItem('user', JSON.stringify(user));
-        return { data: user };
-      } else {
-        throw new Error('Invalid credentials');
-      }
+      const response = await api.post('/auth/token/', credentials);
+      const { token, user_id, role, expires_at } = response.data;
+      const user = { id: user_id, username: credentials.username, role, token, expires_at };
+      localStorage.setItem('token', token);
+      localStorage.setItem('user', JSON.stringify(user));
+      return { data: user };
     } catch (error) {
       console.error('Login error:', error);
-      throw error;
+      throw new Error(error.response?.status === 400 ? 'Invalid credentials' : error.message);
     }
   },
-  
-  logout: () => {
-    localStorage.removeItem('token');
-    localStorage.removeItem('user');
+
+  logout: async () => {
+    try {
+      if (localStorage.getItem('token')) {
+        await api.post('/auth/token/revoke/');
+      }
+    } catch (error) {
+      // The token may already be expired or revoked; logging out locally is enough
+    } finally {
+      localStorage.removeItem('token');
+      localStorage.removeItem('user');
+    }
   }
 };
 
@@ -172,6 +157,22 @@ export const salesAPI = {
   }
 };
 
+// Dashboards: everything a role's dashboard shows in one cached request
+export const dashboardAPI = {
+  get: async (role) => {
+    const response = await api.get(`/dashboard/${role}/`);
+    return response;
+  }
+};
+
+// Live events: a short-lived, single-use ticket for opening the stream
+export const eventsAPI = {
+  ticket: async () => {
+    const response = await api.post('/events/ticket/');
+    return response;
+  }
+};
+
 // Reports API - REMOVE MOCK DATA
 export const reportsAPI = {
   profitLossReport: async () => {